@@ -2,13 +2,27 @@ import os
 import json
 import base64
 import subprocess
-import requests
+import time
 from datetime import datetime
 from dotenv import load_dotenv
-from openai import OpenAI
 from litellm import completion
 import streamlit as st
-from anthropic import Anthropic
+from llm_provider import get_provider, ModelConfig, Message, HybridProvider
+from batch_executor import BatchRequest
+from resilience import CircuitOpenError, retry_call, breaker_for, build_failover_provider, is_retryable
+from telemetry import get_execution_telemetry, get_telemetry
+from rate_limiter import PRIORITY_BACKGROUND
+from conversation_manager import ConversationManager
+from conversation_compactor import ConversationCompactor, CompactionState
+from memory_bank import get_memory_bank
+from memory_filter import get_memory_filter
+from memory_index import get_memory_index
+from memory_worker import get_memory_worker
+from api_client import get_execution_client
+from local_executor import get_local_executor
+from execution_history import get_execution_history
+from tool_compactor import ToolResultCompactor
+from tool_runner import get_tool_runner, tool_result
 
 # --- 1. SETUP ---
 load_dotenv()
@@ -16,10 +30,28 @@ load_dotenv()
 ZAI_KEY = os.environ.get("ZHIPUAI_API_KEY")
 ANTHROPIC_KEY = os.environ.get("ANTHROPIC_API_KEY")
 EXECUTE_API_URL = os.environ.get("EXECUTE_API_URL", "http://localhost:5000")
-
-zai_client = OpenAI(
-    api_key=ZAI_KEY,
-    base_url="https://api.z.ai/api/paas/v4/"
+# Run Python snippets in the local warm worker pool instead of the Node server
+LOCAL_EXECUTION = os.environ.get("LOCAL_EXECUTION", "false").lower() == "true"
+# Agent loop budgets: tool rounds per reply, wall-clock seconds, concurrent tool calls
+AGENT_MAX_ITERATIONS = int(os.environ.get("AGENT_MAX_ITERATIONS", "8"))
+AGENT_TIME_BUDGET = float(os.environ.get("AGENT_TIME_BUDGET_SECONDS", "60"))
+AGENT_TOOL_CONCURRENCY = int(os.environ.get("AGENT_TOOL_CONCURRENCY", "4"))
+
+# LLM_PROVIDER=mock runs the text paths offline (see mock_provider.py)
+glm_provider = get_provider(os.environ.get("LLM_PROVIDER", "glm"), ZAI_KEY, ModelConfig(name="glm-4.7-flash"))
+claude_provider = get_provider("claude", ANTHROPIC_KEY, ModelConfig(name="claude-3-5-sonnet-20241022")) if ANTHROPIC_KEY else None
+llm_providers = {"glm": glm_provider, "claude": claude_provider}
+
+# Retries + failover (GLM -> Claude for GLM turns, Claude -> GLM when the agent loop fails)
+glm_chat = build_failover_provider(llm_providers, "glm")
+claude_fallback = build_failover_provider(llm_providers, "claude", include_primary=False)
+mako_provider = HybridProvider(glm_provider, claude_provider) if claude_provider else None
+
+# Older turns are replaced by a rolling summary, refreshed after the reply
+compactor = ConversationCompactor(
+    lambda summary_prompt: glm_provider.create_completion(
+        [Message(role="user", content=summary_prompt)], priority=PRIORITY_BACKGROUND
+    )
 )
 
 # Setup Paths
@@ -27,6 +59,7 @@ CHAT_DIR = "chats"
 os.makedirs(CHAT_DIR, exist_ok=True)
 MEMORY_FILE = "memory_bank.json"
 ARCHIVE_FILE = "chat_archive.json"
+conversation_manager = ConversationManager(CHAT_DIR)
 
 st.set_page_config(page_title="MAiKO", layout="wide")
 
@@ -64,7 +97,7 @@ uploaded_file = None
 
 # --- 3. SIDEBAR ---
 # --- MODEL SELECTOR ---
-model_choice = st.sidebar.radio("Select Engine:", ("GLM-4.7 (Free/Fast)", "Claude 3.5 (Paid/Smart/Vision)"))
+model_choice = st.sidebar.radio("Select Engine:", ("GLM-4.7 (Free/Fast)", "Claude 3.5 (Paid/Smart/Vision)", "Mako Hybrid (Draft + Refine)"))
 
 # --- VISION MODE ---
 if "Claude" in model_choice and st.session_state['tab'] == 'Chat':
@@ -95,36 +128,57 @@ if st.sidebar.button("⚙️ Code Execution"):
     st.session_state['tab'] = 'CodeExecution'
     st.rerun()
 
+with st.sidebar.expander("📊 LLM Telemetry"):
+    telemetry_models = get_telemetry().snapshot()["models"]
+    if not telemetry_models:
+        st.caption("No LLM requests yet.")
+    for model_name, stats in telemetry_models.items():
+        latency = stats["metrics"].get("latency_seconds", {})
+        p50, p95 = latency.get("p50"), latency.get("p95")
+        st.markdown(f"**{model_name}** · {stats['requests']} requests · {sum(stats['errors'].values())} errors")
+        if p50 is not None:
+            st.caption(f"latency p50 {p50:.2f}s · p95 {p95:.2f}s")
+    filter_stats = get_memory_filter().stats()
+    if filter_stats["seen"]:
+        st.caption(f"Memory filter skipped {filter_stats['skip_rate']:.0%} of {filter_stats['seen']} turns")
+    st.download_button("Export JSON", get_telemetry().to_json(), file_name="llm_telemetry.json")
+    st.download_button("Export Prometheus", get_telemetry().to_prometheus(), file_name="llm_telemetry.prom")
+
+with st.sidebar.expander("⏱️ Execution Telemetry"):
+    execution_languages = get_execution_telemetry().snapshot()["languages"]
+    if not execution_languages:
+        st.caption("No code executions yet.")
+    for language_name, stats in execution_languages.items():
+        failures = stats["executions"] - stats["exit_codes"].get("0", 0)
+        st.markdown(f"**{language_name}** · {stats['executions']} runs · {failures} non-zero exits")
+        wall = stats["metrics"].get("wall_seconds", {})
+        rss = stats["metrics"].get("peak_rss_mb", {})
+        if wall.get("p95") is not None:
+            st.caption(f"wall p50 {wall['p50']:.2f}s · p95 {wall['p95']:.2f}s")
+        if rss.get("p95") is not None:
+            st.caption(f"peak RSS p95 {rss['p95']:.0f} MB · max {rss['max']:.0f} MB")
+    st.download_button(
+        "Export JSON", get_execution_telemetry().to_json(),
+        file_name="execution_telemetry.json", key="execution_telemetry_json"
+    )
+
 st.sidebar.divider()
 
 # --- 4. CHAT TAB LOGIC ---
 if st.session_state['tab'] == 'Chat':
 
     # 4a. CODE EXECUTION (Agentic)
-    def execute_code_remote(code: str, language: str = "javascript", timeout: int = 5000):
-        """Execute code through the Node.js backend"""
-        try:
-            response = requests.post(
-                f"{EXECUTE_API_URL}/api/execute/run",
-                json={"code": code, "language": language, "timeout": timeout},
-                timeout=timeout // 1000 + 2
-            )
-            if response.status_code == 200:
-                return response.json()
-            else:
-                return {"success": False, "error": f"Server error: {response.status_code}", "output": None}
-        except requests.exceptions.ConnectionError:
-            return {"success": False, "error": "Cannot connect to execution server", "output": None}
-        except Exception as e:
-            return {"success": False, "error": str(e), "output": None}
+    def execute_code_remote(code: str, language: str = "javascript", timeout: int = 5000, session_id: str = None):
+        """Execute code locally (warm Python pool) or through the Node.js backend"""
+        if LOCAL_EXECUTION and language == "python":
+            return get_local_executor().execute(code, language, timeout_ms=timeout, session_id=session_id)
+        return get_execution_client(EXECUTE_API_URL).execute_code(code, language, timeout_ms=timeout)
 
-    def chat_with_code_execution(messages, model_choice):
+    def chat_with_code_execution(messages, model_choice, chat_id=None):
         """Claude chat with agentic code execution capability"""
-        if "Claude" not in model_choice or not ANTHROPIC_KEY:
+        if "Claude" not in model_choice or not claude_provider:
             return None
 
-        client = Anthropic(api_key=ANTHROPIC_KEY)
-
         # Define code execution tool
         tools = [
             {
@@ -145,62 +199,122 @@ if st.session_state['tab'] == 'Chat':
                     },
                     "required": ["code", "language"]
                 }
+            },
+            {
+                "name": "read_execution_output",
+                "description": "Read lines of a past execution's full output when a result was shortened",
+                "input_schema": {
+                    "type": "object",
+                    "properties": {
+                        "execution_id": {
+                            "type": "string",
+                            "description": "The executionId named in the shortened result"
+                        },
+                        "start_line": {
+                            "type": "integer",
+                            "description": "First line to read (0-based)"
+                        },
+                        "max_lines": {
+                            "type": "integer",
+                            "description": "Number of lines to read (at most 200)"
+                        }
+                    },
+                    "required": ["execution_id"]
+                }
             }
         ]
 
-        # Convert messages format for Anthropic
-        api_messages = [
-            {"role": msg["role"], "content": msg["content"]}
-            for msg in messages
-        ]
+        if LOCAL_EXECUTION and chat_id:
+            # Python runs can share a persistent kernel, scoped to this chat
+            tools[0]["input_schema"]["properties"]["session_id"] = {
+                "type": "string",
+                "description": "Optional. Python runs with the same session_id keep their variables and imports"
+            }
+
+        def execute_tool(tool_input):
+            session_id = tool_input.get("session_id")
+            # A call the runner stops waiting for keeps running; bound it by the budget left
+            remaining_ms = int((deadline - time.monotonic()) * 1000)
+            return execute_code_remote(
+                tool_input["code"],
+                tool_input.get("language", "javascript"),
+                timeout=max(min(5000, remaining_ms), 1),
+                session_id=f"{chat_id}:{session_id}" if session_id and chat_id else None
+            )
+
+        # The provider moves system messages into system= and accepts block contents
+        conversation = [Message(role=msg["role"], content=msg["content"]) for msg in messages]
+
+        def create_message_once():
+            # Throttled, instrumented and rate-limit-aware like every Claude call
+            return claude_provider.create_message(conversation, tools=tools)
+
+        def create_message():
+            breaker = breaker_for(claude_provider)
+            if not breaker.allow_request():
+                raise CircuitOpenError("Claude is unavailable (circuit open)")
+            return retry_call(create_message_once, breaker=breaker, label="Claude")
+
+        tool_handlers = {
+            "execute_code": execute_tool,
+            "read_execution_output": lambda tool_input: get_execution_history().read_lines(
+                tool_input["execution_id"],
+                tool_input.get("start_line", 0),
+                min(tool_input.get("max_lines", 100), 200)
+            ),
+        }
+        runner = get_tool_runner(AGENT_TOOL_CONCURRENCY)
+        # Large outputs are shortened before being resent on every iteration
+        compactor = ToolResultCompactor()
+        deadline = time.monotonic() + AGENT_TIME_BUDGET
 
         # Initial Claude response
-        response = client.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            max_tokens=4096,
-            tools=tools,
-            messages=api_messages
-        )
+        response = create_message()
 
-        # Handle tool use in an agentic loop
+        # Handle tool use in an agentic loop: every tool call of a turn runs
+        # concurrently, within an iteration and wall-clock budget
+        iterations = 0
         while response.stop_reason == "tool_use":
-            tool_use_block = next(b for b in response.content if b.type == "tool_use")
-            tool_name = tool_use_block.name
-            tool_input = tool_use_block.input
-
-            if tool_name == "execute_code":
-                result = execute_code_remote(tool_input["code"], tool_input.get("language", "javascript"))
-
-                # Add assistant response and tool result to messages
-                api_messages.append({"role": "assistant", "content": response.content})
-                api_messages.append({
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "tool_result",
-                            "tool_use_id": tool_use_block.id,
-                            "content": json.dumps(result)
-                        }
-                    ]
-                })
+            tool_uses = [b for b in response.content if b.type == "tool_use"]
+            conversation.append(Message(role="assistant", content=response.content))
+            iterations += 1
+            remaining = deadline - time.monotonic()
+            if iterations > AGENT_MAX_ITERATIONS or remaining <= 0:
+                # Answer the pending calls without running them and ask for a final reply
+                results = [
+                    tool_result(b.id, "Tool budget exhausted; answer with the results so far.", is_error=True)
+                    for b in tool_uses
+                ]
+                conversation.append(Message(role="user", content=results))
+                response = create_message()
+                break
+            results = runner.run(
+                tool_uses, tool_handlers, timeout=remaining, compactor=compactor,
+                # Runs in one session must see each other's state, so they keep their order
+                serial_key=lambda b: b.input.get("session_id") if b.name == "execute_code" else None
+            )
+            conversation.append(Message(role="user", content=results))
 
-                # Get next response
-                response = client.messages.create(
-                    model="claude-3-5-sonnet-20241022",
-                    max_tokens=4096,
-                    tools=tools,
-                    messages=api_messages
-                )
+            # Get next response
+            response = create_message()
 
         # Extract final text response
         text_blocks = [b for b in response.content if hasattr(b, 'text')]
-        return "".join(b.text for b in text_blocks) if text_blocks else ""
+        text = "".join(b.text for b in text_blocks) if text_blocks else ""
+        if response.stop_reason == "tool_use":
+            text += f"\n\n_(Stopped after {iterations - 1} tool rounds: agent budget reached.)_"
+        return text
 
     # 4b. ARCHIVAL SYSTEM
     def manage_archive():
         chat_files = sorted([f for f in os.listdir(CHAT_DIR) if f.endswith('.json')])
-        if len(chat_files) > 10:
-            oldest_file = chat_files[0]
+        if len(chat_files) <= 10:
+            return
+
+        # Summaries are not interactive: send every overflow chat as one batch
+        overflow = chat_files[:-10]
+        summary_requests = []
+        for oldest_file in overflow:
             file_path = os.path.join(CHAT_DIR, oldest_file)
             with open(file_path, 'r') as f:
                 chat_history = json.load(f)
@@ -209,104 +323,54 @@ if st.session_state['tab'] == 'Chat':
                 start = chat_history[0]['content'][:200]
                 end = chat_history[-1]['content'][:200]
                 prompt_text = f"Start: {start} ... End: {end}"
-            try:
-                summary_response = zai_client.chat.completions.create(
-                    model="glm-4.7-flash",
-                    messages=[{"role": "user", "content": f"Summarize in 3 bullets. Date: {oldest_file}. Context: {prompt_text}"}]
-                )
-                summary = summary_response.choices[0].message.content
-            except:
-                summary = "Summary failed."
-            archive = []
-            if os.path.exists(ARCHIVE_FILE):
-                with open(ARCHIVE_FILE, 'r') as f:
-                    archive = json.load(f)
+            summary_requests.append(BatchRequest(
+                custom_id=oldest_file,
+                messages=[Message(role="user", content=f"Summarize in 3 bullets. Date: {oldest_file}. Context: {prompt_text}")],
+                params={"priority": PRIORITY_BACKGROUND}
+            ))
+
+        try:
+            batch_id = glm_provider.submit_batch(summary_requests)
+            results = glm_provider.poll_batch(batch_id, wait=True, timeout=120).results
+        except Exception:
+            results = {}
+
+        archive = []
+        if os.path.exists(ARCHIVE_FILE):
+            with open(ARCHIVE_FILE, 'r') as f:
+                archive = json.load(f)
+        for oldest_file in overflow:
+            result = results.get(oldest_file, {})
+            if "response" not in result:
+                # Keep the chat; the next run retries its summary
+                continue
             archive.insert(0, {
                 "date": oldest_file,
-                "summary": summary
+                "summary": result["response"]["content"]
             })
-            if len(archive) > 50:
-                archive = archive[:50]
-            with open(ARCHIVE_FILE, 'w') as f:
-                json.dump(archive, f)
-            os.remove(file_path)
+            os.remove(os.path.join(CHAT_DIR, oldest_file))
+            conversation_manager.delete_summary(oldest_file)
+        if len(archive) > 50:
+            archive = archive[:50]
+        with open(ARCHIVE_FILE, 'w') as f:
+            json.dump(archive, f)
 
     # 4b. MEMORY ENGINE
-    def get_memory():
-        if os.path.exists(MEMORY_FILE):
-            try:
-                with open(MEMORY_FILE, 'r') as f:
-                    mem = json.load(f)
-                    if len(mem) > 20: return mem[-20:]
-                    return mem
-            except: return []
-        return []
-
-    def update_memory(user_input, ai_response):
-        existing_facts = get_memory()
-        text_lower = f"{user_input} {ai_response}".lower()
-        updated_memory = existing_facts
-        
-        if "forget" in text_lower or "delete" in text_lower or "erase" in text_lower:
-            prompt = f"The user wants to forget something. Look at their input. Return a JSON list of facts to KEEP (Remove the relevant ones). Existing Facts: {json.dumps(existing_facts)} User: {user_input}"
-            try:
-                response = zai_client.chat.completions.create(
-                    model="glm-4.7-flash",
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                raw = response.choices[0].message.content
-                clean = raw.strip()
-                if "```json" in clean: clean = clean.split("```json")[1].split("```")[0]
-                updated_memory = json.loads(clean)
-            except: pass
-            with open(MEMORY_FILE, 'w') as f:
-                json.dump(updated_memory, f)
-            return
-
-        if "remember" in text_lower or "new name is" in text_lower or "my name is" in text_lower:
-            prompt = f"Extract the specific fact the user wants remembered. User: {user_input}. Return ONLY a JSON list with the new fact."
-            try:
-                response = zai_client.chat.completions.create(
-                    model="glm-4.7-flash",
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                raw = response.choices[0].message.content.strip()
-                if "```json" in raw: raw = raw.split("```json")[1].split("```")[0]
-                new_facts = json.loads(raw)
-                if not isinstance(new_facts, list): new_facts = []
-                
-                for fact in new_facts:
-                    if fact not in updated_memory:
-                        updated_memory.append(fact)
-            except: pass
-            with open(MEMORY_FILE, 'w') as f:
-                json.dump(updated_memory, f)
-            return
-
-        prompt = f"Extract NEW facts about the user from this text. Return ONLY a JSON list. Existing Knowledge (DO NOT REPEAT): {json.dumps(existing_facts)} \n\n Text: {user_input} \n\n AI Response: {ai_response}"
-        try:
-            response = zai_client.chat.completions.create(
-                model="glm-4.7-flash",
-                messages=[{"role": "user", "content": prompt}]
-            )
-            raw_text = response.choices[0].message.content
-            clean_json = raw_text.strip()
-            if "```json" in clean_json: clean_json = clean_json.split("```json")[1].split("```")[0]
-            elif "```" in clean_json: clean_json = clean_json.split("```")[1].split("```")[0]
-            
-            try:
-                new_facts = json.loads(clean_json)
-                if not isinstance(new_facts, list): new_facts = []
-            except: new_facts = []
-                
-            for fact in new_facts:
-                if fact not in updated_memory:
-                    updated_memory.append(fact)
-            
-            with open(MEMORY_FILE, 'w') as f:
-                json.dump(updated_memory, f)
-            
-        except Exception as e: pass
+    def get_memory(query):
+        memory_bank = get_memory_bank()
+        memory_index = get_memory_index()
+        # Both are cached against the bank version: unchanged turns skip the disk
+        memory_bank.derive("memory_index", memory_index.sync)
+        return memory_bank.derive(("memories", query), lambda facts: memory_index.search(query))
+
+    def get_memory_string(query):
+        return get_memory_bank().derive(("memory_string", query), lambda facts: ". ".join(get_memory(query)))
+
+    memory_worker = get_memory_worker(
+        lambda prompt: glm_provider.create_completion(
+            [Message(role="user", content=prompt)], priority=PRIORITY_BACKGROUND
+        )
+    )
 
     # 4c. SIDEBAR UI - CHAT HISTORY BROWSER
     st.sidebar.title("💾 Chat History")
@@ -315,11 +379,14 @@ if st.session_state['tab'] == 'Chat':
     if 'current_chat_id' not in st.session_state:
         st.session_state['current_chat_id'] = None
         st.session_state.messages = []
+    if 'compaction' not in st.session_state:
+        st.session_state['compaction'] = CompactionState()
 
     # New Chat button
     if st.sidebar.button("➕ New Chat", use_container_width=True):
         st.session_state['current_chat_id'] = None
         st.session_state.messages = []
+        st.session_state['compaction'] = CompactionState()
         st.rerun()
 
     st.sidebar.divider()
@@ -364,6 +431,7 @@ if st.session_state['tab'] == 'Chat':
                     with open(file_path, 'r') as f:
                         st.session_state.messages = json.load(f)
                     st.session_state['current_chat_id'] = chat_file
+                    st.session_state['compaction'] = conversation_manager.load_summary(chat_file)
                     st.rerun()
 
             except Exception as e:
@@ -380,8 +448,12 @@ if st.session_state['tab'] == 'Chat':
             if os.path.exists(file_to_delete):
                 os.remove(file_to_delete)
                 st.success("Chat deleted!")
+            conversation_manager.delete_summary(st.session_state['current_chat_id'])
+            if LOCAL_EXECUTION:
+                get_local_executor().close_sessions(f"{st.session_state['current_chat_id']}:")
             st.session_state['current_chat_id'] = None
             st.session_state.messages = []
+            st.session_state['compaction'] = CompactionState()
             st.rerun()
 
     st.sidebar.divider()
@@ -403,9 +475,6 @@ if st.session_state['tab'] == 'Chat':
                 st.markdown(f"**{item['date']}**")
                 st.caption(f"🔹 {item['summary']}")
 
-    def trim_history(messages, limit=20):
-        return messages[-limit:]
-
     # 4d. CHAT DISPLAY
     for message in st.session_state.messages:
         with st.chat_message(message["role"]):
@@ -416,13 +485,17 @@ if st.session_state['tab'] == 'Chat':
         has_image = uploaded_file is not None
         
         if has_image:
-            if "GLM" in model_choice:
+            if "Claude" not in model_choice:
                 st.error("🚫 **GLM is text-only!** Please switch sidebar to **Claude** to analyze screenshots.")
                 st.stop()
             if not prompt:
                 prompt = "What is this?"
 
         st.session_state.messages.append({"role": "user", "content": prompt})
+        # Name new chats up front: the chat id also keys its execution sessions
+        if st.session_state['current_chat_id'] is None:
+            timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+            st.session_state['current_chat_id'] = f"{timestamp}.json"
         
         with st.chat_message("user"):
             if has_image:
@@ -433,8 +506,11 @@ if st.session_state['tab'] == 'Chat':
             message_placeholder = st.empty()
             full_response = ""
 
-            api_messages = trim_history(st.session_state.messages)
-            memories = get_memory()
+            api_messages, history_summary = compactor.window(
+                st.session_state.messages, st.session_state['compaction']
+            )
+            history_context = f"Summary of earlier conversation: {history_summary}\n\n" if history_summary else ""
+            memories = get_memory(prompt)
             
             if has_image:
                 base64_image = base64.b64encode(uploaded_file.read()).decode('utf-8')
@@ -449,59 +525,89 @@ if st.session_state['tab'] == 'Chat':
                     },
                     {
                         "type": "text", 
-                        "text": f"Context about user: {json.dumps(memories)}. \n\nUser Question: {prompt}"
+                        "text": f"Context about user: {json.dumps(memories)}. \n\n{history_context}User Question: {prompt}"
                     }
                 ]
                 try:
                     # Use agentic code execution with vision
-                    full_response = chat_with_code_execution(api_messages + [vision_message], model_choice)
+                    full_response = chat_with_code_execution(
+                        api_messages + [{"role": "user", "content": vision_message}], model_choice
+                    )
                     if not full_response:
                         full_response = "Claude Error: No response generated"
                 except Exception as e:
                     full_response = f"Claude Error: {e}"
 
             else:
-                memory_string = ". ".join(memories)
-                system_prompt = f"Here is what you know about user: {memory_string}\n\nConversation:"
+                memory_string = get_memory_string(prompt)
+                system_prompt = f"Here is what you know about user: {memory_string}\n\n{history_context}Conversation:"
                 api_messages.insert(0, {"role": "system", "content": system_prompt})
 
                 if "GLM" in model_choice:
                     try:
-                        response = zai_client.chat.completions.create(
-                            model="glm-4.7-flash",
-                            messages=api_messages
+                        full_response = glm_chat.create_completion(
+                            [Message(role=m["role"], content=m["content"]) for m in api_messages]
                         )
-                        full_response = response.choices[0].message.content
                     except Exception as e:
                         full_response = f"GLM Error: {e}"
 
+                elif "Mako" in model_choice:
+                    if not mako_provider:
+                        full_response = "⚠️ No Claude Key found."
+                    else:
+                        try:
+                            hybrid_result = None
+                            for event in mako_provider.stream_events(
+                                [Message(role=m["role"], content=m["content"]) for m in api_messages]
+                            ):
+                                if event["type"] == "final":
+                                    full_response += event["text"]
+                                    message_placeholder.markdown(full_response + "▌")
+                                elif event["type"] == "done":
+                                    hybrid_result = event["result"]
+                            timings = hybrid_result["timings"]
+                            stage = "refined by Claude" if hybrid_result["refined"] else "GLM draft kept"
+                            st.caption(f"⏱️ draft {timings['draft_seconds']:.1f}s · {stage} · total {timings['total_seconds']:.1f}s")
+                        except Exception as e:
+                            full_response = f"Mako Error: {e}"
+
                 elif "Claude" in model_choice:
                     if not ANTHROPIC_KEY:
                         full_response = "⚠️ No Claude Key found."
                     else:
                         try:
                             # Use agentic code execution
-                            full_response = chat_with_code_execution(api_messages, model_choice)
+                            full_response = chat_with_code_execution(
+                                api_messages, model_choice, st.session_state['current_chat_id']
+                            )
                             if not full_response:
                                 full_response = "Claude Error: No response generated"
                         except Exception as e:
                             full_response = f"Claude Error: {e}"
+                            # Only an outage fails over; a rejected request should show its error
+                            if claude_fallback and (isinstance(e, CircuitOpenError) or is_retryable(e)):
+                                try:
+                                    full_response = claude_fallback.create_completion(
+                                        [Message(role=m["role"], content=m["content"]) for m in api_messages]
+                                    )
+                                except Exception:
+                                    pass
 
             message_placeholder.markdown(full_response)
 
         st.session_state.messages.append({"role": "assistant", "content": full_response})
-        update_memory(prompt, full_response)
+        memory_worker.enqueue(prompt, full_response)
         manage_archive()
 
-        if st.session_state['current_chat_id'] is None:
-            timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-            filename = f"{timestamp}.json"
-            st.session_state['current_chat_id'] = filename
-        
         file_path = os.path.join(CHAT_DIR, st.session_state['current_chat_id'])
         with open(file_path, 'w') as f:
             json.dump(st.session_state.messages, f)
 
+        compaction, compacted = compactor.refresh(st.session_state.messages, st.session_state['compaction'])
+        if compacted:
+            st.session_state['compaction'] = compaction
+            conversation_manager.save_summary(st.session_state['current_chat_id'], compaction)
+
 # --- 5. TERMINAL TAB ---
 elif st.session_state['tab'] == 'Terminal':
     st.header("💻 System Terminal")
@@ -552,12 +658,15 @@ elif st.session_state['tab'] == 'CodeExecution':
     st.header("⚙️ Code Execution Engine")
     st.caption("Execute code snippets safely using the backend execution server.")
 
-    # Initialize execution history in session state
-    if 'execution_history' not in st.session_state:
-        st.session_state['execution_history'] = []
+    # Page of the persistent execution history being shown
+    if 'execution_history_page' not in st.session_state:
+        st.session_state['execution_history_page'] = 0
 
     # Configuration
     SERVER_URL = st.sidebar.text_input("Server URL", value=EXECUTE_API_URL)
+    if get_execution_client(SERVER_URL).cache_results:
+        cache_stats = get_execution_client(SERVER_URL).cache_stats()
+        st.sidebar.caption(f"Result cache: {cache_stats['hits']} hits · {cache_stats['misses']} misses")
 
     # Language selection
     language = st.selectbox("Select Language", ["python", "javascript"])
@@ -604,33 +713,44 @@ elif st.session_state['tab'] == 'CodeExecution':
         st.subheader("⏳ Executing...")
 
         try:
-            import time
             start_time = time.time()
-            with st.spinner(f"Executing {language} code..."):
-                response = requests.post(
-                    f"{SERVER_URL}/api/execute/run",
-                    json={"code": code_input, "language": language},
-                    timeout=10
-                )
+            if LOCAL_EXECUTION and language == "python":
+                with st.spinner(f"Executing {language} code..."):
+                    result = get_local_executor().execute(code_input, language)
+            else:
+                # Stream output into the page as the process produces it
+                live_output = st.empty()
+                streamed = {"stdout": "", "stderr": ""}
+                result = {}
+                for event in get_execution_client(SERVER_URL).execute_stream(code_input, language):
+                    if event["type"] == "exit":
+                        result = event
+                        break
+                    streamed[event["type"]] += event["chunk"]
+                    live_output.code(streamed["stdout"] + streamed["stderr"], language="text")
+                live_output.empty()
+                result["output"] = streamed["stdout"]
+                if result.get("timedOut"):
+                    streamed["stderr"] += "\nExecution timed out"
+                elif result.get("truncated"):
+                    streamed["stderr"] += "\nOutput limit reached"
+                result["error"] = streamed["stderr"] or result.get("error")
             execution_time = time.time() - start_time
 
-            if response.status_code == 200:
-                result = response.json()
-
-                # Add to history
-                execution_record = {
-                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    "language": language,
-                    "success": result.get('success'),
-                    "output": result.get('output'),
-                    "error": result.get('error'),
-                    "execution_id": result.get('executionId'),
-                    "duration": f"{execution_time:.2f}s"
-                }
-                st.session_state['execution_history'].insert(0, execution_record)
+            if "executionId" in result or result.get("success"):
+                # The client and local executor record the run in the history store
+                st.session_state['execution_history_page'] = 0
 
                 if result.get('success'):
                     st.success("✅ Execution Successful")
+                    if result.get('cached'):
+                        st.caption("⚡ Served from the result cache")
+                    usage = result.get("usage") or {}
+                    if usage.get("cpu_user_ms") is not None:
+                        st.caption(
+                            f"CPU {usage['cpu_user_ms'] + usage['cpu_sys_ms']:.0f} ms · "
+                            f"peak RSS {usage['peak_rss_mb']:.0f} MB · {usage['output_bytes']} output bytes"
+                        )
                     col1, col2, col3 = st.columns(3)
                     with col1:
                         st.metric("Status", "Success ✅")
@@ -656,30 +776,30 @@ elif st.session_state['tab'] == 'CodeExecution':
                         st.subheader("⚠️ Error:")
                         st.code(result['error'], language="text")
             else:
-                st.error(f"Server Error: {response.status_code}")
-                st.code(response.text, language="text")
-
-        except requests.exceptions.ConnectionError:
-            st.error("❌ Cannot connect to execution server. Make sure it's running on " + SERVER_URL)
-            st.info("Start the server with: `cd server && npm install && npm start`")
-        except requests.exceptions.Timeout:
-            st.error("❌ Code execution timed out (>10 seconds)")
+                st.error(f"❌ {result.get('error')}")
+                if "Cannot connect" in str(result.get("error")):
+                    st.info("Start the server with: `cd server && npm install && npm start`")
+
         except Exception as e:
             st.error(f"❌ Error: {str(e)}")
 
-    # Execution history section
-    if st.session_state['execution_history']:
+    # Execution history section, one page at a time
+    history_page = get_execution_client(SERVER_URL).list_execution_history(
+        st.session_state['execution_history_page']
+    )
+    if history_page['total']:
         st.divider()
         st.subheader("📋 Execution History")
 
         # Display history in expandable sections
-        for i, record in enumerate(st.session_state['execution_history']):
+        for record in history_page['records']:
             status_icon = "✅" if record['success'] else "❌"
-            with st.expander(f"{status_icon} [{record['timestamp']}] {record['language'].upper()} - {record['duration']}"):
+            duration = f"{record['duration_ms'] / 1000:.2f}s" if record.get('duration_ms') is not None else "n/a"
+            with st.expander(f"{status_icon} [{record['timestamp']}] {record['language'].upper()} - {duration}"):
                 col1, col2 = st.columns(2)
                 with col1:
                     st.write(f"**Status:** {'Success' if record['success'] else 'Failed'}")
-                    st.write(f"**Duration:** {record['duration']}")
+                    st.write(f"**Duration:** {duration}")
                     st.write(f"**Language:** {record['language'].upper()}")
                 with col2:
                     st.write(f"**Execution ID:** `{record['execution_id']}`")
@@ -691,3 +811,15 @@ elif st.session_state['tab'] == 'CodeExecution':
                 elif record['error']:
                     st.write("**Error:**")
                     st.code(record['error'], language="text")
+
+        col_prev, col_info, col_next = st.columns([1, 2, 1])
+        with col_prev:
+            if st.button("← Newer", disabled=history_page['page'] == 0):
+                st.session_state['execution_history_page'] -= 1
+                st.rerun()
+        with col_info:
+            st.caption(f"Page {history_page['page'] + 1} of {history_page['pages']} · {history_page['total']} executions")
+        with col_next:
+            if st.button("Older →", disabled=history_page['page'] + 1 >= history_page['pages']):
+                st.session_state['execution_history_page'] += 1
+                st.rerun()
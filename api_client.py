@@ -3,30 +3,95 @@ MAiKO API Client
 Abstraction layer for code execution backend communication
 """
 import requests
+import json
 import logging
-from typing import Dict, Any, Optional
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Dict, Any, Iterator, List, Optional
 from config import config
+from execution_config import DEFAULT_SANDBOX
+from code_validator import CodeValidator
+from cache_manager import InMemoryCacheBackend, get_cache_manager
+from execution_history import get_execution_history
+from execution_cache import execution_cache_key, is_cacheable, is_reusable_result
+from execution_limits import get_execution_limiter, usage_bytes
+from telemetry import get_execution_telemetry
 
 logger = logging.getLogger(__name__)
 
 class CodeExecutionClient:
     """Client for communicating with code execution backend"""
 
-    def __init__(self, base_url: str = None, timeout: int = None):
+    def __init__(
+        self,
+        base_url: str = None,
+        timeout: int = None,
+        pool_size: int = None,
+        retries: int = None,
+        cache_ttl: int = None,
+        cache_results: bool = None
+    ):
         """
         Initialize the code execution client
 
         Args:
             base_url: Base URL of the code execution server
             timeout: Request timeout in seconds
+            pool_size: Keep-alive connections kept open to the server
+            retries: Retries for idempotent (GET) requests
+            cache_ttl: Seconds to cache health and language lookups
+            cache_results: Reuse results of deterministic snippets
         """
-        self.base_url = base_url or config.EXECUTE_API_URL
+        self.base_url = (base_url or config.EXECUTE_API_URL).rstrip("/")
         self.timeout = timeout or config.EXECUTE_API_TIMEOUT
+        self.cache_ttl = config.EXECUTE_API_CACHE_TTL if cache_ttl is None else cache_ttl
+        self.session = self._build_session(
+            pool_size or config.EXECUTE_API_POOL_SIZE,
+            config.EXECUTE_API_RETRIES if retries is None else retries
+        )
+        self._cache = InMemoryCacheBackend(max_size=16)
+        self.cache_results = config.EXECUTE_RESULT_CACHE if cache_results is None else cache_results
+        self.sandbox = DEFAULT_SANDBOX
+        self.result_cache = get_cache_manager()
+        self.validator = CodeValidator(self.sandbox)
+        self.limiter = get_execution_limiter()
+        self.history = get_execution_history()
+
+    @staticmethod
+    def _build_session(pool_size: int, retries: int) -> requests.Session:
+        """Pooled keep-alive session; only GETs are retried (runs are not idempotent)"""
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.2,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({"GET"}),
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _cached(self, key: str, fetch):
+        """Return a recent value for key, fetching it when stale"""
+        value = self._cache.get(key)
+        if value is None:
+            value = fetch()
+            if self.cache_ttl > 0:
+                self._cache.set(key, value, ttl_seconds=self.cache_ttl)
+        return value
 
     def health_check(self) -> bool:
         """Check if backend is healthy"""
+        return self._cached("health", self._fetch_health)
+
+    def _fetch_health(self) -> bool:
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/health",
                 timeout=self.timeout
             )
@@ -35,31 +100,86 @@ class CodeExecutionClient:
             logger.error(f"Health check failed: {e}")
             return False
 
-    def execute_code(self, code: str, language: str) -> Dict[str, Any]:
+    def execute_code(
+        self,
+        code: str,
+        language: str,
+        timeout_ms: int = None,
+        use_cache: bool = None,
+        user_id: str = "default"
+    ) -> Dict[str, Any]:
         """
         Execute code on the backend
 
         Args:
             code: Code to execute
             language: Programming language (python, javascript)
+            timeout_ms: Execution timeout requested from the server
+            use_cache: Override the client's cache_results setting
+            user_id: Whose rate limits and quotas the run counts against
 
         Returns:
-            Dictionary with execution result
+            Dictionary with execution result ("cached" is set on cache hits,
+            "rateLimited" and "retryAfter" when a limit was hit)
         """
+        error = self.validator.validate(code, language)
+        if error:
+            return {"success": False, "error": error, "output": None}
+        use_cache = self.cache_results if use_cache is None else use_cache
+        if not use_cache or not is_cacheable(code, language, self.sandbox):
+            return self._limited_execute(code, language, timeout_ms, user_id)
+
+        computed = []
+
+        def compute():
+            computed.append(True)
+            return self._limited_execute(code, language, timeout_ms, user_id)
+
+        result = self.result_cache.get_cached_or_compute(
+            execution_cache_key(code, language, self.sandbox, self.base_url),
+            compute,
+            ttl_seconds=config.EXECUTE_RESULT_CACHE_TTL,
+            should_cache=is_reusable_result
+        )
+        return {**result, "cached": not computed}
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss statistics of the execution result cache"""
+        return self.result_cache.stats()
+
+    def _limited_execute(self, code: str, language: str, timeout_ms: int, user_id: str) -> Dict[str, Any]:
+        """Run through the execution limits; cache hits never get here"""
+        decision = self.limiter.acquire(user_id)
+        if not decision.allowed:
+            return decision.to_result()
+        result = self._execute(code, language, timeout_ms)
+        self._record_usage(user_id, code, result.get("output"), result.get("error"))
+        self.history.add(result, language, code)
+        return result
+
+    def _record_usage(self, user_id: str, code: str, *outputs: Optional[str]):
+        self.limiter.record_usage(user_id, usage_bytes(code, *outputs))
+
+    def _execute(self, code: str, language: str, timeout_ms: int = None) -> Dict[str, Any]:
+        payload = {"code": code, "language": language}
+        timeout = self.timeout
+        if timeout_ms:
+            payload["timeout"] = timeout_ms
+            timeout = max(timeout, timeout_ms // 1000 + 2)
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/api/execute/run",
-                json={"code": code, "language": language},
-                timeout=self.timeout
+                json=payload,
+                timeout=timeout
             )
 
             if response.status_code == 200:
-                return response.json()
+                return self._with_usage(response.json(), language)
             else:
                 logger.error(f"Execution failed with status {response.status_code}")
                 return {
                     "success": False,
-                    "error": f"Server error: {response.status_code}",
+                    "error": self._server_error(response),
                     "output": None
                 }
 
@@ -85,10 +205,261 @@ class CodeExecutionClient:
                 "output": None
             }
 
+    def execute_stream(
+        self,
+        code: str,
+        language: str,
+        timeout_ms: int = None,
+        max_output_size: int = None,
+        user_id: str = "default"
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Execute code on the backend, yielding output as it is produced
+
+        Args:
+            code: Code to execute
+            language: Programming language (python, javascript)
+            timeout_ms: Execution timeout requested from the server
+            max_output_size: Most output characters to accept
+            user_id: Whose rate limits and quotas the run counts against
+
+        Yields:
+            {"type": "stdout" | "stderr", "chunk": str} events, then one
+            {"type": "exit", "success": bool, ...} event
+        """
+        error = self.validator.validate(code, language)
+        if error:
+            yield {"type": "exit", "success": False, "error": error}
+            return
+        if not self.cache_results or not is_cacheable(code, language, self.sandbox):
+            yield from self._limited_stream(code, language, timeout_ms, max_output_size, user_id)
+            return
+
+        key = execution_cache_key(code, language, self.sandbox, self.base_url)
+        cached = self.result_cache.lookup(key)
+        if cached is not None:
+            if cached.get("output"):
+                yield {"type": "stdout", "chunk": cached["output"]}
+            if cached.get("error"):
+                yield {"type": "stderr", "chunk": cached["error"]}
+            yield {"type": "exit", "success": True, "executionId": cached["executionId"], "cached": True}
+            return
+
+        streamed = {"stdout": "", "stderr": ""}
+        for event in self._limited_stream(code, language, timeout_ms, max_output_size, user_id):
+            if event["type"] == "exit":
+                result = {
+                    "success": event.get("success") and not event.get("truncated"),
+                    "output": streamed["stdout"],
+                    "error": streamed["stderr"] or None,
+                    "executionId": event.get("executionId"),
+                }
+                if is_reusable_result(result):
+                    self.result_cache.store(key, result, config.EXECUTE_RESULT_CACHE_TTL)
+            else:
+                streamed[event["type"]] += event["chunk"]
+            yield event
+
+    def _limited_stream(
+        self,
+        code: str,
+        language: str,
+        timeout_ms: int,
+        max_output_size: int,
+        user_id: str
+    ) -> Iterator[Dict[str, Any]]:
+        decision = self.limiter.acquire(user_id)
+        if not decision.allowed:
+            yield {"type": "exit", **decision.to_result()}
+            return
+        streamed = {"stdout": [], "stderr": []}
+        try:
+            for event in self._stream_events(code, language, timeout_ms, max_output_size):
+                if event["type"] == "exit":
+                    self.history.add(
+                        {**event, "output": "".join(streamed["stdout"]),
+                         "error": "".join(streamed["stderr"]) or event.get("error")},
+                        language, code
+                    )
+                else:
+                    streamed[event["type"]].append(event["chunk"])
+                yield event
+        finally:
+            self._record_usage(user_id, code, *streamed["stdout"], *streamed["stderr"])
+
+    def _stream_events(
+        self,
+        code: str,
+        language: str,
+        timeout_ms: int = None,
+        max_output_size: int = None
+    ) -> Iterator[Dict[str, Any]]:
+        limit = max_output_size or DEFAULT_SANDBOX.max_output_size
+        payload = {"code": code, "language": language, "maxOutputSize": limit}
+        read_timeout = self.timeout
+        if timeout_ms:
+            payload["timeout"] = timeout_ms
+            read_timeout = max(read_timeout, timeout_ms // 1000 + 2)
+
+        try:
+            response = self.session.post(
+                f"{self.base_url}/api/execute/stream",
+                json=payload,
+                stream=True,
+                timeout=(self.timeout, read_timeout)
+            )
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Streaming execution failed: {e}")
+            yield {"type": "exit", "success": False, "error": f"Cannot connect to execution server at {self.base_url}"}
+            return
+
+        with response:
+            if response.status_code != 200:
+                yield {"type": "exit", "success": False, "error": self._server_error(response)}
+                return
+
+            received = 0
+            event_type, data = None, []
+            try:
+                for line in response.iter_lines(decode_unicode=True):
+                    if line.startswith("event:"):
+                        event_type = line[6:].strip()
+                    elif line.startswith("data:"):
+                        data.append(line[5:].strip())
+                    elif not line and event_type:
+                        event = {"type": event_type, **json.loads("\n".join(data))}
+                        event_type, data = None, []
+                        if event["type"] == "exit":
+                            yield self._with_usage(event, language)
+                            return
+                        # Enforce the output cap here too, in case the server allows more
+                        remaining = limit - received
+                        chunk = event.get("chunk", "")
+                        if len(chunk) > remaining:
+                            yield {"type": event["type"], "chunk": chunk[:remaining]}
+                            yield {"type": "exit", "success": False, "truncated": True,
+                                   "error": f"Output exceeded {limit} bytes"}
+                            return
+                        received += len(chunk)
+                        yield event
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Streaming execution interrupted: {e}")
+                yield {"type": "exit", "success": False, "error": f"Stream interrupted: {e}"}
+                return
+        yield {"type": "exit", "success": False, "error": "Stream ended without a result"}
+
+    def execute_many(
+        self,
+        snippets: List[Dict[str, Any]],
+        concurrency: int = None,
+        user_id: str = "default"
+    ) -> List[Dict[str, Any]]:
+        """
+        Execute several snippets concurrently on the backend
+
+        Args:
+            snippets: List of {"code": ..., "language": ...}
+            concurrency: Most snippets running at once (capped by the server)
+            user_id: Whose rate limits and quotas the runs count against
+
+        Returns:
+            One result per snippet, in order, each with a durationMs timing
+            (or rateLimited and retryAfter when it was not sent)
+        """
+        if not snippets:
+            return []
+        # Snippets breaking the sandbox rules are answered here, not sent
+        # and each one sent takes an execution slot
+        results: List[Optional[Dict[str, Any]]] = []
+        for i, snippet in enumerate(snippets):
+            error = self.validator.validate(snippet.get("code"), snippet.get("language") or "")
+            if error:
+                results.append({"index": i, "success": False, "error": error, "output": None})
+                continue
+            decision = self.limiter.acquire(user_id)
+            results.append(None if decision.allowed else {"index": i, **decision.to_result()})
+        pending = [i for i, result in enumerate(results) if result is None]
+        if pending:
+            for position, result in zip(pending, self._execute_batch([snippets[i] for i in pending], concurrency)):
+                results[position] = {**result, "index": position}
+                self._record_usage(user_id, snippets[position]["code"], result.get("output"), result.get("error"))
+                self.history.add(result, snippets[position].get("language"), snippets[position]["code"])
+        return results
+
+    def _execute_batch(
+        self,
+        snippets: List[Dict[str, Any]],
+        concurrency: int = None
+    ) -> List[Dict[str, Any]]:
+        concurrency = max(1, concurrency or config.EXECUTE_BATCH_CONCURRENCY)
+        waves = math.ceil(len(snippets) / concurrency)
+        timeout = max(self.timeout, waves * (config.EXECUTION_TIMEOUT + 1) + 2)
+        try:
+            response = self.session.post(
+                f"{self.base_url}/api/execute/run-batch",
+                json={"items": snippets, "concurrency": concurrency},
+                timeout=timeout
+            )
+            if response.status_code == 200:
+                return [
+                    self._with_usage(result, snippet.get("language"))
+                    for result, snippet in zip(response.json().get("results", []), snippets)
+                ]
+            if response.status_code != 404:
+                error = self._server_error(response)
+                logger.error(f"Batch execution failed: {error}")
+                return [
+                    {"index": i, "success": False, "error": error, "output": None}
+                    for i in range(len(snippets))
+                ]
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Batch execution failed: {e}")
+            return [
+                {"index": i, "success": False, "error": str(e), "output": None}
+                for i in range(len(snippets))
+            ]
+
+        # Older servers without /run-batch: fan out over the pooled session
+        def run(indexed):
+            index, snippet = indexed
+            start = time.time()
+            result = self._execute(snippet.get("code"), snippet.get("language"))
+            return {**result, "index": index, "durationMs": int((time.time() - start) * 1000)}
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return list(pool.map(run, enumerate(snippets)))
+
+    @staticmethod
+    def _with_usage(result: Dict[str, Any], language: str) -> Dict[str, Any]:
+        """
+        Attach a "usage" dict in the local executor's shape and record it.
+        The server measures wall time, output bytes and exit code only.
+        """
+        if "durationMs" in result:
+            result["usage"] = {
+                "wall_ms": result["durationMs"],
+                "output_bytes": result.get("outputBytes"),
+                "exit_code": result.get("exitCode"),
+            }
+            get_execution_telemetry().record(language, result["usage"])
+        return result
+
+    @staticmethod
+    def _server_error(response: requests.Response) -> str:
+        """Error message from the server body, falling back to the status"""
+        try:
+            error = response.json().get("error")
+        except ValueError:
+            error = None
+        return f"Server error: {response.status_code}" + (f" - {error}" if error else "")
+
     def get_languages(self) -> list:
         """Get list of supported languages"""
+        return self._cached("languages", self._fetch_languages)
+
+    def _fetch_languages(self) -> list:
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/api/execute/languages",
                 timeout=self.timeout
             )
@@ -99,9 +470,12 @@ class CodeExecutionClient:
         return config.SUPPORTED_LANGUAGES
 
     def get_execution_history(self, execution_id: str) -> Optional[Dict]:
-        """Get cached execution result"""
+        """Get a past execution, from the local history store or the server"""
+        record = self.history.get(execution_id)
+        if record is not None:
+            return record
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/api/execute/history/{execution_id}",
                 timeout=self.timeout
             )
@@ -111,13 +485,24 @@ class CodeExecutionClient:
             logger.error(f"Failed to fetch execution history: {e}")
         return None
 
+    def list_execution_history(self, page: int = 0, page_size: int = None, language: str = None) -> Dict[str, Any]:
+        """
+        Page through past executions, newest first
+
+        Returns:
+            {"records": [...], "total": int, "page": int, "page_size": int, "pages": int}
+        """
+        return self.history.page(page, page_size, language)
+
 
-# Global client instance
-_execution_client = None
+# Global client instances, one pooled session per server URL
+_execution_clients: Dict[str, CodeExecutionClient] = {}
+_execution_clients_lock = threading.Lock()
 
-def get_execution_client() -> CodeExecutionClient:
-    """Get or create the code execution client"""
-    global _execution_client
-    if _execution_client is None:
-        _execution_client = CodeExecutionClient()
-    return _execution_client
+def get_execution_client(base_url: str = None) -> CodeExecutionClient:
+    """Get or create the code execution client for a server URL"""
+    base_url = (base_url or config.EXECUTE_API_URL).rstrip("/")
+    with _execution_clients_lock:
+        if base_url not in _execution_clients:
+            _execution_clients[base_url] = CodeExecutionClient(base_url)
+        return _execution_clients[base_url]
@@ -0,0 +1,158 @@
+"""
+MAiKO Batch Executor
+Bounded-concurrency local execution of bulk, deadline-tolerant LLM work
+"""
+from concurrent.futures import ThreadPoolExecutor, Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+import threading
+import time
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Batch lifecycle states (mirrors the provider batch APIs)
+BATCH_IN_PROGRESS = "in_progress"
+BATCH_ENDED = "ended"
+
+
+@dataclass
+class BatchRequest:
+    """A single request inside a batch"""
+    custom_id: str
+    messages: List[Any]  # List[Message]
+    params: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class BatchJob:
+    """Status and results of a submitted batch"""
+    batch_id: str
+    status: str = BATCH_IN_PROGRESS
+    total: int = 0
+    succeeded: int = 0
+    errored: int = 0
+    # custom_id -> {"response": {...}} or {"error": "..."}
+    results: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    submitted_at: float = field(default_factory=time.time)
+    ended_at: Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status == BATCH_ENDED
+
+    def to_dict(self):
+        """Convert batch job to dictionary"""
+        return {
+            "batch_id": self.batch_id,
+            "status": self.status,
+            "total": self.total,
+            "succeeded": self.succeeded,
+            "errored": self.errored,
+            "results": self.results,
+            "submitted_at": self.submitted_at,
+            "ended_at": self.ended_at,
+        }
+
+
+class LocalBatchExecutor:
+    """
+    Runs batches on a bounded thread pool.
+
+    Used by providers without a native batch API, and as an offline
+    stand-in: any callable taking (messages, **params) can be submitted,
+    so the batch interface can be exercised without network access.
+    """
+
+    def __init__(self, max_workers: int = 4, max_jobs: int = 100):
+        self.max_workers = max_workers
+        self.max_jobs = max_jobs
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="maiko-batch"
+        )
+        self._jobs: Dict[str, BatchJob] = {}
+        self._pending: Dict[str, List[Future]] = {}
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        requests: List[BatchRequest],
+        complete_fn: Callable[..., Dict[str, Any]]
+    ) -> str:
+        """Queue all requests and return a batch id immediately"""
+        batch_id = f"localbatch_{uuid.uuid4().hex}"
+        job = BatchJob(batch_id=batch_id, total=len(requests))
+
+        with self._lock:
+            self._evict_finished()
+            self._jobs[batch_id] = job
+            self._pending[batch_id] = [
+                self._pool.submit(self._run_one, job, request, complete_fn)
+                for request in requests
+            ]
+            if not requests:
+                self._finish(job)
+
+        logger.info(f"Submitted local batch {batch_id} ({len(requests)} requests)")
+        return batch_id
+
+    def poll(self, batch_id: str, wait: bool = False, timeout: float = None) -> BatchJob:
+        """Return the current state of a batch, optionally waiting for it"""
+        with self._lock:
+            job = self._jobs.get(batch_id)
+            futures = list(self._pending.get(batch_id, []))
+        if job is None:
+            raise KeyError(f"Unknown batch: {batch_id}")
+
+        if wait and futures:
+            deadline = time.time() + timeout if timeout else None
+            for future in futures:
+                remaining = deadline - time.time() if deadline else None
+                if remaining is not None and remaining <= 0:
+                    break
+                try:
+                    future.result(timeout=remaining)
+                except Exception:
+                    # Errors are recorded per request by _run_one
+                    pass
+
+        return job
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting work and release the worker threads"""
+        self._pool.shutdown(wait=wait)
+
+    def _run_one(self, job: BatchJob, request: BatchRequest, complete_fn):
+        try:
+            response = complete_fn(request.messages, **request.params)
+            entry = {"response": response}
+        except Exception as e:
+            logger.warning(f"Batch request {request.custom_id} failed: {e}")
+            entry = {"error": str(e)}
+
+        with self._lock:
+            job.results[request.custom_id] = entry
+            if "error" in entry:
+                job.errored += 1
+            else:
+                job.succeeded += 1
+            if job.succeeded + job.errored >= job.total:
+                self._finish(job)
+
+    def _finish(self, job: BatchJob):
+        job.status = BATCH_ENDED
+        job.ended_at = time.time()
+        self._pending.pop(job.batch_id, None)
+
+    def _evict_finished(self):
+        """Drop the oldest finished jobs once max_jobs is exceeded"""
+        if len(self._jobs) < self.max_jobs:
+            return
+        for batch_id in list(self._jobs):
+            if len(self._jobs) < self.max_jobs:
+                break
+            if self._jobs[batch_id].done:
+                del self._jobs[batch_id]
@@ -168,24 +168,42 @@ class CacheManager:
 
     def __init__(self, backend: CacheBackend = None):
         self.backend = backend or InMemoryCacheBackend()
+        self.hits = 0
+        self.misses = 0
 
     def get_cached_or_compute(
         self,
         key: str,
         compute_fn,
-        ttl_seconds: int = 3600
+        ttl_seconds: int = 3600,
+        should_cache=None
     ) -> Any:
-        """Get from cache or compute if not cached"""
-        cached = self.backend.get(key)
+        """Get from cache or compute if not cached (should_cache filters what is stored)"""
+        cached = self.lookup(key)
         if cached is not None:
-            logger.debug(f"Cache hit for key: {key}")
             return cached
 
-        logger.debug(f"Cache miss for key: {key}, computing...")
+        logger.debug(f"Computing value for key: {key}")
         value = compute_fn()
-        self.backend.set(key, value, ttl_seconds)
+        if should_cache is None or should_cache(value):
+            self.backend.set(key, value, ttl_seconds)
         return value
 
+    def lookup(self, key: str) -> Optional[Any]:
+        """Get a cached value, counting the hit or miss"""
+        cached = self.backend.get(key)
+        if cached is not None:
+            logger.debug(f"Cache hit for key: {key}")
+            self.hits += 1
+        else:
+            logger.debug(f"Cache miss for key: {key}")
+            self.misses += 1
+        return cached
+
+    def store(self, key: str, value: Any, ttl_seconds: int = 3600) -> bool:
+        """Put a value computed elsewhere into the cache"""
+        return self.backend.set(key, value, ttl_seconds)
+
     def invalidate_pattern(self, pattern: str) -> int:
         """Invalidate cache keys matching pattern"""
         # This is a placeholder - full pattern support depends on backend
@@ -194,8 +212,12 @@ class CacheManager:
 
     def stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
+        lookups = self.hits + self.misses
         return {
             "backend_type": self.backend.__class__.__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
             "timestamp": datetime.now().isoformat(),
         }
 
@@ -0,0 +1,300 @@
+"""
+MAiKO Code Validator
+Pre-execution checks that enforce SandboxConfig rules before any spawn
+"""
+import ast
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from execution_config import DEFAULT_SANDBOX, SandboxConfig
+
+
+# Builtins that defeat import and pattern checks, or reach attributes by name
+BLOCKED_CALLS = frozenset({
+    "eval", "exec", "compile", "__import__", "breakpoint", "globals", "locals", "vars",
+    "getattr", "setattr", "delattr",
+})
+
+# Attributes used to climb from any object back to builtins or code objects
+BLOCKED_ATTRIBUTES = frozenset({
+    "__subclasses__", "__globals__", "__builtins__", "__code__", "__bases__",
+    "__mro__", "__getattribute__", "__closure__", "__loader__", "__spec__",
+    "__class__", "__base__", "__dict__",
+})
+
+# A complete dunder name, e.g. "__main__"
+DUNDER = re.compile(r"__\w+__")
+
+# Blocked builtins that are plain identifiers, searched for as whole names
+CALL_TRIGGERS = tuple(sorted(name for name in BLOCKED_CALLS if not name.startswith("__")))
+
+# A complete dunder token starting at a "__", e.g. __name__ in "__name__ =="
+DUNDER_TOKEN = re.compile(r"__[A-Za-z]\w*__(?!\w)")
+
+# String escapes that spell an underscore without writing one
+ESCAPED_UNDERSCORE = re.compile(r"\\(?:[xX]5[fF]|u005[fF]|U0000005[fF]|137|N\{)")
+
+
+def _is_name_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+def _required_literal(pattern: str) -> Optional[str]:
+    """A substring every match of pattern must contain, if one is obvious"""
+    pieces, current, i = [], "", 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\" and i + 1 < len(pattern):
+            escaped = pattern[i + 1]
+            if escaped.isalnum():  # \s, \d, \b ... are classes, not literals
+                pieces.append(current)
+                current = ""
+            else:
+                current += escaped
+            i += 2
+            continue
+        if ch in "|([":
+            return None  # alternatives or classes: no single required substring
+        if ch in "*?{":
+            current = current[:-1]  # the quantified character is optional
+            pieces.append(current)
+            current = ""
+        elif ch in ".^$+)]}":
+            pieces.append(current)
+            current = ""
+        else:
+            current += ch
+        i += 1
+    pieces.append(current)
+    longest = max(pieces, key=len)
+    return longest if len(longest) >= 2 else None
+
+
+def _dunder_string(value: str) -> bool:
+    """Whether a string constant names or spells part of a blocked dunder"""
+    if "__" not in value or not value.strip("_"):
+        return False
+    # Harmless complete names such as "__main__" stay allowed; fragments like
+    # "__cl" + "ass__" can only be meant to build an attribute name
+    return not DUNDER.fullmatch(value) or value in BLOCKED_ATTRIBUTES
+
+
+def _import_lines(code: str) -> List[str]:
+    """Stripped physical lines containing 'import', found by substring search"""
+    lines, start = [], code.find("import")
+    while start != -1:
+        line_start = code.rfind("\n", 0, start) + 1
+        line_end = code.find("\n", start)
+        if line_end == -1:
+            line_end = len(code)
+        lines.append(code[line_start:line_end].strip())
+        start = code.find("import", line_end)
+    return lines
+
+
+class CodeValidator:
+    """
+    Rejects snippets that break the sandbox rules, compiled once per config.
+
+    blocked_patterns become a single alternation regex, guarded by a
+    literal prefilter so clean code is cleared with a few substring scans;
+    when a literal does occur, only the patterns containing it are searched.
+    For Python, a single ast walk checks imports against allowed_imports and
+    looks for BLOCKED_CALLS, BLOCKED_ATTRIBUTES and string constants that
+    spell out dunders. ASCII code that names none of them (attribute
+    calls like re.compile and plain dunders like __main__ are fine) only
+    has its import lines parsed. Non-ASCII code always gets the full walk: Python
+    NFKC-normalises identifiers, so a fullwidth "eval" slips past substring
+    checks but shows up as eval in the tree. Verdicts for recently seen
+    snippets are kept in a small LRU.
+    """
+
+    def __init__(self, sandbox: SandboxConfig = None, cache_size: int = 256):
+        self.sandbox = sandbox or DEFAULT_SANDBOX
+        self.max_code_size = self.sandbox.max_code_size
+        self.allowed_imports = frozenset(self.sandbox.allowed_imports)
+        patterns = self.sandbox.blocked_patterns
+        self._blocked = re.compile(
+            "|".join(f"(?P<p{i}>{pattern})" for i, pattern in enumerate(patterns))
+        ) if patterns else None
+        self._patterns = {f"p{i}": pattern for i, pattern in enumerate(patterns)}
+        literals = [_required_literal(pattern) for pattern in patterns]
+        # Without a literal for every pattern the regex has to run on all code
+        self._literals = literals if all(literals) else None
+        self._guarded = [
+            (literal, re.compile(pattern), pattern) for literal, pattern in zip(literals, patterns)
+        ]
+        self._cache: "OrderedDict[Tuple[str, str], Optional[str]]" = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    def validate(self, code: str, language: str = "python") -> Optional[str]:
+        """Reason the snippet is rejected, or None when it may run"""
+        if not code or not isinstance(code, str):
+            return "Code must be a non-empty string"
+        if len(code) > self.max_code_size:
+            return f"Code size exceeds maximum allowed size ({self.max_code_size} bytes)"
+
+        key = (language, code)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        reason = self._check_patterns(code)
+        if reason is None and language.lower() == "python":
+            reason = self._check_python(code)
+
+        with self._lock:
+            self._cache[key] = reason
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return reason
+
+    def _check_patterns(self, code: str) -> Optional[str]:
+        if self._blocked is None:
+            return None
+        if self._literals is None:
+            match = self._blocked.search(code)
+            return f"Code contains a blocked pattern: {self._patterns[match.lastgroup]}" if match else None
+        # Only patterns whose literal occurs can match; searched alone, each one
+        # starts with a cheap literal scan instead of trying every alternative at
+        # every position (about 1 ms on 10KB once e.g. "execute" hits "exec")
+        first = None
+        for literal, regex, pattern in self._guarded:
+            if literal in code:
+                match = regex.search(code)
+                if match and (first is None or match.start() < first[0]):
+                    first = (match.start(), pattern)
+        return f"Code contains a blocked pattern: {first[1]}" if first else None
+
+    def _needs_walk(self, code: str) -> bool:
+        """
+        Whether anything but an import could be rejected. Uses str.find, which
+        is several times faster on 10KB than a regex trying every position.
+        """
+        if not code.isascii():
+            return True
+        if "\\" in code and ESCAPED_UNDERSCORE.search(code):
+            return True
+        for name in CALL_TRIGGERS:
+            start = code.find(name)
+            while start != -1:
+                end = start + len(name)
+                before = code[start - 1] if start else " "
+                # Attributes such as re.compile are fine; only the builtin's name is not
+                if not (_is_name_char(before) or before == ".") and not _is_name_char(code[end:end + 1]):
+                    return True
+                start = code.find(name, end)
+        start = code.find("__")
+        while start != -1:
+            match = DUNDER_TOKEN.match(code, start)
+            # Anything but a complete, unblocked dunder may be a fragment of one
+            if (match is None or (start and _is_name_char(code[start - 1]))
+                    or match.group() in BLOCKED_ATTRIBUTES or match.group() in BLOCKED_CALLS):
+                return True
+            start = code.find("__", match.end())
+        return False
+
+    def _check_python(self, code: str) -> Optional[str]:
+        if not self._needs_walk(code):
+            # Only imports can be violated: parse just the lines that mention them
+            try:
+                trees = [ast.parse(line) for line in _import_lines(code)]
+            except SyntaxError:
+                trees = None  # multi-line statement or string; parse the whole snippet
+            if trees is not None:
+                if all(self._check_tree(tree) is None for tree in trees):
+                    return None
+                # A fragment may be a string's contents; confirm with a full parse
+
+        try:
+            tree = ast.parse(code)
+        except SyntaxError as e:
+            return f"Syntax error on line {e.lineno}: {e.msg}"
+        return self._check_tree(tree)
+
+    def _check_tree(self, tree: ast.AST) -> Optional[str]:
+        """Single pass over the tree for imports, calls and attributes"""
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    if alias.name.split(".")[0] not in self.allowed_imports:
+                        return f"Import of '{alias.name}' is not allowed"
+            elif isinstance(node, ast.ImportFrom):
+                module = node.module or ""
+                if node.level or module.split(".")[0] not in self.allowed_imports:
+                    return f"Import from '{module or '.'}' is not allowed"
+            elif isinstance(node, ast.Call):
+                if isinstance(node.func, ast.Name) and node.func.id in BLOCKED_CALLS:
+                    return f"Call to '{node.func.id}' is not allowed"
+            elif isinstance(node, ast.Attribute):
+                if node.attr in BLOCKED_ATTRIBUTES:
+                    return f"Access to '{node.attr}' is not allowed"
+            elif isinstance(node, ast.Name):
+                if node.id in BLOCKED_ATTRIBUTES:
+                    return f"Access to '{node.id}' is not allowed"
+                # Aliasing (f = getattr) would otherwise get past the call check
+                if node.id in BLOCKED_CALLS and isinstance(node.ctx, ast.Load):
+                    return f"Use of '{node.id}' is not allowed"
+            elif isinstance(node, ast.Constant) and isinstance(node.value, str):
+                if _dunder_string(node.value):
+                    return f"String {node.value!r} looks like a dunder attribute name"
+        return None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"cached_verdicts": len(self._cache)}
+
+
+# Global code validator instance
+_code_validator = None
+
+def get_code_validator() -> CodeValidator:
+    """Get or create the validator for the default sandbox"""
+    global _code_validator
+    if _code_validator is None:
+        _code_validator = CodeValidator()
+    return _code_validator
+
+
+def _benchmark(iterations: int = 500) -> List[Tuple[str, Dict[str, float]]]:
+    """Time validation of ~10KB snippets along each path"""
+    import time
+
+    typical_line = "values = [math.sqrt(x) * 2 for x in range(10) if x % 2 == 0]  # compute\n"
+    typical = "import math\nimport json\n" + typical_line * ((10 * 1024 - 120) // len(typical_line))
+    # Attribute calls and harmless dunders stay on the import-lines path
+    idioms = typical + "pattern = re.compile('x')\nif __name__ == '__main__':\n    execute = 1\n"
+    # Non-ASCII code always takes the full parse path
+    full = typical.replace("# compute", "# calculé", 1)
+    validator = CodeValidator(SandboxConfig(max_code_size=16 * 1024), cache_size=0)
+    cached = CodeValidator(SandboxConfig(max_code_size=16 * 1024))
+
+    results = []
+    for label, validator_, code, vary in (
+        ("typical 10KB (import lines only)", validator, typical, True),
+        ("10KB with common idioms (import lines)", validator, idioms, True),
+        ("10KB non-ASCII (full ast walk)", validator, full, True),
+        ("repeat snippet (verdict cache)", cached, typical, False),
+    ):
+        timings = []
+        for i in range(iterations):
+            snippet = code + f"# {i}\n" if vary else code
+            start = time.perf_counter()
+            validator_.validate(snippet, "python")
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        results.append((label, {
+            "bytes": len(code),
+            "mean_ms": sum(timings) / len(timings),
+            "p50_ms": timings[len(timings) // 2],
+            "p99_ms": timings[int(len(timings) * 0.99) - 1],
+        }))
+    return results
+
+
+if __name__ == "__main__":
+    for label, timing in _benchmark():
+        print(f"{label:38s} {timing['bytes']:6d}B  mean {timing['mean_ms']:.3f} ms  "
+              f"p50 {timing['p50_ms']:.3f} ms  p99 {timing['p99_ms']:.3f} ms")
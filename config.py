@@ -17,6 +17,13 @@ class Config:
     # API Settings
     EXECUTE_API_URL = os.getenv("EXECUTE_API_URL", "http://localhost:5000")
     EXECUTE_API_TIMEOUT = int(os.getenv("EXECUTE_API_TIMEOUT", "10"))
+    EXECUTE_API_POOL_SIZE = int(os.getenv("EXECUTE_API_POOL_SIZE", "10"))
+    EXECUTE_API_RETRIES = int(os.getenv("EXECUTE_API_RETRIES", "2"))
+    EXECUTE_API_CACHE_TTL = int(os.getenv("EXECUTE_API_CACHE_TTL", "30"))
+    EXECUTE_RESULT_CACHE = os.getenv("EXECUTE_RESULT_CACHE", "false").lower() == "true"
+    EXECUTE_RESULT_CACHE_TTL = int(os.getenv("EXECUTE_RESULT_CACHE_TTL", "3600"))
+    EXECUTE_BATCH_CONCURRENCY = int(os.getenv("EXECUTE_BATCH_CONCURRENCY", "4"))
+    EXECUTION_LIMITS_DB = os.getenv("EXECUTION_LIMITS_DB", "execution_limits.db")
 
     # LLM Settings
     ZHIPUAI_API_KEY = os.getenv("ZHIPUAI_API_KEY")
@@ -26,14 +33,38 @@ class Config:
     # Chat Settings
     CHAT_DIR = "chats"
     MEMORY_FILE = "memory_bank.json"
+    MEMORY_LOG_COMPACT_OPS = int(os.getenv("MEMORY_LOG_COMPACT_OPS", "200"))
+    MEMORY_QUEUE_FILE = os.getenv("MEMORY_QUEUE_FILE", "memory_queue.db")
+    MEMORY_COALESCE_SECONDS = float(os.getenv("MEMORY_COALESCE_SECONDS", "2.0"))
+    MEMORY_BATCH_SIZE = int(os.getenv("MEMORY_BATCH_SIZE", "8"))
+    MEMORY_RETRY_SECONDS = float(os.getenv("MEMORY_RETRY_SECONDS", "30"))
+    MEMORY_TOP_K = int(os.getenv("MEMORY_TOP_K", "8"))
+    MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "300"))
+    MEMORY_DEDUP_THRESHOLD = float(os.getenv("MEMORY_DEDUP_THRESHOLD", "0.7"))
+    MEMORY_FILTER_MODEL = os.getenv("MEMORY_FILTER_MODEL", "memory_filter.json")
+    MEMORY_FILTER_THRESHOLD = float(os.getenv("MEMORY_FILTER_THRESHOLD", "0.5"))
     ARCHIVE_FILE = "chat_archive.json"
     MAX_CHAT_HISTORY = int(os.getenv("MAX_CHAT_HISTORY", "10"))
     TRIM_HISTORY_LIMIT = int(os.getenv("TRIM_HISTORY_LIMIT", "20"))
+    COMPACT_KEEP_RECENT = int(os.getenv("COMPACT_KEEP_RECENT", "8"))
+    COMPACT_REFRESH_EVERY = int(os.getenv("COMPACT_REFRESH_EVERY", "6"))
+    COMPACT_MAX_SUMMARY_CHARS = int(os.getenv("COMPACT_MAX_SUMMARY_CHARS", "2000"))
 
     # Code Execution Settings
     EXECUTION_TIMEOUT = int(os.getenv("EXECUTION_TIMEOUT", "5"))
     MAX_CODE_SIZE = int(os.getenv("MAX_CODE_SIZE", "10240"))
     SUPPORTED_LANGUAGES = ["python", "javascript"]
+    LOCAL_EXECUTION_WORKERS = int(os.getenv("LOCAL_EXECUTION_WORKERS", "2"))
+    LOCAL_EXECUTION_MAX_RUNS = int(os.getenv("LOCAL_EXECUTION_MAX_RUNS", "100"))
+    LOCAL_SESSION_MAX = int(os.getenv("LOCAL_SESSION_MAX", "8"))
+    LOCAL_SESSION_IDLE_SECONDS = float(os.getenv("LOCAL_SESSION_IDLE_SECONDS", "600"))
+    EXECUTION_HISTORY_DB = os.getenv("EXECUTION_HISTORY_DB", "execution_history.db")
+    EXECUTION_HISTORY_MEMORY = int(os.getenv("EXECUTION_HISTORY_MEMORY", "100"))
+    EXECUTION_HISTORY_MAX_RECORDS = int(os.getenv("EXECUTION_HISTORY_MAX_RECORDS", "5000"))
+    EXECUTION_HISTORY_MAX_OUTPUT = int(os.getenv("EXECUTION_HISTORY_MAX_OUTPUT", "65536"))
+    EXECUTION_HISTORY_PAGE_SIZE = int(os.getenv("EXECUTION_HISTORY_PAGE_SIZE", "10"))
+    TOOL_RESULT_MAX_CHARS = int(os.getenv("TOOL_RESULT_MAX_CHARS", "8000"))
+    TOOL_RESULT_TABLE_ROWS = int(os.getenv("TOOL_RESULT_TABLE_ROWS", "5"))
 
     # Logging Settings
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
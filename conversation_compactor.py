@@ -0,0 +1,168 @@
+"""
+MAiKO Conversation Compactor
+Rolling summaries that keep the prompt bounded for long conversations
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from config import config
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class CompactionState:
+    """Rolling summary of the messages that were compacted away"""
+    summary: str = ""
+    covered: int = 0  # number of leading messages folded into the summary
+    updated_at: Optional[str] = None
+
+    def to_dict(self):
+        """Convert state to dictionary"""
+        return {
+            "summary": self.summary,
+            "covered": self.covered,
+            "updated_at": self.updated_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CompactionState":
+        return cls(
+            summary=data.get("summary", ""),
+            covered=int(data.get("covered", 0)),
+            updated_at=data.get("updated_at"),
+        )
+
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a user and an AI "
+    "assistant. Update the summary with the new messages below. Keep names, "
+    "decisions, open questions and facts the assistant will need later. "
+    "Reply with the updated summary only, at most {max_words} words.\n\n"
+    "Current summary:\n{summary}\n\nNew messages:\n{transcript}"
+)
+
+
+def format_transcript(messages: List[Dict[str, Any]], max_chars_per_message: int = 2000) -> str:
+    """Render messages as plain text for the summarizer"""
+    lines = []
+    for msg in messages:
+        content = msg.get("content", "")
+        if not isinstance(content, str):
+            content = "[non-text content]"
+        lines.append(f"{msg.get('role', 'user')}: {content[:max_chars_per_message]}")
+    return "\n".join(lines)
+
+
+def starts_turn(message: Dict[str, Any]) -> bool:
+    """Whether a prompt may begin with message: a user turn that is not a tool result"""
+    if message.get("role") != "user":
+        return False
+    content = message.get("content")
+    if isinstance(content, list):
+        return not any(
+            (block.get("type") if isinstance(block, dict) else getattr(block, "type", None)) == "tool_result"
+            for block in content
+        )
+    return True
+
+
+class ConversationCompactor:
+    """
+    Replaces older turns with a cached rolling summary.
+
+    window() is cheap and is used to build every prompt: it returns the
+    summary plus the messages it does not cover. refresh() folds older
+    messages into the summary, calling the summarizer only once at least
+    refresh_every new messages have aged out of the recent window. The
+    summary always ends just before a user turn, so the raw messages start
+    on one. With refresh() run after each turn, a prompt carries about
+    keep_recent + refresh_every - 1 raw messages, plus any moved back to
+    reach a user turn.
+    """
+
+    def __init__(
+        self,
+        summarize_fn: Callable[[str], str],
+        keep_recent: int = None,
+        refresh_every: int = None,
+        max_summary_chars: int = None
+    ):
+        """
+        Args:
+            summarize_fn: Takes a prompt and returns the model's reply
+            keep_recent: Messages always sent verbatim
+            refresh_every: Aged-out messages that trigger a summary refresh
+            max_summary_chars: Hard cap on the stored summary
+        """
+        self.summarize_fn = summarize_fn
+        self.keep_recent = keep_recent or config.COMPACT_KEEP_RECENT
+        self.refresh_every = refresh_every or config.COMPACT_REFRESH_EVERY
+        self.max_summary_chars = max_summary_chars or config.COMPACT_MAX_SUMMARY_CHARS
+
+    def window(
+        self,
+        messages: List[Dict[str, Any]],
+        state: CompactionState
+    ) -> Tuple[List[Dict[str, Any]], str]:
+        """Messages to send verbatim and the summary of everything before them"""
+        summary = state.summary
+        recent = list(messages[state.covered:])
+        if state.covered > len(messages):
+            # History was edited or truncated; the summary no longer applies
+            summary, recent = "", list(messages)
+
+        # Hard cap in case refreshes keep failing
+        max_window = self.keep_recent + 2 * self.refresh_every
+        if len(recent) > max_window:
+            cut = len(recent) - max_window
+            # The window must open on a user turn, never between a tool call and its result
+            while cut < len(recent) and not starts_turn(recent[cut]):
+                cut += 1
+            logger.warning(f"Compaction behind; dropping {cut} messages")
+            recent = recent[cut:]
+        return recent, summary
+
+    def _boundary(self, messages: List[Dict[str, Any]], state: CompactionState) -> int:
+        """Index the recent window starts at: keep_recent back, moved back to a user turn"""
+        covered = min(state.covered, len(messages))
+        boundary = len(messages) - self.keep_recent
+        # Like window(), the raw messages must open on a user turn
+        while boundary > covered and not starts_turn(messages[boundary]):
+            boundary -= 1
+        return boundary
+
+    def needs_refresh(self, messages: List[Dict[str, Any]], state: CompactionState) -> bool:
+        return self._boundary(messages, state) - min(state.covered, len(messages)) >= self.refresh_every
+
+    def refresh(
+        self,
+        messages: List[Dict[str, Any]],
+        state: CompactionState
+    ) -> Tuple[CompactionState, bool]:
+        """Fold aged-out messages into the summary; returns (state, changed)"""
+        if state.covered > len(messages):
+            state = CompactionState()
+        if not self.needs_refresh(messages, state):
+            return state, False
+
+        boundary = self._boundary(messages, state)
+        prompt = SUMMARY_PROMPT.format(
+            max_words=self.max_summary_chars // 6,
+            summary=state.summary or "(none yet)",
+            transcript=format_transcript(messages[state.covered:boundary]),
+        )
+        try:
+            summary = (self.summarize_fn(prompt) or "").strip()
+        except Exception as e:
+            logger.error(f"Conversation compaction failed: {e}")
+            return state, False
+
+        new_state = CompactionState(
+            summary=summary[:self.max_summary_chars],
+            covered=boundary,
+            updated_at=datetime.now().isoformat(),
+        )
+        logger.info(f"Compacted conversation: {boundary} messages summarized")
+        return new_state, True
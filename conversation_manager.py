@@ -8,6 +8,7 @@ from datetime import datetime
 from typing import List, Dict, Any, Optional
 from config import config
 from logger import get_logger
+from conversation_compactor import CompactionState
 
 logger = get_logger(__name__)
 
@@ -17,6 +18,7 @@ class ConversationManager:
     def __init__(self, chat_dir: str = None):
         """Initialize conversation manager"""
         self.chat_dir = chat_dir or config.CHAT_DIR
+        self.summary_dir = os.path.join(self.chat_dir, "summaries")
         os.makedirs(self.chat_dir, exist_ok=True)
 
     def create_chat_id(self) -> str:
@@ -54,6 +56,7 @@ class ConversationManager:
             file_path = os.path.join(self.chat_dir, chat_id)
             if os.path.exists(file_path):
                 os.remove(file_path)
+                self.delete_summary(chat_id)
                 logger.info(f"Deleted conversation: {chat_id}")
                 return True
             return False
@@ -61,6 +64,38 @@ class ConversationManager:
             logger.error(f"Failed to delete conversation {chat_id}: {e}")
             return False
 
+    def save_summary(self, chat_id: str, state: CompactionState) -> bool:
+        """Save a conversation's rolling summary alongside it"""
+        try:
+            os.makedirs(self.summary_dir, exist_ok=True)
+            file_path = os.path.join(self.summary_dir, chat_id)
+            with open(file_path, 'w') as f:
+                json.dump(state.to_dict(), f, indent=2)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to save summary {chat_id}: {e}")
+            return False
+
+    def load_summary(self, chat_id: str) -> CompactionState:
+        """Load a conversation's rolling summary (empty if none yet)"""
+        try:
+            file_path = os.path.join(self.summary_dir, chat_id)
+            if not os.path.exists(file_path):
+                return CompactionState()
+            with open(file_path, 'r') as f:
+                return CompactionState.from_dict(json.load(f))
+        except Exception as e:
+            logger.error(f"Failed to load summary {chat_id}: {e}")
+            return CompactionState()
+
+    def delete_summary(self, chat_id: str) -> bool:
+        """Delete a conversation's rolling summary"""
+        file_path = os.path.join(self.summary_dir, chat_id)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+            return True
+        return False
+
     def list_conversations(self, limit: int = None) -> List[str]:
         """List all conversations"""
         try:
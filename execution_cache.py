@@ -0,0 +1,75 @@
+"""
+MAiKO Execution Cache
+Cache keys and cacheability checks for code execution results
+"""
+import ast
+import hashlib
+import json
+import re
+from typing import Any, Dict
+from execution_config import SandboxConfig
+
+
+# Allowed modules whose results can change between identical runs
+NONDETERMINISTIC_MODULES = frozenset({"random", "datetime", "time", "uuid", "secrets", "os", "sys"})
+
+# Builtins that read the outside world or depend on process state
+NONDETERMINISTIC_CALLS = frozenset({"open", "input", "id", "hash", "globals", "locals", "vars", "__import__"})
+
+JS_NONDETERMINISTIC = re.compile(
+    r"\b(require|import|Math\.random|Date|performance|process|setTimeout|setInterval|crypto|fetch)\b"
+)
+
+
+def execution_cache_key(code: str, language: str, sandbox: SandboxConfig, base_url: str = "") -> str:
+    """Content address for an execution: code, language and the limits it ran under"""
+    payload = {
+        "code": code,
+        "language": language.lower(),
+        "timeout_ms": sandbox.timeout_ms,
+        "max_memory_mb": sandbox.max_memory_mb,
+        "max_output_size": sandbox.max_output_size,
+        "server": base_url,
+    }
+    encoded = json.dumps(payload, sort_keys=True)
+    return "exec:" + hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def is_cacheable(code: str, language: str, sandbox: SandboxConfig) -> bool:
+    """
+    Whether identical runs of the code should produce identical results.
+
+    Python code qualifies when it only imports deterministic modules from
+    sandbox.allowed_imports and calls none of NONDETERMINISTIC_CALLS.
+    JavaScript qualifies when it uses no modules, clocks or randomness.
+    """
+    language = language.lower()
+    if language == "javascript":
+        return not JS_NONDETERMINISTIC.search(code)
+    if language != "python":
+        return False
+
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return True  # fails the same way every time
+    allowed = set(sandbox.allowed_imports) - NONDETERMINISTIC_MODULES
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            modules = [node.module or ""]
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            if node.func.id in NONDETERMINISTIC_CALLS:
+                return False
+            continue
+        else:
+            continue
+        if any(module.split(".")[0] not in allowed for module in modules):
+            return False
+    return True
+
+
+def is_reusable_result(result: Dict[str, Any]) -> bool:
+    """Only successful runs are kept; failures may be timeouts or transport errors"""
+    return bool(result.get("success")) and bool(result.get("executionId"))
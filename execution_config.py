@@ -90,6 +90,8 @@ class ExecutionPolicy:
     # Rate limiting
     max_executions_per_minute: int = 60
     max_executions_per_hour: int = 1000
+    global_executions_per_minute: int = 0  # across all users, 0 disables
+    global_executions_per_hour: int = 0
 
     # Resource quotas
     daily_execution_quota_mb: int = 1000  # 1GB total execution
@@ -119,6 +121,8 @@ class ExecutionPolicy:
         return {
             "max_executions_per_minute": self.max_executions_per_minute,
             "max_executions_per_hour": self.max_executions_per_hour,
+            "global_executions_per_minute": self.global_executions_per_minute,
+            "global_executions_per_hour": self.global_executions_per_hour,
             "daily_quota_mb": self.daily_execution_quota_mb,
             "monthly_quota_mb": self.monthly_execution_quota_mb,
             "log_all_executions": self.log_all_executions,
@@ -135,6 +139,8 @@ class ExecutionPolicy:
         return cls(
             max_executions_per_minute=int(os.getenv("MAX_EXEC_PER_MIN", "60")),
             max_executions_per_hour=int(os.getenv("MAX_EXEC_PER_HOUR", "1000")),
+            global_executions_per_minute=int(os.getenv("GLOBAL_EXEC_PER_MIN", "0")),
+            global_executions_per_hour=int(os.getenv("GLOBAL_EXEC_PER_HOUR", "0")),
             daily_execution_quota_mb=int(os.getenv("DAILY_QUOTA_MB", "1000")),
             monthly_execution_quota_mb=int(os.getenv("MONTHLY_QUOTA_MB", "10000")),
             log_all_executions=os.getenv("LOG_ALL_EXEC", "true").lower() == "true",
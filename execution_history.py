@@ -0,0 +1,218 @@
+"""
+MAiKO Execution History
+Bounded store of past code executions: recent ones in memory, all on disk
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from config import config
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class ExecutionHistory:
+    """
+    Execution records kept in a ring buffer and an indexed SQLite log.
+
+    Every record is written through to SQLite, so history survives
+    restarts; the newest memory_size records also stay in memory, which
+    serves lookups of recent executions without touching disk. Every 100
+    writes the log is trimmed back to max_records, and stored outputs are
+    capped at max_output characters. Pages are read with indexed
+    LIMIT/OFFSET queries, so a caller only ever loads the page it shows.
+
+    Outputs longer than max_output are also stored whole in a separate
+    table (trimmed together with their records), so read_lines can reach
+    all of an output that tool results only reference.
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+        memory_size: int = None,
+        max_records: int = None,
+        max_output: int = None
+    ):
+        self.path = path or config.EXECUTION_HISTORY_DB
+        self.memory_size = memory_size or config.EXECUTION_HISTORY_MEMORY
+        self.max_records = max_records or config.EXECUTION_HISTORY_MAX_RECORDS
+        self.max_output = max_output or config.EXECUTION_HISTORY_MAX_OUTPUT
+        self._recent: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10)
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS executions ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "execution_id TEXT UNIQUE NOT NULL, "
+                "created_at REAL NOT NULL, "
+                "language TEXT, "
+                "success INTEGER NOT NULL, "
+                "record TEXT NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS executions_language ON executions (language, id)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS execution_outputs ("
+                "execution_id TEXT PRIMARY KEY, output TEXT NOT NULL)"
+            )
+
+    def _cap(self, text: Optional[str]) -> Optional[str]:
+        if isinstance(text, str) and len(text) > self.max_output:
+            return text[:self.max_output] + f"\n... [{len(text) - self.max_output} characters not kept]"
+        return text
+
+    def add(self, result: Dict[str, Any], language: str, code: str = None) -> Optional[Dict[str, Any]]:
+        """Record an execution result; results without an executionId are skipped"""
+        execution_id = result.get("executionId")
+        if not execution_id:
+            return None
+        now = time.time()
+        usage = result.get("usage") or {}
+        output = result.get("output")
+        full_output = output if isinstance(output, str) and len(output) > self.max_output else None
+        record = {
+            "execution_id": execution_id,
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now)),
+            "language": (language or "").lower(),
+            "success": bool(result.get("success")),
+            "output": self._cap(output),
+            "output_chars": len(output) if isinstance(output, str) else None,
+            "error": self._cap(result.get("error")),
+            "duration_ms": usage.get("wall_ms", result.get("durationMs", result.get("duration_ms"))),
+            "usage": usage or None,
+            "code": self._cap(code),
+        }
+        with self._lock:
+            self._recent[execution_id] = record
+            self._recent.move_to_end(execution_id)
+            while len(self._recent) > self.memory_size:
+                self._recent.popitem(last=False)
+            try:
+                with self._connect() as conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO executions "
+                        "(execution_id, created_at, language, success, record) VALUES (?, ?, ?, ?, ?)",
+                        (execution_id, now, record["language"], int(record["success"]), json.dumps(record))
+                    )
+                    if full_output is not None:
+                        conn.execute(
+                            "INSERT OR REPLACE INTO execution_outputs (execution_id, output) VALUES (?, ?)",
+                            (execution_id, full_output)
+                        )
+                    self._writes += 1
+                    if self._writes % 100 == 1:
+                        self._trim(conn)
+            except sqlite3.Error as e:
+                logger.error(f"Failed to store execution history: {e}")
+        return record
+
+    def _trim(self, conn: sqlite3.Connection):
+        """Drop the oldest records beyond max_records, and their stored outputs"""
+        conn.execute(
+            "DELETE FROM executions WHERE id <= (SELECT MAX(id) FROM executions) - ?",
+            (self.max_records,)
+        )
+        conn.execute(
+            "DELETE FROM execution_outputs WHERE execution_id NOT IN "
+            "(SELECT execution_id FROM executions)"
+        )
+
+    def get(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        """One record by execution id"""
+        with self._lock:
+            if execution_id in self._recent:
+                return dict(self._recent[execution_id])
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT record FROM executions WHERE execution_id = ?", (execution_id,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to read execution history: {e}")
+            return None
+        return json.loads(row[0]) if row else None
+
+    def _full_output(self, execution_id: str) -> Optional[str]:
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT output FROM execution_outputs WHERE execution_id = ?", (execution_id,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to read execution output: {e}")
+            return None
+        return row[0] if row else None
+
+    def read_lines(self, execution_id: str, start: int = 0, count: int = 100) -> Dict[str, Any]:
+        """A slice of a stored execution's full output lines"""
+        record = self.get(execution_id)
+        if record is None:
+            return {"error": f"No stored execution {execution_id}"}
+        output = self._full_output(execution_id)
+        if output is None:
+            output = record.get("output") or ""
+        lines = output.splitlines()
+        start = max(start, 0)
+        return {
+            "execution_id": execution_id,
+            "start_line": start,
+            "total_lines": len(lines),
+            "lines": "\n".join(lines[start:start + count]),
+        }
+
+    def page(self, page: int = 0, page_size: int = None, language: str = None) -> Dict[str, Any]:
+        """Newest-first page of records, with the total for pagination"""
+        page_size = page_size or config.EXECUTION_HISTORY_PAGE_SIZE
+        where, params = "", []
+        if language:
+            where, params = "WHERE language = ?", [language.lower()]
+        try:
+            with self._connect() as conn:
+                total = conn.execute(f"SELECT COUNT(*) FROM executions {where}", params).fetchone()[0]
+                rows = conn.execute(
+                    f"SELECT record FROM executions {where} ORDER BY id DESC LIMIT ? OFFSET ?",
+                    params + [page_size, max(page, 0) * page_size]
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to read execution history: {e}")
+            total, rows = 0, []
+        return {
+            "records": [json.loads(row[0]) for row in rows],
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "pages": -(-total // page_size),
+        }
+
+    def clear(self):
+        with self._lock:
+            self._recent.clear()
+            with self._connect() as conn:
+                conn.execute("DELETE FROM executions")
+                conn.execute("DELETE FROM execution_outputs")
+
+
+# Global execution history instance
+_execution_history = None
+_execution_history_lock = threading.Lock()
+
+def get_execution_history() -> ExecutionHistory:
+    """Get or create the execution history store"""
+    global _execution_history
+    with _execution_history_lock:
+        if _execution_history is None:
+            _execution_history = ExecutionHistory()
+        return _execution_history
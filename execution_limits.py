@@ -0,0 +1,221 @@
+"""
+MAiKO Execution Limits
+Enforces ExecutionPolicy rate limits and quotas across restarts
+"""
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from config import config
+from execution_config import DEFAULT_POLICY, ExecutionPolicy
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+
+GLOBAL_SCOPE = "*"
+MB = 1024 * 1024
+
+
+@dataclass
+class LimitDecision:
+    """Outcome of asking to run one execution"""
+    allowed: bool
+    retry_after: float = 0.0
+    reason: Optional[str] = None
+
+    def to_result(self) -> Dict[str, Any]:
+        """Execution result shape returned instead of running the code"""
+        return {
+            "success": False,
+            "error": f"{self.reason}; retry in {self.retry_after:.1f}s",
+            "output": None,
+            "rateLimited": True,
+            "retryAfter": round(self.retry_after, 3),
+        }
+
+
+def _period_end(period: str, now: float) -> float:
+    """Epoch seconds at which the current UTC day or month ends"""
+    today = datetime.fromtimestamp(now, timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == "day":
+        return (today + timedelta(days=1)).timestamp()
+    month_start = today.replace(day=1)
+    return (month_start + timedelta(days=32)).replace(day=1).timestamp()
+
+
+def usage_bytes(code: str, *outputs: Optional[str]) -> int:
+    """Bytes an execution transfers: its code plus any text output"""
+    return len(code.encode()) + sum(len(output.encode()) for output in outputs if isinstance(output, str))
+
+
+def _period_id(period: str, now: float) -> str:
+    return time.strftime("%Y-%m-%d" if period == "day" else "%Y-%m", time.gmtime(now))
+
+
+class ExecutionLimiter:
+    """
+    Rate limits and usage quotas from an ExecutionPolicy.
+
+    Rates use GCRA: each limit keeps one theoretical arrival time per
+    scope, so a check is O(1) and allows bursts up to the full window
+    count. Limits apply per user and, for the global_* fields, across all
+    users. Quotas count megabytes per UTC day and month. State lives in
+    SQLite, so limits survive restarts and are shared between processes.
+    """
+
+    def __init__(self, policy: ExecutionPolicy = None, db_path: str = None):
+        self.policy = policy or DEFAULT_POLICY
+        self.db_path = db_path or config.EXECUTION_LIMITS_DB
+        self._lock = threading.Lock()
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _init_db(self):
+        conn = self._connect()
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits ("
+                "key TEXT PRIMARY KEY, tat REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS quota_usage ("
+                "key TEXT PRIMARY KEY, period TEXT NOT NULL, used_mb REAL NOT NULL)"
+            )
+        finally:
+            conn.close()
+
+    def _rates(self, user_id: str) -> List[Tuple[str, int, float]]:
+        """(key, limit, window seconds) for every enabled rate limit"""
+        policy = self.policy
+        rates = [
+            (f"{user_id}:minute", policy.max_executions_per_minute, 60.0),
+            (f"{user_id}:hour", policy.max_executions_per_hour, 3600.0),
+            (f"{GLOBAL_SCOPE}:minute", policy.global_executions_per_minute, 60.0),
+            (f"{GLOBAL_SCOPE}:hour", policy.global_executions_per_hour, 3600.0),
+        ]
+        return [rate for rate in rates if rate[1] > 0]
+
+    def _quotas(self, user_id: str) -> List[Tuple[str, str, int]]:
+        """(key, period, limit MB) for every enabled quota"""
+        quotas = [
+            (f"{user_id}:day", "day", self.policy.daily_execution_quota_mb),
+            (f"{user_id}:month", "month", self.policy.monthly_execution_quota_mb),
+        ]
+        return [quota for quota in quotas if quota[2] > 0]
+
+    def acquire(self, user_id: str = "default") -> LimitDecision:
+        """Take one execution slot, or say how long until one is free"""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                decision, updates = self._check(conn, user_id, now)
+                if decision.allowed:
+                    conn.executemany(
+                        "INSERT INTO rate_limits (key, tat) VALUES (?, ?) "
+                        "ON CONFLICT(key) DO UPDATE SET tat = excluded.tat",
+                        updates
+                    )
+                conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                # Fail open: a broken limits database must not stop execution
+                logger.error(f"Execution limit check failed: {e}")
+                return LimitDecision(True)
+            finally:
+                conn.close()
+        if not decision.allowed:
+            logger.warning(f"Execution limited for {user_id}: {decision.reason}")
+        return decision
+
+    def _check(self, conn: sqlite3.Connection, user_id: str, now: float):
+        retry_after, reasons, updates = 0.0, [], []
+        for key, period, limit in self._quotas(user_id):
+            row = conn.execute(
+                "SELECT period, used_mb FROM quota_usage WHERE key = ?", (key,)
+            ).fetchone()
+            if row and row[0] == _period_id(period, now) and row[1] >= limit:
+                retry_after = max(retry_after, _period_end(period, now) - now)
+                reasons.append(f"{'Daily' if period == 'day' else 'Monthly'} quota of {limit} MB used")
+
+        for key, limit, window in self._rates(user_id):
+            interval = window / limit
+            row = conn.execute("SELECT tat FROM rate_limits WHERE key = ?", (key,)).fetchone()
+            tat = max(row[0] if row else now, now)
+            wait = tat - now - (window - interval)
+            if wait > 0:
+                retry_after = max(retry_after, wait)
+                scope = "all users" if key.startswith(GLOBAL_SCOPE + ":") else "user"
+                reasons.append(f"Rate limit of {limit} executions per {key.split(':')[-1]} ({scope}) reached")
+            else:
+                updates.append((key, tat + interval))
+
+        if reasons:
+            return LimitDecision(False, retry_after, "; ".join(reasons)), []
+        return LimitDecision(True), updates
+
+    def record_usage(self, user_id: str, size_bytes: int):
+        """Charge an execution's transferred bytes against the user's quotas"""
+        quotas = self._quotas(user_id)
+        if not quotas or size_bytes <= 0:
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                for key, period, _ in quotas:
+                    period_id = _period_id(period, now)
+                    conn.execute(
+                        "INSERT INTO quota_usage (key, period, used_mb) VALUES (?, ?, ?) "
+                        "ON CONFLICT(key) DO UPDATE SET "
+                        "used_mb = CASE WHEN period = excluded.period "
+                        "THEN used_mb + excluded.used_mb ELSE excluded.used_mb END, "
+                        "period = excluded.period",
+                        (key, period_id, size_bytes / MB)
+                    )
+                conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                logger.error(f"Failed to record execution usage: {e}")
+            finally:
+                conn.close()
+
+    def status(self, user_id: str = "default") -> Dict[str, Any]:
+        """Remaining burst capacity per rate limit and usage per quota"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            rates = {}
+            for key, limit, window in self._rates(user_id):
+                row = conn.execute("SELECT tat FROM rate_limits WHERE key = ?", (key,)).fetchone()
+                backlog = max((row[0] if row else now) - now, 0.0)
+                rates[key] = {"limit": limit, "remaining": max(0, int((window - backlog) / (window / limit)))}
+            quotas = {}
+            for key, period, limit in self._quotas(user_id):
+                row = conn.execute(
+                    "SELECT period, used_mb FROM quota_usage WHERE key = ?", (key,)
+                ).fetchone()
+                used = row[1] if row and row[0] == _period_id(period, now) else 0.0
+                quotas[key] = {"limit_mb": limit, "used_mb": round(used, 3)}
+            return {"rates": rates, "quotas": quotas}
+        finally:
+            conn.close()
+
+
+# Global execution limiter instance
+_execution_limiter = None
+
+def get_execution_limiter() -> ExecutionLimiter:
+    """Get or create the execution limiter for the default policy"""
+    global _execution_limiter
+    if _execution_limiter is None:
+        _execution_limiter = ExecutionLimiter()
+    return _execution_limiter
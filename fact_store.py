@@ -0,0 +1,177 @@
+"""
+MAiKO Fact Store
+Exact and near-duplicate detection for memory facts (MinHash + LSH)
+"""
+import hashlib
+import random
+import threading
+from collections import defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from config import config
+from logger import get_logger
+from memory_index import tokenize
+
+logger = get_logger(__name__)
+
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def normalize(fact: str) -> str:
+    """Canonical form used for exact-duplicate hashing"""
+    return " ".join(tokenize(fact))
+
+
+def _hash_token(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=4).digest(), "big")
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class FactStore:
+    """
+    Index of memory facts for sub-linear duplicate lookups.
+
+    Facts are keyed by a hash of their normalized text for exact matches
+    and by banded MinHash signatures for near matches. LSH candidates are
+    confirmed with the exact Jaccard similarity of their token sets, so a
+    lookup only compares against the few facts sharing a band.
+    """
+
+    def __init__(self, threshold: float = None, num_perm: int = 64, bands: int = 16, seed: int = 1):
+        """
+        Args:
+            threshold: Token-set Jaccard similarity at which facts are duplicates
+            num_perm: MinHash signature length
+            bands: LSH bands (num_perm must divide evenly)
+            seed: Seed for the MinHash permutations
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = config.MEMORY_DEDUP_THRESHOLD if threshold is None else threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = random.Random(seed)
+        self._perms = [
+            (rng.randint(1, _MERSENNE_PRIME - 1), rng.randint(0, _MERSENNE_PRIME - 1))
+            for _ in range(num_perm)
+        ]
+        self._exact: Dict[str, str] = {}
+        self._tokens: Dict[str, FrozenSet[str]] = {}
+        self._bands: Dict[str, List[Tuple[int, ...]]] = {}
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], Set[str]] = defaultdict(set)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def __contains__(self, fact: str):
+        return fact in self._tokens
+
+    def _signature(self, tokens: FrozenSet[str]) -> List[int]:
+        hashes = [_hash_token(token) for token in tokens] or [0]
+        return [
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self._perms
+        ]
+
+    def _band_keys(self, tokens: FrozenSet[str]) -> List[Tuple[int, ...]]:
+        signature = self._signature(tokens)
+        return [
+            tuple(signature[i * self.rows:(i + 1) * self.rows])
+            for i in range(self.bands)
+        ]
+
+    def add(self, fact: str):
+        with self._lock:
+            if fact in self._tokens:
+                return
+            tokens = frozenset(tokenize(fact))
+            self._tokens[fact] = tokens
+            self._exact[normalize(fact)] = fact
+            keys = self._band_keys(tokens)
+            self._bands[fact] = keys
+            for band, key in enumerate(keys):
+                self._buckets[(band, key)].add(fact)
+
+    def remove(self, fact: str):
+        with self._lock:
+            if fact not in self._tokens:
+                return
+            del self._tokens[fact]
+            normalized = normalize(fact)
+            if self._exact.get(normalized) == fact:
+                del self._exact[normalized]
+            for band, key in enumerate(self._bands.pop(fact)):
+                bucket = self._buckets[(band, key)]
+                bucket.discard(fact)
+                if not bucket:
+                    del self._buckets[(band, key)]
+
+    def sync(self, facts: Iterable[str]):
+        """Bring the store in line with the bank, hashing only new facts"""
+        facts = [str(fact) for fact in facts]
+        with self._lock:
+            current = set(facts)
+            for fact in [f for f in self._tokens if f not in current]:
+                self.remove(fact)
+            for fact in facts:
+                self.add(fact)
+
+    def find_duplicate(self, fact: str) -> Optional[str]:
+        """The stored fact that fact duplicates, if any"""
+        with self._lock:
+            exact = self._exact.get(normalize(fact))
+            if exact is not None:
+                return exact
+
+            tokens = frozenset(tokenize(fact))
+            candidates = set()
+            for band, key in enumerate(self._band_keys(tokens)):
+                candidates |= self._buckets.get((band, key), set())
+
+            best, best_score = None, self.threshold
+            for candidate in candidates:
+                score = jaccard(tokens, self._tokens[candidate])
+                if score >= best_score:
+                    best, best_score = candidate, score
+            return best
+
+    def merge(self, facts: List[str], new_facts: Iterable[str]) -> List[str]:
+        """
+        Add new_facts to the bank list, replacing duplicates.
+
+        A fact that duplicates an existing one replaces it and moves to the
+        end, so the bank keeps the newest phrasing in recency order.
+        """
+        with self._lock:
+            self.sync(facts)
+            merged = list(facts)
+            for fact in new_facts:
+                fact = str(fact).strip()
+                if not fact or fact in self._tokens:
+                    continue
+                duplicate = self.find_duplicate(fact)
+                if duplicate is not None:
+                    merged.remove(duplicate)
+                    self.remove(duplicate)
+                    logger.debug(f"Merged duplicate memory fact: {duplicate!r} -> {fact!r}")
+                merged.append(fact)
+                self.add(fact)
+            return merged
+
+
+# Global fact store instance
+_fact_store = None
+
+def get_fact_store() -> FactStore:
+    """Get or create the fact store"""
+    global _fact_store
+    if _fact_store is None:
+        _fact_store = FactStore()
+    return _fact_store
@@ -3,12 +3,51 @@ MAiKO LLM Provider Abstraction
 Provider-agnostic interface for LLM communications
 """
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from dataclasses import dataclass
+import asyncio
+import json
+import os
+import time
 import logging
 
+from batch_executor import (
+    BatchRequest, BatchJob, LocalBatchExecutor, BATCH_IN_PROGRESS, BATCH_ENDED
+)
+from telemetry import get_telemetry, RequestSpan
+from rate_limiter import get_rate_limiter, estimate_tokens, PRIORITY_INTERACTIVE
+
 logger = logging.getLogger(__name__)
 
+# Anthropic's token cost for a ~1.15 megapixel image, the largest it takes unscaled
+IMAGE_TOKEN_ESTIMATE = 1600
+
+
+def estimate_content_tokens(content: Any) -> int:
+    """
+    Token estimate for message content: a string, or a list of blocks as
+    dicts or SDK objects. Only text, tool inputs and tool results count;
+    an image costs IMAGE_TOKEN_ESTIMATE whatever the size of its base64 data.
+    """
+    if isinstance(content, str):
+        return estimate_tokens(content)
+    total = 0
+    for block in content or []:
+        if isinstance(block, dict):
+            get = block.get
+        else:
+            get = lambda key, default=None, block=block: getattr(block, key, default)
+        kind = get("type")
+        if kind == "image":
+            total += IMAGE_TOKEN_ESTIMATE
+        elif kind == "tool_use":
+            total += estimate_tokens(json.dumps(get("input", {}), default=str))
+        elif kind == "tool_result":
+            total += estimate_content_tokens(get("content", ""))
+        else:
+            total += estimate_tokens(get("text", "") or "")
+    return total
+
 
 @dataclass
 class Message:
@@ -26,6 +65,7 @@ class ModelConfig:
     top_p: float = 1.0
     frequency_penalty: float = 0.0
     presence_penalty: float = 0.0
+    batch_max_workers: int = 4
 
 
 class LLMProvider(ABC):
@@ -34,6 +74,9 @@ class LLMProvider(ABC):
     def __init__(self, config: ModelConfig):
         self.config = config
         self.name = config.name
+        self._batch_executor: Optional[LocalBatchExecutor] = None
+        self.telemetry = get_telemetry()
+        self.rate_limiter = get_rate_limiter(type(self).__name__, config.name)
 
     @abstractmethod
     def create_completion(
@@ -59,6 +102,105 @@ class LLMProvider(ABC):
         """Validate provider credentials"""
         pass
 
+    def stream_completion(
+        self,
+        messages: List[Message],
+        **kwargs
+    ) -> Iterator[str]:
+        """Stream a completion as text chunks (falls back to one chunk)"""
+        yield self.create_completion(messages, **kwargs)
+
+    def submit_batch(self, requests: List[BatchRequest]) -> str:
+        """
+        Submit bulk, deadline-tolerant work and return a batch id.
+
+        The default implementation runs the requests through
+        create_chat_completion on a bounded local thread pool. Providers
+        with a native batch API override this and poll_batch.
+        """
+        queued_at = time.time()
+        return self._get_batch_executor().submit(
+            requests,
+            lambda messages, **params: self.create_chat_completion(
+                messages, queued_at=queued_at, **params
+            )
+        )
+
+    def poll_batch(self, batch_id: str, wait: bool = False, timeout: float = None) -> BatchJob:
+        """Get the status and results of a submitted batch"""
+        return self._get_batch_executor().poll(batch_id, wait=wait, timeout=timeout)
+
+    def _get_batch_executor(self) -> LocalBatchExecutor:
+        if self._batch_executor is None:
+            self._batch_executor = LocalBatchExecutor(
+                max_workers=self.config.batch_max_workers
+            )
+        return self._batch_executor
+
+    async def acreate_completion(
+        self,
+        messages: List[Message],
+        tools: Optional[List[Dict[str, Any]]] = None,
+        **kwargs
+    ) -> str:
+        """Wait for rate-limit budget without blocking the event loop, then complete"""
+        queued_at = time.time()
+        priority = kwargs.pop("priority", PRIORITY_INTERACTIVE)
+        await self.rate_limiter.acquire_async(self._estimate_tokens(messages), priority)
+        return await asyncio.to_thread(
+            self.create_completion, messages, tools=tools,
+            queued_at=queued_at, reserved=True, **kwargs
+        )
+
+    async def acreate_chat_completion(
+        self,
+        messages: List[Message],
+        **kwargs
+    ) -> Dict[str, Any]:
+        """Async counterpart of create_chat_completion"""
+        queued_at = time.time()
+        priority = kwargs.pop("priority", PRIORITY_INTERACTIVE)
+        await self.rate_limiter.acquire_async(self._estimate_tokens(messages), priority)
+        return await asyncio.to_thread(
+            self.create_chat_completion, messages,
+            queued_at=queued_at, reserved=True, **kwargs
+        )
+
+    def _instrument(self, queued_at: float = None):
+        """Telemetry span for one request to this provider's model"""
+        return self.telemetry.span(self.name, queued_at)
+
+    def _estimate_tokens(self, messages: List[Message]) -> int:
+        return max(1, sum(estimate_content_tokens(msg.content) for msg in messages))
+
+    def _throttle(self, messages: List[Message], kwargs: Dict[str, Any]) -> Tuple[float, int]:
+        """
+        Wait for rate-limit budget, consuming the queued_at, priority and
+        reserved kwargs. Returns (queued_at, estimated tokens).
+        """
+        queued_at = kwargs.pop("queued_at", None) or time.time()
+        priority = kwargs.pop("priority", PRIORITY_INTERACTIVE)
+        estimated = self._estimate_tokens(messages)
+        if not kwargs.pop("reserved", False):
+            self.rate_limiter.acquire(estimated, priority)
+        return queued_at, estimated
+
+    def _record_usage(self, span: RequestSpan, estimated: int,
+                      input_tokens: int, output_tokens: int):
+        span.set_usage(input_tokens, output_tokens)
+        self.rate_limiter.reconcile(estimated, (input_tokens or 0) + (output_tokens or 0))
+
+    def _parse_raw(self, raw_response):
+        """Adapt rate limits from response headers and parse the body"""
+        self.rate_limiter.update_from_headers(raw_response.headers)
+        return raw_response.parse()
+
+    def _observe_error(self, error: Exception):
+        """Back off the rate limiter when the provider answers 429"""
+        response = getattr(error, "response", None)
+        if getattr(response, "status_code", None) == 429:
+            self.rate_limiter.update_from_headers(response.headers)
+
 
 class AnthropicProvider(LLMProvider):
     """Anthropic Claude provider"""
@@ -67,7 +209,8 @@ class AnthropicProvider(LLMProvider):
         super().__init__(config)
         self.api_key = api_key
         from anthropic import Anthropic
-        self.client = Anthropic(api_key=api_key)
+        # Retries are left to resilience.retry_call, so they do not multiply
+        self.client = Anthropic(api_key=api_key, max_retries=0)
 
     def create_completion(
         self,
@@ -76,26 +219,30 @@ class AnthropicProvider(LLMProvider):
         **kwargs
     ) -> str:
         """Create a completion using Claude"""
+        queued_at, estimated = self._throttle(messages, kwargs)
         try:
-            api_messages = [
-                {"role": msg.role, "content": msg.content}
-                for msg in messages
-            ]
-
-            response = self.client.messages.create(
-                model=self.config.name,
-                max_tokens=self.config.max_tokens,
-                temperature=self.config.temperature,
-                tools=tools,
-                messages=api_messages,
-                **kwargs
-            )
+            api_messages = self._to_api_messages(messages, kwargs)
+            if tools:
+                kwargs["tools"] = tools
+
+            with self._instrument(queued_at) as span:
+                response = self._parse_raw(self.client.messages.with_raw_response.create(
+                    model=self.config.name,
+                    max_tokens=self.config.max_tokens,
+                    temperature=self.config.temperature,
+                    messages=api_messages,
+                    **kwargs
+                ))
+                self._record_usage(
+                    span, estimated, response.usage.input_tokens, response.usage.output_tokens
+                )
 
             # Extract text from response
             text_blocks = [b for b in response.content if hasattr(b, 'text')]
             return "".join(b.text for b in text_blocks) if text_blocks else ""
 
         except Exception as e:
+            self._observe_error(e)
             logger.error(f"Claude completion failed: {e}")
             raise
 
@@ -105,34 +252,169 @@ class AnthropicProvider(LLMProvider):
         **kwargs
     ) -> Dict[str, Any]:
         """Create a full chat completion"""
+        response = self.create_message(messages, **kwargs)
+        return {
+            "role": "assistant",
+            "content": response.content,
+            "stop_reason": response.stop_reason,
+            "usage": {
+                "input_tokens": response.usage.input_tokens,
+                "output_tokens": response.usage.output_tokens
+            }
+        }
+
+    def create_message(
+        self,
+        messages: List[Message],
+        tools: Optional[List[Dict[str, Any]]] = None,
+        **kwargs
+    ):
+        """
+        Create a message and return the SDK response, for callers that need
+        its content blocks (e.g. tool_use) and stop_reason. Message content
+        may be a list of blocks, as in the agent loop.
+        """
+        queued_at, estimated = self._throttle(messages, kwargs)
         try:
-            api_messages = [
-                {"role": msg.role, "content": msg.content}
-                for msg in messages
-            ]
+            api_messages = self._to_api_messages(messages, kwargs)
+            if tools:
+                kwargs["tools"] = tools
+
+            with self._instrument(queued_at) as span:
+                response = self._parse_raw(self.client.messages.with_raw_response.create(
+                    model=self.config.name,
+                    max_tokens=self.config.max_tokens,
+                    temperature=self.config.temperature,
+                    messages=api_messages,
+                    **kwargs
+                ))
+                self._record_usage(
+                    span, estimated, response.usage.input_tokens, response.usage.output_tokens
+                )
+            return response
 
-            response = self.client.messages.create(
-                model=self.config.name,
-                max_tokens=self.config.max_tokens,
-                temperature=self.config.temperature,
-                messages=api_messages,
-                **kwargs
-            )
+        except Exception as e:
+            self._observe_error(e)
+            logger.error(f"Claude message failed: {e}")
+            raise
 
-            return {
-                "role": "assistant",
-                "content": response.content,
-                "stop_reason": response.stop_reason,
-                "usage": {
-                    "input_tokens": response.usage.input_tokens,
-                    "output_tokens": response.usage.output_tokens
-                }
-            }
+    def stream_completion(
+        self,
+        messages: List[Message],
+        **kwargs
+    ) -> Iterator[str]:
+        """Stream a completion using Claude"""
+        queued_at, estimated = self._throttle(messages, kwargs)
+        try:
+            api_messages = self._to_api_messages(messages, kwargs)
+
+            with self._instrument(queued_at) as span:
+                with self.client.messages.stream(
+                    model=self.config.name,
+                    max_tokens=self.config.max_tokens,
+                    temperature=self.config.temperature,
+                    messages=api_messages,
+                    **kwargs
+                ) as stream:
+                    for text in stream.text_stream:
+                        span.mark_first_token()
+                        yield text
+                    final = stream.get_final_message()
+                    self._record_usage(
+                        span, estimated, final.usage.input_tokens, final.usage.output_tokens
+                    )
 
         except Exception as e:
-            logger.error(f"Claude chat completion failed: {e}")
+            self._observe_error(e)
+            logger.error(f"Claude streaming completion failed: {e}")
             raise
 
+    def submit_batch(self, requests: List[BatchRequest]) -> str:
+        """Submit a batch through the Message Batches API"""
+        try:
+            batch_requests = []
+            for request in requests:
+                params = dict(request.params)
+                params.pop("priority", None)
+                api_messages = self._to_api_messages(request.messages, params)
+                batch_requests.append({
+                    "custom_id": request.custom_id,
+                    "params": {
+                        "model": self.config.name,
+                        "max_tokens": self.config.max_tokens,
+                        "temperature": self.config.temperature,
+                        "messages": api_messages,
+                        **params
+                    }
+                })
+
+            batch = self.client.messages.batches.create(requests=batch_requests)
+            logger.info(f"Submitted Claude batch {batch.id} ({len(requests)} requests)")
+            return batch.id
+
+        except Exception as e:
+            logger.error(f"Claude batch submission failed: {e}")
+            raise
+
+    def poll_batch(self, batch_id: str, wait: bool = False, timeout: float = None,
+                   poll_interval: float = 10.0) -> BatchJob:
+        """Get batch status, collecting results once processing has ended"""
+        deadline = time.time() + timeout if timeout else None
+        while True:
+            batch = self.client.messages.batches.retrieve(batch_id)
+            if batch.processing_status == "ended":
+                break
+            if not wait or (deadline and time.time() >= deadline):
+                counts = batch.request_counts
+                return BatchJob(
+                    batch_id=batch_id,
+                    status=BATCH_IN_PROGRESS,
+                    total=counts.processing + counts.succeeded + counts.errored
+                    + counts.canceled + counts.expired,
+                    succeeded=counts.succeeded,
+                    errored=counts.errored + counts.canceled + counts.expired
+                )
+            time.sleep(poll_interval)
+
+        job = BatchJob(batch_id=batch_id, status=BATCH_ENDED, ended_at=time.time())
+        for entry in self.client.messages.batches.results(batch_id):
+            job.total += 1
+            if entry.result.type == "succeeded":
+                message = entry.result.message
+                job.succeeded += 1
+                # Plain text, like the results of LocalBatchExecutor
+                text_blocks = [b for b in message.content if hasattr(b, 'text')]
+                job.results[entry.custom_id] = {
+                    "response": {
+                        "role": "assistant",
+                        "content": "".join(b.text for b in text_blocks),
+                        "stop_reason": message.stop_reason,
+                        "usage": {
+                            "input_tokens": message.usage.input_tokens,
+                            "output_tokens": message.usage.output_tokens
+                        }
+                    }
+                }
+            else:
+                error = getattr(entry.result, "error", None)
+                job.errored += 1
+                job.results[entry.custom_id] = {
+                    "error": str(error) if error else entry.result.type
+                }
+        return job
+
+    @staticmethod
+    def _to_api_messages(messages: List[Message], kwargs: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Convert messages, moving system messages into the system parameter"""
+        system_parts = [msg.content for msg in messages if msg.role == "system"]
+        if system_parts and "system" not in kwargs:
+            kwargs["system"] = "\n\n".join(system_parts)
+        return [
+            {"role": msg.role, "content": msg.content}
+            for msg in messages
+            if msg.role != "system"
+        ]
+
     def validate_credentials(self) -> bool:
         """Validate Anthropic API key"""
         try:
@@ -155,7 +437,8 @@ class ZhipuProvider(LLMProvider):
         from openai import OpenAI
         self.client = OpenAI(
             api_key=api_key,
-            base_url="https://api.z.ai/api/paas/v4/"
+            base_url="https://api.z.ai/api/paas/v4/",
+            max_retries=0
         )
 
     def create_completion(
@@ -165,22 +448,29 @@ class ZhipuProvider(LLMProvider):
         **kwargs
     ) -> str:
         """Create a completion using GLM"""
+        queued_at, estimated = self._throttle(messages, kwargs)
         try:
             api_messages = [
                 {"role": msg.role, "content": msg.content}
                 for msg in messages
             ]
 
-            response = self.client.chat.completions.create(
-                model=self.config.name,
-                messages=api_messages,
-                temperature=self.config.temperature,
-                **kwargs
-            )
+            with self._instrument(queued_at) as span:
+                response = self._parse_raw(self.client.chat.completions.with_raw_response.create(
+                    model=self.config.name,
+                    messages=api_messages,
+                    temperature=self.config.temperature,
+                    **kwargs
+                ))
+                if response.usage:
+                    self._record_usage(
+                        span, estimated, response.usage.prompt_tokens, response.usage.completion_tokens
+                    )
 
             return response.choices[0].message.content
 
         except Exception as e:
+            self._observe_error(e)
             logger.error(f"GLM completion failed: {e}")
             raise
 
@@ -190,18 +480,23 @@ class ZhipuProvider(LLMProvider):
         **kwargs
     ) -> Dict[str, Any]:
         """Create a full chat completion"""
+        queued_at, estimated = self._throttle(messages, kwargs)
         try:
             api_messages = [
                 {"role": msg.role, "content": msg.content}
                 for msg in messages
             ]
 
-            response = self.client.chat.completions.create(
-                model=self.config.name,
-                messages=api_messages,
-                temperature=self.config.temperature,
-                **kwargs
-            )
+            with self._instrument(queued_at) as span:
+                response = self._parse_raw(self.client.chat.completions.with_raw_response.create(
+                    model=self.config.name,
+                    messages=api_messages,
+                    temperature=self.config.temperature,
+                    **kwargs
+                ))
+                self._record_usage(
+                    span, estimated, response.usage.prompt_tokens, response.usage.completion_tokens
+                )
 
             return {
                 "role": "assistant",
@@ -213,9 +508,54 @@ class ZhipuProvider(LLMProvider):
             }
 
         except Exception as e:
+            self._observe_error(e)
             logger.error(f"GLM chat completion failed: {e}")
             raise
 
+    def stream_completion(
+        self,
+        messages: List[Message],
+        **kwargs
+    ) -> Iterator[str]:
+        """Stream a completion using GLM"""
+        queued_at, estimated = self._throttle(messages, kwargs)
+        try:
+            api_messages = [
+                {"role": msg.role, "content": msg.content}
+                for msg in messages
+            ]
+
+            # Ask for a final usage chunk; without it token counts are estimated
+            kwargs.setdefault("stream_options", {"include_usage": True})
+            with self._instrument(queued_at) as span:
+                stream = self.client.chat.completions.create(
+                    model=self.config.name,
+                    messages=api_messages,
+                    temperature=self.config.temperature,
+                    stream=True,
+                    **kwargs
+                )
+                got_usage = False
+                output_parts = []
+                for chunk in stream:
+                    usage = getattr(chunk, "usage", None)
+                    if usage:
+                        got_usage = True
+                        self._record_usage(
+                            span, estimated, usage.prompt_tokens, usage.completion_tokens
+                        )
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        span.mark_first_token()
+                        output_parts.append(chunk.choices[0].delta.content)
+                        yield chunk.choices[0].delta.content
+                if not got_usage:
+                    self._record_usage(span, estimated, estimated, estimate_tokens("".join(output_parts)))
+
+        except Exception as e:
+            self._observe_error(e)
+            logger.error(f"GLM streaming completion failed: {e}")
+            raise
+
     def validate_credentials(self) -> bool:
         """Validate Zhipu API key"""
         try:
@@ -228,17 +568,200 @@ class ZhipuProvider(LLMProvider):
             return False
 
 
-def get_provider(provider_name: str, api_key: str, config: ModelConfig) -> LLMProvider:
-    """Factory function to get the right provider"""
+DRAFT_SYSTEM_PROMPT = (
+    "You are in brainstorming mode. Focus on exploring ideas, planning, and "
+    "thinking through the problem. Provide a detailed draft response."
+)
+
+REFINE_PROMPT = (
+    "User request:\n{request}\n\n"
+    "Here is a draft response from a planning phase:\n\n{draft}\n\n"
+    "Please review, refine, and improve this response. Focus on: correctness, "
+    "reasoning quality, clarity, and execution. Provide the final polished version."
+)
+
+# Phrases that signal a draft is unsure of itself and worth refining
+UNCERTAIN_MARKERS = (
+    "i'm not sure", "i am not sure", "i don't know", "not certain",
+    "might be wrong", "i think", "possibly", "unclear", "cannot determine",
+)
+
+
+class HybridProvider(LLMProvider):
+    """
+    Mako hybrid mode: a cheap drafter (GLM) plus selective refinement (Claude).
+
+    The draft is streamed and checked as it arrives; the refinement request
+    is sent the moment the draft stream ends, and its output is streamed
+    back. Short, confident drafts skip refinement entirely.
+    """
+
+    def __init__(
+        self,
+        drafter: LLMProvider,
+        refiner: LLMProvider,
+        config: ModelConfig = None,
+        skip_max_chars: int = 600,
+        always_refine_min_chars: int = 4000
+    ):
+        """
+        Args:
+            drafter: Provider that writes the draft (e.g. ZhipuProvider)
+            refiner: Provider that polishes it (e.g. AnthropicProvider)
+            skip_max_chars: Confident drafts up to this length are returned as-is
+            always_refine_min_chars: Drafts this long are always refined
+        """
+        super().__init__(config or ModelConfig(name="mako-hybrid"))
+        self.drafter = drafter
+        self.refiner = refiner
+        self.skip_max_chars = skip_max_chars
+        self.always_refine_min_chars = always_refine_min_chars
+
+    def needs_refinement(self, draft: str) -> bool:
+        """Heuristic: refine empty, long, code-bearing or hedging drafts"""
+        text = draft.strip()
+        if not text:
+            return True
+        if len(text) >= self.always_refine_min_chars or "```" in text:
+            return True
+        lowered = text.lower()
+        if any(marker in lowered for marker in UNCERTAIN_MARKERS):
+            return True
+        return len(text) > self.skip_max_chars
+
+    def stream_events(
+        self,
+        messages: List[Message],
+        **kwargs
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Run the pipeline, yielding {"type": "draft"|"final", "text": ...}
+        chunks and finally {"type": "done", "result": {...}} with the
+        draft, final text and per-stage timings.
+        """
+        start = time.time()
+        timings: Dict[str, Optional[float]] = {
+            "draft_ttft": None, "draft_seconds": None,
+            "refine_ttft": None, "refine_seconds": None,
+        }
+
+        draft_messages = list(messages) + [Message(role="system", content=DRAFT_SYSTEM_PROMPT)]
+        draft_chunks: List[str] = []
+        for chunk in self.drafter.stream_completion(draft_messages, **kwargs):
+            if timings["draft_ttft"] is None:
+                timings["draft_ttft"] = time.time() - start
+            draft_chunks.append(chunk)
+            yield {"type": "draft", "text": chunk}
+        draft = "".join(draft_chunks)
+        draft_end = time.time()
+        timings["draft_seconds"] = draft_end - start
+
+        refined = self.needs_refinement(draft)
+        final = draft
+        if refined:
+            request = next(
+                (m.content for m in reversed(messages) if m.role == "user"), ""
+            )
+            refine_messages = [Message(
+                role="user",
+                content=REFINE_PROMPT.format(request=request, draft=draft)
+            )]
+            final_chunks: List[str] = []
+            for chunk in self.refiner.stream_completion(refine_messages, **kwargs):
+                if timings["refine_ttft"] is None:
+                    timings["refine_ttft"] = time.time() - draft_end
+                final_chunks.append(chunk)
+                yield {"type": "final", "text": chunk}
+            final = "".join(final_chunks)
+            timings["refine_seconds"] = time.time() - draft_end
+        else:
+            yield {"type": "final", "text": draft}
+
+        timings["total_seconds"] = time.time() - start
+        logger.info(
+            f"Hybrid completion: draft {timings['draft_seconds']:.2f}s, "
+            f"refined={refined}, total {timings['total_seconds']:.2f}s"
+        )
+        yield {
+            "type": "done",
+            "result": {
+                "role": "assistant",
+                "content": final,
+                "refined": refined,
+                "breakdown": {"draft": draft, "final": final},
+                "timings": timings,
+                # Estimates; exact per-stage usage is recorded in telemetry
+                "usage": {
+                    "input_tokens": self._estimate_tokens(messages),
+                    "output_tokens": estimate_tokens(final),
+                },
+            },
+        }
+
+    def create_completion(
+        self,
+        messages: List[Message],
+        tools: Optional[List[Dict[str, Any]]] = None,
+        **kwargs
+    ) -> str:
+        """Draft with the drafter and refine if needed"""
+        return self.create_chat_completion(messages, **kwargs)["content"]
+
+    def create_chat_completion(
+        self,
+        messages: List[Message],
+        **kwargs
+    ) -> Dict[str, Any]:
+        """Full hybrid completion including breakdown and stage timings"""
+        result = None
+        for event in self.stream_events(messages, **kwargs):
+            if event["type"] == "done":
+                result = event["result"]
+        return result
+
+    def stream_completion(
+        self,
+        messages: List[Message],
+        **kwargs
+    ) -> Iterator[str]:
+        """Stream the final answer (refinement output, or the kept draft)"""
+        for event in self.stream_events(messages, **kwargs):
+            if event["type"] == "final":
+                yield event["text"]
+
+    def validate_credentials(self) -> bool:
+        """Both stages need working credentials"""
+        return self.drafter.validate_credentials() and self.refiner.validate_credentials()
+
+
+def get_provider(provider_name: str, api_key: str, config: ModelConfig, **kwargs) -> LLMProvider:
+    """
+    Factory function to get the right provider
+
+    Set LLM_REPLAY_CASSETTE to serve every provider from a recording, or
+    LLM_RECORD_CASSETTE to record real traffic to one.
+    """
+    from mock_provider import MockProvider, RecordingProvider
+
     providers = {
         "anthropic": AnthropicProvider,
         "claude": AnthropicProvider,
         "zhipu": ZhipuProvider,
         "glm": ZhipuProvider,
+        "mock": MockProvider,
     }
 
     provider_class = providers.get(provider_name.lower())
     if not provider_class:
         raise ValueError(f"Unknown provider: {provider_name}")
 
-    return provider_class(api_key, config)
+    replay_cassette = os.getenv("LLM_REPLAY_CASSETTE")
+    if replay_cassette:
+        return MockProvider(api_key, config, mode="replay", cassette=replay_cassette)
+
+    provider = provider_class(api_key, config, **kwargs)
+
+    record_cassette = os.getenv("LLM_RECORD_CASSETTE")
+    if record_cassette and provider_class is not MockProvider:
+        return RecordingProvider(provider, record_cassette)
+    return provider
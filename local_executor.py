@@ -0,0 +1,602 @@
+"""
+MAiKO Local Executor
+Warm worker pool that runs Python snippets in-process-forked sandboxes
+"""
+import json
+import os
+import queue
+import select
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from code_validator import CodeValidator
+from config import config
+from execution_config import DEFAULT_SANDBOX, ExecutionEnvironment, SandboxConfig
+from execution_history import get_execution_history
+from execution_limits import ExecutionLimiter, get_execution_limiter, usage_bytes
+from logger import get_logger
+from telemetry import get_execution_telemetry
+
+logger = get_logger(__name__)
+
+
+class WorkerCrashed(Exception):
+    """Raised when a warm worker dies or stops answering"""
+    pass
+
+
+# Runs inside each warm worker: pre-imports modules, then forks one child
+# per request. Requests and replies are single JSON lines on stdin/stdout.
+WORKER_SOURCE = r'''
+import importlib, json, math, os, resource, select, signal, sys, time, traceback
+
+for name in json.loads(sys.argv[1]):
+    try:
+        importlib.import_module(name)
+    except Exception:
+        pass
+
+channel_in = sys.stdin.buffer
+channel_out = os.fdopen(os.dup(1), "wb")
+
+
+def child(request, w_out, w_err):
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.dup2(w_out, 1)
+    os.dup2(w_err, 2)
+    os.closerange(3, 65536)  # the protocol channel and pipe originals
+    memory = request["max_memory_mb"] * 1024 * 1024
+    cpu_seconds = max(1, math.ceil(request["timeout_ms"] / 1000))
+    resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (request["max_output_size"],) * 2)
+    sys.stdout = open(1, "w", closefd=False)
+    sys.stderr = open(2, "w", closefd=False)
+    status = 0
+    try:
+        exec(compile(request["code"], "<snippet>", "exec"), {"__name__": "__main__"})
+    except SystemExit as e:
+        status = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except BaseException:
+        traceback.print_exc()
+        status = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    os._exit(status)
+
+
+def run(request):
+    limit = request["max_output_size"]
+    r_out, w_out = os.pipe()
+    r_err, w_err = os.pipe()
+    start = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(r_out)
+            os.close(r_err)
+            child(request, w_out, w_err)
+        finally:
+            os._exit(1)
+    os.close(w_out)
+    os.close(w_err)
+
+    deadline = start + request["timeout_ms"] / 1000
+    buffers = {r_out: bytearray(), r_err: bytearray()}
+    open_fds = [r_out, r_err]
+    timed_out = truncated = False
+    while open_fds:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            timed_out = True
+            break
+        ready, _, _ = select.select(open_fds, [], [], remaining)
+        for fd in ready:
+            data = os.read(fd, 65536)
+            if not data:
+                open_fds.remove(fd)
+                continue
+            buffers[fd] += data
+        if len(buffers[r_out]) + len(buffers[r_err]) > limit:
+            truncated = True
+            break
+    if timed_out or truncated:
+        os.kill(pid, signal.SIGKILL)
+    _, status, usage = os.wait4(pid, 0)
+    duration_ms = (time.perf_counter() - start) * 1000
+    os.close(r_out)
+    os.close(r_err)
+
+    if os.WIFSIGNALED(status):
+        exit_code = -os.WTERMSIG(status)
+    else:
+        exit_code = os.WEXITSTATUS(status)
+    output_bytes = min(len(buffers[r_out]) + len(buffers[r_err]), limit)
+    stdout = bytes(buffers[r_out][:limit]).decode("utf-8", "replace")
+    stderr = bytes(buffers[r_err][:limit]).decode("utf-8", "replace")
+    if timed_out:
+        stderr += "\nExecution timed out after %d ms" % request["timeout_ms"]
+    elif truncated:
+        stderr += "\nOutput exceeded %d bytes" % limit
+    elif exit_code == -signal.SIGXCPU:
+        stderr += "\nCPU time limit exceeded"
+    return {
+        "success": exit_code == 0 and not timed_out and not truncated,
+        "output": stdout,
+        "error": stderr or None,
+        "exit_code": exit_code,
+        "timed_out": timed_out,
+        "truncated": truncated,
+        "duration_ms": round(duration_ms, 3),
+        "usage": {
+            "wall_ms": round(duration_ms, 3),
+            "cpu_user_ms": round(usage.ru_utime * 1000, 3),
+            "cpu_sys_ms": round(usage.ru_stime * 1000, 3),
+            # ru_maxrss is KiB on Linux, bytes on macOS
+            "peak_rss_mb": round(usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 3),
+            "output_bytes": output_bytes,
+            "exit_code": exit_code,
+        },
+    }
+
+
+channel_out.write(b'{"ready": true}\n')
+channel_out.flush()
+for line in channel_in:
+    try:
+        reply = run(json.loads(line))
+    except Exception as e:
+        reply = {"success": False, "output": None, "error": "Worker error: %s" % e}
+    channel_out.write(json.dumps(reply).encode() + b"\n")
+    channel_out.flush()
+'''
+
+
+# Runs as a session kernel: one long-lived interpreter whose namespace is
+# kept between snippets. Limits apply to the whole process, since there is
+# no child to put them on; the parent enforces the wall clock by killing it.
+KERNEL_SOURCE = r'''
+import importlib, io, json, os, resource, sys, time, traceback
+
+preload, max_memory_mb, max_output_size = json.loads(sys.argv[1])
+for name in preload:
+    try:
+        importlib.import_module(name)
+    except Exception:
+        pass
+
+channel_in = os.fdopen(os.dup(0), "rb")
+channel_out = os.fdopen(os.dup(1), "wb")
+devnull = os.open(os.devnull, os.O_RDWR)
+for fd in (0, 1, 2):
+    os.dup2(devnull, fd)
+memory = max_memory_mb * 1024 * 1024
+resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+resource.setrlimit(resource.RLIMIT_FSIZE, (max_output_size,) * 2)
+
+
+class OutputLimitExceeded(BaseException):
+    pass
+
+
+class CappedWriter(io.TextIOBase):
+    def __init__(self, budget):
+        self.parts, self.budget = [], budget
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        if len(text) > self.budget[0]:
+            self.parts.append(text[:self.budget[0]])
+            self.budget[0] = 0
+            raise OutputLimitExceeded()
+        self.parts.append(text)
+        self.budget[0] -= len(text)
+        return len(text)
+
+
+namespace = {"__name__": "__main__"}
+channel_out.write(b'{"ready": true}\n')
+channel_out.flush()
+for line in channel_in:
+    request = json.loads(line)
+    budget = [max_output_size]
+    out, err = CappedWriter(budget), CappedWriter(budget)
+    sys.stdout, sys.stderr = out, err
+    before = resource.getrusage(resource.RUSAGE_SELF)
+    start = time.perf_counter()
+    status, truncated = 0, False
+    try:
+        exec(compile(request["code"], "<session>", "exec"), namespace)
+    except SystemExit as e:
+        status = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except OutputLimitExceeded:
+        truncated, status = True, 1
+    except BaseException:
+        try:
+            traceback.print_exc()
+        except OutputLimitExceeded:
+            truncated = True
+        status = 1
+    finally:
+        sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+    duration_ms = (time.perf_counter() - start) * 1000
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    stdout, stderr = "".join(out.parts), "".join(err.parts)
+    if truncated:
+        stderr += "\nOutput exceeded %d bytes" % max_output_size
+    reply = {
+        "success": status == 0,
+        "output": stdout,
+        "error": stderr or None,
+        "exit_code": status,
+        "timed_out": False,
+        "truncated": truncated,
+        "duration_ms": round(duration_ms, 3),
+        "usage": {
+            "wall_ms": round(duration_ms, 3),
+            "cpu_user_ms": round((after.ru_utime - before.ru_utime) * 1000, 3),
+            "cpu_sys_ms": round((after.ru_stime - before.ru_stime) * 1000, 3),
+            # Peak of the kernel process so far, not of this snippet alone
+            "peak_rss_mb": round(after.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 3),
+            "output_bytes": max_output_size - budget[0],
+            "exit_code": status,
+        },
+    }
+    channel_out.write(json.dumps(reply).encode() + b"\n")
+    channel_out.flush()
+'''
+
+
+class WarmWorker:
+    """One pre-started interpreter with the allowed imports loaded"""
+
+    def __init__(self, preload: List[str], startup_timeout: float = 10.0):
+        self._start(WORKER_SOURCE, preload, startup_timeout)
+
+    def _start(self, source: str, argument: Any, startup_timeout: float):
+        self.runs = 0
+        # Relative paths resolve here rather than in the app directory
+        self.scratch = tempfile.mkdtemp(prefix="maiko-exec-")
+        self.process = subprocess.Popen(
+            [sys.executable, "-I", "-c", source, json.dumps(argument)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=self.scratch,
+            env={
+                "PATH": os.environ.get("PATH", ""),
+                "PYTHONIOENCODING": "utf-8",
+                "HOME": self.scratch,
+                "TMPDIR": self.scratch,
+            },
+        )
+        self._buffer = b""
+        try:
+            self._read_line(startup_timeout)
+        except WorkerCrashed:
+            self.close()
+            raise
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def _read_line(self, timeout: float) -> Dict[str, Any]:
+        deadline = time.monotonic() + timeout
+        fd = self.process.stdout.fileno()
+        while b"\n" not in self._buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                raise WorkerCrashed("Worker did not answer in time")
+            data = os.read(fd, 65536)
+            if not data:
+                raise WorkerCrashed(f"Worker exited with code {self.process.poll()}")
+            self._buffer += data
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return json.loads(line)
+
+    def run(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            self.process.stdin.write(json.dumps(request).encode() + b"\n")
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise WorkerCrashed(str(e))
+        self.runs += 1
+        # The worker enforces the timeout itself; this only guards against a hung worker
+        return self._read_line(request["timeout_ms"] / 1000 + 5.0)
+
+    def close(self):
+        if self.alive():
+            self.process.kill()
+        self.process.wait()
+        shutil.rmtree(self.scratch, ignore_errors=True)
+
+
+class SessionKernel(WarmWorker):
+    """A long-lived interpreter whose variables and imports persist between runs"""
+
+    def __init__(self, sandbox: SandboxConfig, startup_timeout: float = 10.0):
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+        self._start(
+            KERNEL_SOURCE,
+            [sandbox.allowed_imports, sandbox.max_memory_mb, sandbox.max_output_size],
+            startup_timeout
+        )
+
+    def run(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            self.process.stdin.write(json.dumps({"code": request["code"]}).encode() + b"\n")
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise WorkerCrashed(str(e))
+        self.runs += 1
+        try:
+            # The kernel cannot stop itself mid-snippet: the wall clock is enforced here
+            return self._read_line(request["timeout_ms"] / 1000)
+        finally:
+            self.last_used = time.monotonic()
+
+
+class LocalExecutor:
+    """
+    Runs Python snippets for ExecutionEnvironment.LOCAL.
+
+    A pool of warm worker interpreters imports sandbox.allowed_imports once;
+    each execution forks a child from a worker, so only fork cost is paid
+    per run. Children get timeout_ms (wall clock and RLIMIT_CPU),
+    max_memory_mb (RLIMIT_AS) and max_output_size (capture cap and
+    RLIMIT_FSIZE). Workers are replaced after max_runs executions or when
+    they crash.
+
+    Workers and session kernels start in their own scratch directory
+    (also HOME and TMPDIR), removed when they close, so relative paths
+    such as ".env", "chats/" or the memory bank files do not reach the
+    app's data. This is not a filesystem sandbox: absolute paths are
+    still readable and writable with the app's permissions; use the
+    Docker environment for untrusted code.
+
+    Each child is reaped with wait4, so results carry a "usage" dict of
+    wall and CPU time, peak RSS, output bytes and exit code, which is also
+    fed to the execution telemetry.
+
+    Runs count against the same ExecutionLimiter rates and quotas as
+    runs sent to the execution server.
+
+    Runs given a session_id go to that session's kernel instead, so later
+    snippets see the variables and imports of earlier ones. Kernels get
+    max_memory_mb for their whole lifetime and are killed (losing their
+    state) when a run exceeds timeout_ms. They are closed after
+    session_idle_seconds without use, and the least recently used idle one
+    is closed when more than max_sessions are open; a kernel running a
+    snippet is never evicted.
+    """
+
+    def __init__(
+        self,
+        sandbox: SandboxConfig = None,
+        pool_size: int = None,
+        max_runs: int = None,
+        max_sessions: int = None,
+        session_idle_seconds: float = None,
+        limiter: ExecutionLimiter = None
+    ):
+        self.sandbox = sandbox or DEFAULT_SANDBOX
+        if self.sandbox.environment != ExecutionEnvironment.LOCAL:
+            raise ValueError(f"LocalExecutor needs the local environment, not {self.sandbox.environment.value}")
+        self.pool_size = pool_size or config.LOCAL_EXECUTION_WORKERS
+        self.max_runs = max_runs or config.LOCAL_EXECUTION_MAX_RUNS
+        self.max_sessions = max_sessions or config.LOCAL_SESSION_MAX
+        self.session_idle_seconds = session_idle_seconds or config.LOCAL_SESSION_IDLE_SECONDS
+        self._sessions: "OrderedDict[str, SessionKernel]" = OrderedDict()
+        self._sessions_lock = threading.Lock()
+        self.validator = CodeValidator(self.sandbox)
+        self.limiter = limiter or get_execution_limiter()
+        self._idle: "queue.Queue[Optional[WarmWorker]]" = queue.Queue()
+        for _ in range(self.pool_size):
+            self._idle.put(None)  # started lazily
+        self._closed = False
+
+    def _spawn(self) -> WarmWorker:
+        return WarmWorker(self.sandbox.allowed_imports)
+
+    def _acquire(self, timeout: float) -> WarmWorker:
+        try:
+            worker = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise WorkerCrashed("No execution worker available")
+        if worker is None or not worker.alive():
+            try:
+                worker = self._spawn()
+            except Exception:
+                self._idle.put(None)
+                raise
+        return worker
+
+    def _release(self, worker: Optional[WarmWorker]):
+        if worker is not None and (worker.runs >= self.max_runs or not worker.alive()):
+            worker.close()
+            worker = None
+        if self._closed and worker is not None:
+            worker.close()
+            worker = None
+        self._idle.put(worker)
+
+    def _session(self, session_id: str) -> SessionKernel:
+        """The kernel for session_id, started if needed"""
+        with self._sessions_lock:
+            self._reap_idle()
+            kernel = self._sessions.get(session_id)
+            if kernel is not None and not kernel.alive():
+                self._sessions.pop(session_id).close()
+                kernel = None
+            if kernel is None:
+                while len(self._sessions) >= self.max_sessions and self._evict_idle():
+                    pass
+                kernel = SessionKernel(self.sandbox)
+                self._sessions[session_id] = kernel
+            self._sessions.move_to_end(session_id)
+            return kernel
+
+    def _evict_idle(self) -> bool:
+        """
+        Close the least recently used kernel that is not running a snippet
+        (caller holds the lock). When all are busy nothing is closed and the
+        new session takes the cap over max_sessions until one frees up.
+        """
+        for session_id, kernel in self._sessions.items():
+            if kernel.lock.acquire(blocking=False):
+                try:
+                    logger.info(f"Closing least recently used session {session_id}")
+                    del self._sessions[session_id]
+                    kernel.close()
+                finally:
+                    kernel.lock.release()
+                return True
+        logger.warning(f"All {len(self._sessions)} sessions are busy; going over max_sessions")
+        return False
+
+    def _reap_idle(self):
+        """Close kernels idle for longer than session_idle_seconds (caller holds the lock)"""
+        cutoff = time.monotonic() - self.session_idle_seconds
+        for session_id, kernel in list(self._sessions.items()):
+            if kernel.last_used < cutoff and not kernel.lock.locked():
+                logger.info(f"Closing idle session {session_id}")
+                self._sessions.pop(session_id).close()
+
+    def close_sessions(self, prefix: str = "") -> int:
+        """Close every session whose id starts with prefix; returns how many"""
+        with self._sessions_lock:
+            closing = [session_id for session_id in self._sessions if session_id.startswith(prefix)]
+            for session_id in closing:
+                self._sessions.pop(session_id).close()
+        return len(closing)
+
+    def sessions(self) -> List[str]:
+        with self._sessions_lock:
+            self._reap_idle()
+            return list(self._sessions)
+
+    def _run_in_session(self, session_id: str, request: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            kernel = self._session(session_id)
+        except WorkerCrashed as e:
+            return {"success": False, "error": f"Session kernel failed to start: {e}", "output": None}
+        with kernel.lock:
+            try:
+                return kernel.run(request)
+            except WorkerCrashed as e:
+                timed_out = kernel.alive()
+                kernel.close()
+                with self._sessions_lock:
+                    if self._sessions.get(session_id) is kernel:
+                        del self._sessions[session_id]
+                if timed_out:
+                    error = f"Execution timed out after {request['timeout_ms']} ms"
+                else:
+                    error = f"Session kernel exited ({e})"
+                logger.warning(f"Session {session_id} reset: {error}")
+                return {
+                    "success": False,
+                    "output": None,
+                    "error": f"{error}; the session's state was reset",
+                    "timed_out": timed_out,
+                }
+
+    def validate(self, code: str) -> Optional[str]:
+        """Reason the snippet is rejected, or None"""
+        return self.validator.validate(code, "python")
+
+    def execute(
+        self,
+        code: str,
+        language: str = "python",
+        timeout_ms: int = None,
+        session_id: str = None,
+        user_id: str = "default"
+    ) -> Dict[str, Any]:
+        """
+        Execute a snippet; returns the same shape as the execution server
+
+        Args:
+            code: Python code to execute
+            language: Must be python
+            timeout_ms: Wall-clock limit, capped by the sandbox timeout
+            session_id: Run in this session's persistent kernel instead of a fresh child
+            user_id: Whose rate limits and quotas the run counts against
+        """
+        if language.lower() != "python":
+            return {"success": False, "error": f"Local execution does not support {language}", "output": None}
+        error = self.validate(code)
+        if error:
+            return {"success": False, "error": error, "output": None}
+        decision = self.limiter.acquire(user_id)
+        if not decision.allowed:
+            return decision.to_result()
+
+        request = {
+            "code": code,
+            "timeout_ms": min(timeout_ms or self.sandbox.timeout_ms, self.sandbox.timeout_ms),
+            "max_memory_mb": self.sandbox.max_memory_mb,
+            "max_output_size": self.sandbox.max_output_size,
+        }
+        if session_id:
+            result = self._run_in_session(session_id, request)
+            result["session_id"] = session_id
+        else:
+            result = self._run_fresh(request)
+
+        result["executionId"] = str(uuid.uuid4())
+        result["language"] = "python"
+        self.limiter.record_usage(user_id, usage_bytes(code, result.get("output"), result.get("error")))
+        get_execution_telemetry().record("python", result.get("usage"))
+        get_execution_history().add(result, "python", code)
+        return result
+
+    def _run_fresh(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        worker = None
+        try:
+            worker = self._acquire(timeout=request["timeout_ms"] / 1000 + 5.0)
+            result = worker.run(request)
+        except WorkerCrashed as e:
+            logger.warning(f"Local execution worker failed: {e}")
+            if worker is not None:
+                worker.close()
+                worker = None
+            result = {"success": False, "error": f"Execution worker failed: {e}", "output": None}
+        finally:
+            self._release(worker)
+        return result
+
+    def shutdown(self):
+        self._closed = True
+        self.close_sessions()
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if worker is not None:
+                worker.close()
+
+
+# Global local executor instance
+_local_executor = None
+_local_executor_lock = threading.Lock()
+
+def get_local_executor() -> LocalExecutor:
+    """Get or create the local executor"""
+    global _local_executor
+    with _local_executor_lock:
+        if _local_executor is None:
+            _local_executor = LocalExecutor()
+        return _local_executor
@@ -0,0 +1,275 @@
+"""
+MAiKO Memory Bank
+Storage for the facts the assistant remembers about the user
+"""
+import os
+import json
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+from config import config
+from logger import get_logger
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX platforms fall back to in-process locking
+    fcntl = None
+
+logger = get_logger(__name__)
+
+
+OP_ADD = "add"
+OP_REMOVE = "remove"
+OP_REPLACE = "replace"
+
+
+def apply_ops(facts: List[str], ops: Iterable[Dict[str, Any]]) -> List[str]:
+    """
+    Replay operations onto a fact list.
+
+    Every operation is idempotent, so replaying a log tail that was already
+    folded into the snapshot (e.g. after a crash mid-compaction) is harmless.
+    """
+    for op in ops:
+        kind = op.get("op")
+        if kind in (OP_REMOVE, OP_REPLACE):
+            old = op.get("old", op.get("fact"))
+            if old in facts:
+                facts.remove(old)
+        if kind in (OP_ADD, OP_REPLACE):
+            new = op.get("new", op.get("fact"))
+            if new not in facts:
+                facts.append(new)
+    return facts
+
+
+def diff_ops(old: List[str], new: List[str]) -> List[Dict[str, Any]]:
+    """Operations turning old into new (order among unchanged facts is kept)"""
+    new_set, old_set = set(map(str, new)), set(map(str, old))
+    removed = [fact for fact in old if str(fact) not in new_set]
+    added = [fact for fact in new if str(fact) not in old_set]
+    ops = [
+        {"op": OP_REPLACE, "old": before, "new": after}
+        for before, after in zip(removed, added)
+    ]
+    ops += [{"op": OP_REMOVE, "fact": fact} for fact in removed[len(added):]]
+    ops += [{"op": OP_ADD, "fact": fact} for fact in added[len(removed):]]
+    return ops
+
+
+class MemoryBank:
+    """
+    Remembered facts stored as a JSON snapshot plus an append-only op log.
+
+    Writes append only their add/remove/replace operations to the log under
+    an exclusive file lock, re-reading the latest state first, so concurrent
+    sessions and processes merge instead of overwriting each other. Once the
+    log passes compact_after operations it is folded into a new snapshot.
+
+    Reads are cached in process and keyed by the snapshot and log file
+    stats; when only the log grew, just its new tail is read. Every observed
+    change bumps version, against which derived values (prompt strings) are
+    cached.
+    """
+
+    MAX_DERIVED = 32
+
+    def __init__(self, path: str = None, compact_after: int = None):
+        self.path = path or config.MEMORY_FILE
+        self.log_path = self.path + ".log"
+        self.lock_path = self.path + ".lock"
+        self.compact_after = compact_after or config.MEMORY_LOG_COMPACT_OPS
+        self.version = 0
+        self._lock = threading.RLock()
+        self._snapshot_key: Optional[Tuple[int, int, int]] = None
+        self._log_key: Optional[Tuple[int, int]] = None
+        self._log_offset = 0
+        self._log_ops = 0
+        self._facts: List[str] = []
+        self._derived: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        """Advisory lock shared by every process using this bank"""
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _stat(path: str) -> Optional[os.stat_result]:
+        try:
+            return os.stat(path)
+        except OSError:
+            return None
+
+    def _set_facts(self, facts: List[str]):
+        if facts != self._facts:
+            self.version += 1
+            self._derived.clear()
+        self._facts = facts
+
+    def _read_log(self, offset: int) -> Tuple[List[Dict[str, Any]], int]:
+        """Complete log records after offset and the offset they end at"""
+        try:
+            with open(self.log_path, 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return [], offset
+        end = data.rfind(b"\n") + 1  # ignore a torn final line
+        ops = []
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                ops.append(json.loads(line))
+            except ValueError:
+                logger.warning("Skipping corrupt memory log record")
+        return ops, offset + end
+
+    def _refresh(self):
+        """Bring the cached state up to date with the files on disk"""
+        snapshot_stat = self._stat(self.path)
+        log_stat = self._stat(self.log_path)
+        snapshot_key = snapshot_stat and (
+            snapshot_stat.st_ino, snapshot_stat.st_mtime_ns, snapshot_stat.st_size
+        )
+        log_key = log_stat and (log_stat.st_ino, log_stat.st_size)
+        if snapshot_key == self._snapshot_key and log_key == self._log_key:
+            return
+
+        same_log = (
+            snapshot_key == self._snapshot_key and log_key and self._log_key
+            and log_key[0] == self._log_key[0] and log_key[1] >= self._log_offset
+        )
+        if same_log:
+            # Only the log grew: apply its new tail
+            ops, self._log_offset = self._read_log(self._log_offset)
+            self._log_ops += len(ops)
+            self._set_facts(apply_ops(list(self._facts), ops))
+        else:
+            facts = []
+            if snapshot_stat:
+                with open(self.path, 'r') as f:
+                    loaded = json.load(f)
+                facts = loaded if isinstance(loaded, list) else []
+            ops, self._log_offset = self._read_log(0)
+            self._log_ops = len(ops)
+            self._set_facts(apply_ops(facts, ops))
+        self._snapshot_key = snapshot_key
+        self._log_key = log_key
+
+    def load(self) -> List[str]:
+        """Load all facts (empty if the bank is missing or unreadable)"""
+        with self._lock:
+            try:
+                with self._file_lock(exclusive=False):
+                    self._refresh()
+            except Exception as e:
+                logger.error(f"Failed to load memory bank: {e}")
+                return []
+            return list(self._facts)
+
+    def recent(self, limit: int = 20) -> List[str]:
+        """The most recently added facts"""
+        facts = self.load()
+        return facts[-limit:] if len(facts) > limit else facts
+
+    def _write_snapshot(self, facts: List[str]):
+        """Atomically replace the snapshot and start an empty log"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".memory_bank.")
+        with os.fdopen(fd, 'w') as f:
+            json.dump(facts, f)
+        os.replace(tmp_path, self.path)
+        # A fresh inode for the log tells readers to rebuild from the snapshot
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".memory_log.")
+        os.close(fd)
+        os.replace(tmp_path, self.log_path)
+
+    def _append_ops(self, ops: List[Dict[str, Any]]):
+        """Append ops (caller holds the exclusive lock)"""
+        with open(self.log_path, 'ab+') as f:
+            size = f.seek(0, os.SEEK_END)
+            if size:
+                f.seek(size - 1)
+                if f.read(1) != b"\n":
+                    # A writer died mid-record: drop the torn line, or the
+                    # next record would be glued onto it and skipped as corrupt
+                    f.seek(0)
+                    f.truncate(f.read().rfind(b"\n") + 1)
+            f.write("".join(json.dumps(op) + "\n" for op in ops).encode())
+            f.flush()
+            os.fsync(f.fileno())
+
+    def save(self, facts: List[str]) -> bool:
+        """Replace all facts, writing a new snapshot"""
+        try:
+            with self._lock, self._file_lock(exclusive=True):
+                self._write_snapshot(list(facts))
+                self._refresh()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to save memory bank: {e}")
+            return False
+
+    def apply(self, ops: List[Dict[str, Any]]) -> List[str]:
+        """Append operations to the log and return the resulting facts"""
+        return self.update(lambda facts: apply_ops(facts, ops))
+
+    def update(self, fn: Callable[[List[str]], List[str]]) -> List[str]:
+        """Apply fn to the latest facts and log only the resulting changes"""
+        with self._lock:
+            try:
+                with self._file_lock(exclusive=True):
+                    self._refresh()
+                    facts = list(self._facts)
+                    ops = diff_ops(facts, fn(list(facts)))
+                    if not ops:
+                        return facts
+                    self._append_ops(ops)
+                    self._refresh()
+                    if self._log_ops >= self.compact_after:
+                        self._compact()
+                    return list(self._facts)
+            except Exception as e:
+                logger.error(f"Failed to update memory bank: {e}")
+                return list(self._facts)
+
+    def _compact(self):
+        """Fold the log into the snapshot (caller holds the exclusive lock)"""
+        logger.info(f"Compacting memory log ({self._log_ops} operations)")
+        self._write_snapshot(list(self._facts))
+        self._refresh()
+
+    def derive(self, key: Hashable, build: Callable[[List[str]], Any]) -> Any:
+        """Value computed from the facts, rebuilt only when the bank changes"""
+        with self._lock:
+            facts = self.load()
+            if key in self._derived:
+                self._derived.move_to_end(key)
+                return self._derived[key]
+            value = build(facts)
+            self._derived[key] = value
+            if len(self._derived) > self.MAX_DERIVED:
+                self._derived.popitem(last=False)
+            return value
+
+
+# Global memory bank instance
+_memory_bank = None
+
+def get_memory_bank() -> MemoryBank:
+    """Get or create the memory bank"""
+    global _memory_bank
+    if _memory_bank is None:
+        _memory_bank = MemoryBank()
+    return _memory_bank
@@ -0,0 +1,308 @@
+"""
+MAiKO Memory Filter
+Cheap local check for whether a chat turn is worth sending to fact extraction
+"""
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+from config import config
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+
+# Turns matching these always go to the LLM (explicit memory commands)
+FORCE_PATTERN = re.compile(
+    r"\b(forget|delete|erase|remember|new name is|my name is|call me)\b", re.IGNORECASE
+)
+
+# Possessions that describe the user; "my code", "my function" do not
+PERSONAL_NOUNS = (
+    r"name|age|birthday|wife|husband|partner|spouse|boyfriend|girlfriend|son|daughter|"
+    r"kids?|children|baby|mum|mom|mother|dad|father|parents?|sister|brother|family|"
+    r"friends?|dog|cat|pets?|job|boss|team|company|employer|manager|colleagues?|"
+    r"home|house|flat|apartment|city|hometown|country|school|university|degree|"
+    r"hobby|hobbies|favou?rite|diet|allerg(?:y|ies)|doctor|health|wedding|"
+    r"native language|first language|timezone"
+)
+
+# First-person self-disclosure: "I work as...", "my sister...", "I'm allergic..."
+DISCLOSURE_PATTERN = re.compile(
+    r"\b(i am|i'm|im|i've|i have|i had|i was|i will|i'll|i work|i live|i moved|"
+    r"i like|i love|i hate|i prefer|i enjoy|i use|i own|i study|i speak|"
+    r"i don't like|i can't|we have|we live|"
+    rf"(?:my|our) (?:\w+ )?(?:{PERSONAL_NOUNS}))\b",
+    re.IGNORECASE
+)
+
+# Generic openers that carry no facts even when they contain "my"/"i'm"
+SMALL_TALK_PATTERN = re.compile(
+    r"^\s*(hi|hello|hey|thanks|thank you|ok|okay|cool|nice|great|lol|yes|no|sure|"
+    r"i'm (fine|good|ok|okay|done|back|confused|not sure)|my bad|oh my)\b[\s\W]*$",
+    re.IGNORECASE
+)
+
+FEATURE_BITS = 18
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+
+# Small labeled sample (text, worth extracting) used to bootstrap and evaluate
+SEED_SAMPLES: List[Tuple[str, int]] = [
+    ("My name is Sam and I live in Leeds", 1),
+    ("I work as a nurse on night shifts", 1),
+    ("I'm allergic to peanuts", 1),
+    ("my daughter starts school next week", 1),
+    ("I prefer Python over JavaScript for scripts", 1),
+    ("I have two cats called Pip and Pop", 1),
+    ("I moved to Berlin last year", 1),
+    ("I'm vegetarian so skip the meat recipes", 1),
+    ("remember that my wifi password hint is the dog's name", 1),
+    ("I use a Chromebook for all my coding", 1),
+    ("I'm learning Spanish for a trip in May", 1),
+    ("our team uses Postgres in production", 1),
+    ("I hate early meetings", 1),
+    ("I speak German and a little French", 1),
+    ("my birthday is on the 3rd of June", 1),
+    ("call me Mako from now on", 1),
+    ("I study mechanical engineering", 1),
+    ("we have a baby on the way", 1),
+    ("I love hiking on weekends", 1),
+    ("forget what I said about my job", 1),
+    ("what is the capital of France?", 0),
+    ("write a python function to reverse a list", 0),
+    ("hi", 0),
+    ("thanks!", 0),
+    ("can you explain how TCP handshakes work", 0),
+    ("fix this error: TypeError: 'NoneType' object is not iterable", 0),
+    ("make it shorter", 0),
+    ("ok", 0),
+    ("translate 'good morning' to Japanese", 0),
+    ("what's 17 times 23", 0),
+    ("summarize this article for me", 0),
+    ("why does my code throw a KeyError here?", 0),
+    ("I'm fine", 0),
+    ("give me three ideas for a blog post", 0),
+    ("run that again", 0),
+    ("how do I center a div", 0),
+    ("is this regex correct: ^[a-z]+$", 0),
+    ("tell me a joke", 0),
+    ("what does my error message mean", 0),
+    ("continue", 0),
+]
+
+# Labeled turns disjoint from SEED_SAMPLES, for reporting metrics on unseen text
+HELDOUT_SAMPLES: List[Tuple[str, int]] = [
+    ("I'm a backend developer at a fintech startup", 1),
+    ("my wife is a teacher", 1),
+    ("I live in a small flat in Glasgow", 1),
+    ("I've been a vegan for five years", 1),
+    ("my son is seven and loves dinosaurs", 1),
+    ("I work remotely from Lisbon", 1),
+    ("I don't like spicy food", 1),
+    ("my favourite editor is Neovim", 1),
+    ("we live near the coast", 1),
+    ("I can't drink coffee after noon", 1),
+    ("my company is switching to Kotlin", 1),
+    ("I own an old Raspberry Pi and a ThinkPad", 1),
+    ("our dog is called Biscuit", 1),
+    ("I'm colourblind so avoid red/green charts", 1),
+    ("I enjoy bouldering after work", 1),
+    ("my manager wants weekly status reports", 1),
+    ("my code is broken", 0),
+    ("can you fix my function", 0),
+    ("why does my loop not terminate", 0),
+    ("my tests pass locally but fail in CI", 0),
+    ("can you review my pull request description", 0),
+    ("is my SQL query vulnerable to injection", 0),
+    ("our API returns 500 on empty input, why?", 0),
+    ("what's wrong with my regex", 0),
+    ("how do I make my script faster", 0),
+    ("rewrite my paragraph to sound more formal", 0),
+    ("explain what a closure is", 0),
+    ("convert this JSON to YAML", 0),
+    ("what time zone is Tokyo in", 0),
+    ("hello", 0),
+    ("thank you so much", 0),
+    ("sort these numbers: 5 3 9 1", 0),
+    ("what's the difference between a list and a tuple", 0),
+    ("my bad", 0),
+    ("why is my docker build so slow", 0),
+    ("generate a haiku about autumn", 0),
+    ("does my function handle negative numbers", 0),
+    ("can you add comments to my code", 0),
+    ("debug my stack trace below", 0),
+    ("next", 0),
+]
+
+
+def _features(text: str) -> Dict[int, float]:
+    """Hashed word unigrams and bigrams, plus the rule match as a feature"""
+    tokens = TOKEN_PATTERN.findall(text.lower())
+    grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    grams.append("__rule__" if DISCLOSURE_PATTERN.search(text) else "__norule__")
+    mask = (1 << FEATURE_BITS) - 1
+    features: Dict[int, float] = {}
+    for gram in grams:
+        index = int.from_bytes(hashlib.blake2b(gram.encode(), digest_size=4).digest(), "big") & mask
+        features[index] = features.get(index, 0.0) + 1.0
+    norm = math.sqrt(sum(v * v for v in features.values())) or 1.0
+    return {k: v / norm for k, v in features.items()}
+
+
+class HashedLogisticRegression:
+    """Sparse logistic regression over hashed n-grams, trained with SGD"""
+
+    def __init__(self, weights: Dict[int, float] = None, bias: float = 0.0):
+        self.weights = weights or {}
+        self.bias = bias
+
+    def predict_proba(self, text: str) -> float:
+        z = self.bias + sum(self.weights.get(k, 0.0) * v for k, v in _features(text).items())
+        return 1.0 / (1.0 + math.exp(-max(-30.0, min(30.0, z))))
+
+    def fit(self, samples: Iterable[Tuple[str, int]], epochs: int = 20,
+            learning_rate: float = 0.5, l2: float = 1e-4, seed: int = 0):
+        samples = [(_features(text), label) for text, label in samples]
+        rng = random.Random(seed)
+        for _ in range(epochs):
+            rng.shuffle(samples)
+            for features, label in samples:
+                z = self.bias + sum(self.weights.get(k, 0.0) * v for k, v in features.items())
+                error = 1.0 / (1.0 + math.exp(-max(-30.0, min(30.0, z)))) - label
+                for k, v in features.items():
+                    w = self.weights.get(k, 0.0)
+                    self.weights[k] = w - learning_rate * (error * v + l2 * w)
+                self.bias -= learning_rate * error
+        return self
+
+    def to_dict(self):
+        return {"bias": self.bias, "weights": {str(k): v for k, v in self.weights.items()}}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "HashedLogisticRegression":
+        return cls({int(k): v for k, v in data.get("weights", {}).items()}, data.get("bias", 0.0))
+
+
+def rule_score(text: str) -> float:
+    """1.0 if the text looks like a personal statement, else 0.0"""
+    if SMALL_TALK_PATTERN.match(text):
+        return 0.0
+    return 1.0 if DISCLOSURE_PATTERN.search(text) else 0.0
+
+
+class MemoryFilter:
+    """
+    Decides whether a turn is worth a fact-extraction call.
+
+    Explicit memory commands always pass. Otherwise the trained model is
+    used when a weights file exists, falling back to the rule set.
+    """
+
+    def __init__(self, model_path: str = None, threshold: float = None):
+        self.model_path = config.MEMORY_FILTER_MODEL if model_path is None else model_path
+        self.threshold = config.MEMORY_FILTER_THRESHOLD if threshold is None else threshold
+        self.model: Optional[HashedLogisticRegression] = None
+        self.seen = 0
+        self.passed = 0
+        self._lock = threading.Lock()
+        if self.model_path and os.path.exists(self.model_path):
+            try:
+                with open(self.model_path, 'r') as f:
+                    self.model = HashedLogisticRegression.from_dict(json.load(f))
+            except Exception as e:
+                logger.error(f"Failed to load memory filter model: {e}")
+
+    def score(self, text: str) -> float:
+        if FORCE_PATTERN.search(text):
+            return 1.0
+        if self.model is not None:
+            return self.model.predict_proba(text)
+        return rule_score(text)
+
+    def should_extract(self, user_input: str) -> bool:
+        passed = self.score(user_input or "") >= self.threshold
+        with self._lock:
+            self.seen += 1
+            self.passed += int(passed)
+        return passed
+
+    def train(self, samples: Iterable[Tuple[str, int]] = None, save: bool = True):
+        """Fit the model (on the seed sample by default) and optionally save it"""
+        self.model = HashedLogisticRegression().fit(samples or SEED_SAMPLES)
+        if save and self.model_path:
+            with open(self.model_path, 'w') as f:
+                json.dump(self.model.to_dict(), f)
+        return self.model
+
+    def evaluate(self, samples: Iterable[Tuple[str, int]] = None) -> Dict[str, float]:
+        """Precision/recall of the extract decision on a labeled (held-out) sample"""
+        tp = fp = fn = tn = 0
+        for text, label in samples or HELDOUT_SAMPLES:
+            predicted = self.score(text) >= self.threshold
+            if predicted and label:
+                tp += 1
+            elif predicted:
+                fp += 1
+            elif label:
+                fn += 1
+            else:
+                tn += 1
+        total = tp + fp + fn + tn
+        precision = tp / (tp + fp) if tp + fp else 0.0
+        recall = tp / (tp + fn) if tp + fn else 0.0
+        return {
+            "samples": total,
+            "precision": round(precision, 3),
+            "recall": round(recall, 3),
+            "f1": round(2 * precision * recall / (precision + recall), 3) if precision + recall else 0.0,
+            "accuracy": round((tp + tn) / total, 3) if total else 0.0,
+            "extract_rate": round((tp + fp) / total, 3) if total else 0.0,
+            "skip_rate": round((fn + tn) / total, 3) if total else 0.0,
+        }
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "seen": self.seen,
+                "passed": self.passed,
+                "skip_rate": round(1 - self.passed / self.seen, 3) if self.seen else 0.0,
+            }
+
+
+def load_samples(path: str) -> List[Tuple[str, int]]:
+    """Read a JSONL file of {"text": ..., "label": 0|1} records"""
+    samples = []
+    with open(path, 'r') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                samples.append((record["text"], int(record["label"])))
+    return samples
+
+
+# Global memory filter instance
+_memory_filter = None
+
+def get_memory_filter() -> MemoryFilter:
+    """Get or create the memory filter"""
+    global _memory_filter
+    if _memory_filter is None:
+        _memory_filter = MemoryFilter()
+    return _memory_filter
+
+
+if __name__ == "__main__":
+    import sys
+
+    # usage: python memory_filter.py [train.jsonl [heldout.jsonl]]
+    train = load_samples(sys.argv[1]) if len(sys.argv) > 1 else SEED_SAMPLES
+    heldout = load_samples(sys.argv[2]) if len(sys.argv) > 2 else HELDOUT_SAMPLES
+    memory_filter = MemoryFilter(model_path="")
+    print("rules (held-out):", json.dumps(memory_filter.evaluate(heldout)))
+    memory_filter.train(train, save=False)
+    print("model (held-out):", json.dumps(memory_filter.evaluate(heldout)))
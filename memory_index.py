@@ -0,0 +1,158 @@
+"""
+MAiKO Memory Index
+BM25 retrieval over the memory bank so prompts carry only relevant facts
+"""
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+from config import config
+from logger import get_logger
+from rate_limiter import estimate_tokens
+
+logger = get_logger(__name__)
+
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by do does for from has have i i'm in is it its "
+    "me my of on or so that the their them they this to was we what when where "
+    "which who will with you your".split()
+)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with stopwords removed and plurals folded"""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(str(text).lower()):
+        token = token.strip("'")
+        if not token or token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class MemoryIndex:
+    """
+    Incremental BM25 index over memory facts.
+
+    sync() only tokenizes facts that are new since the last call, so keeping
+    the index in step with the bank costs one set comparison per turn.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._terms: Dict[str, Counter] = {}
+        self._lengths: Dict[str, int] = {}
+        self._df: Counter = Counter()
+        self._total_length = 0
+        self._order: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._terms)
+
+    def add(self, fact: str):
+        with self._lock:
+            self._add(fact)
+
+    def remove(self, fact: str):
+        with self._lock:
+            self._remove(fact)
+
+    def _add(self, fact: str):
+        if fact in self._terms:
+            return
+        terms = Counter(tokenize(fact))
+        self._terms[fact] = terms
+        self._lengths[fact] = sum(terms.values())
+        self._total_length += self._lengths[fact]
+        self._df.update(terms.keys())
+        self._order.setdefault(fact, len(self._order))
+
+    def _remove(self, fact: str):
+        terms = self._terms.pop(fact, None)
+        if terms is None:
+            return
+        self._total_length -= self._lengths.pop(fact)
+        self._df.subtract(terms.keys())
+        self._df += Counter()  # drop terms whose document frequency hit zero
+        self._order.pop(fact, None)
+
+    def sync(self, facts: Iterable[str]):
+        """Bring the index in line with the bank, touching only changed facts"""
+        facts = [str(fact) for fact in facts]
+        with self._lock:
+            current = set(facts)
+            for fact in [f for f in self._terms if f not in current]:
+                self._remove(fact)
+            for fact in facts:
+                self._add(fact)
+            # Position in the bank doubles as recency for tie-breaking
+            self._order = {fact: i for i, fact in enumerate(facts)}
+
+    def score(self, query: str) -> List[Tuple[str, float]]:
+        """BM25 score of every fact sharing a term with the query, best first"""
+        query_terms = set(tokenize(query))
+        with self._lock:
+            n = len(self._terms)
+            if not n or not query_terms:
+                return []
+            avg_length = self._total_length / n or 1.0
+            scores = []
+            for fact, terms in self._terms.items():
+                total = 0.0
+                for term in query_terms:
+                    tf = terms.get(term)
+                    if not tf:
+                        continue
+                    df = self._df[term]
+                    idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                    norm = 1 - self.b + self.b * self._lengths[fact] / avg_length
+                    total += idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+                if total > 0:
+                    scores.append((fact, total))
+            scores.sort(key=lambda item: (item[1], self._order.get(item[0], 0)), reverse=True)
+            return scores
+
+    def search(self, query: str, top_k: int = None, token_budget: int = None) -> List[str]:
+        """
+        Most relevant facts for the query that fit within the token budget.
+
+        When nothing matches, the most recent facts are used instead so the
+        model still has some context about the user.
+        """
+        top_k = top_k or config.MEMORY_TOP_K
+        token_budget = token_budget or config.MEMORY_TOKEN_BUDGET
+
+        ranked = [fact for fact, _ in self.score(query)]
+        if not ranked:
+            with self._lock:
+                ranked = sorted(self._order, key=self._order.get, reverse=True)
+
+        selected, used = [], 0
+        for fact in ranked:
+            cost = estimate_tokens(fact)
+            if used + cost > token_budget:
+                continue
+            selected.append(fact)
+            used += cost
+            if len(selected) >= top_k:
+                break
+        return selected
+
+
+# Global memory index instance
+_memory_index = None
+
+def get_memory_index() -> MemoryIndex:
+    """Get or create the memory index"""
+    global _memory_index
+    if _memory_index is None:
+        _memory_index = MemoryIndex()
+    return _memory_index
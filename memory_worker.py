@@ -0,0 +1,285 @@
+"""
+MAiKO Memory Worker
+Background fact extraction from chat turns, backed by a durable queue
+"""
+import json
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from config import config
+from logger import get_logger
+from fact_store import FactStore, get_fact_store
+from memory_bank import MemoryBank, get_memory_bank
+from memory_filter import MemoryFilter, get_memory_filter
+from memory_index import get_memory_index
+
+logger = get_logger(__name__)
+
+
+FORGET_KEYWORDS = ("forget", "delete", "erase")
+
+FORGET_PROMPT = (
+    "The user wants to forget something. Look at their input. Return a JSON list "
+    "of facts to KEEP (Remove the relevant ones). Existing Facts: {facts} User: {user_input}"
+)
+
+EXTRACT_PROMPT = (
+    "Extract NEW facts about the user from these conversation turns. Always include "
+    "any fact the user explicitly asks to be remembered. Return ONLY a JSON list. "
+    "Existing Knowledge (DO NOT REPEAT): {facts}\n\n{turns}"
+)
+
+
+def parse_fact_list(raw: str) -> Optional[list]:
+    """Parse a JSON list from a model reply, tolerating code fences"""
+    clean = (raw or "").strip()
+    if "```json" in clean:
+        clean = clean.split("```json")[1].split("```")[0]
+    elif "```" in clean:
+        clean = clean.split("```")[1].split("```")[0]
+    try:
+        value = json.loads(clean)
+    except (ValueError, TypeError):
+        return None
+    return value if isinstance(value, list) else None
+
+
+def is_forget_turn(user_input: str, ai_response: str) -> bool:
+    text_lower = f"{user_input} {ai_response}".lower()
+    return any(keyword in text_lower for keyword in FORGET_KEYWORDS)
+
+
+class MemoryExtractionWorker:
+    """
+    Extracts memory facts off the chat request path.
+
+    Turns are appended to a SQLite queue, so they survive restarts. A
+    background thread waits briefly to coalesce several turns into one
+    extraction prompt, then applies the result to the memory bank in a
+    single atomic update before removing the turns from the queue.
+
+    A failed batch is retried after retry_seconds, doubling per attempt,
+    so a transient provider outage does not use up MAX_ATTEMPTS at once.
+    """
+
+    MAX_ATTEMPTS = 3
+
+    def __init__(
+        self,
+        complete_fn: Callable[[str], str],
+        bank: MemoryBank = None,
+        fact_store: FactStore = None,
+        memory_filter: MemoryFilter = None,
+        queue_path: str = None,
+        coalesce_seconds: float = None,
+        max_batch: int = None,
+        retry_seconds: float = None
+    ):
+        """
+        Args:
+            complete_fn: Takes a prompt and returns the model's reply
+            bank: Memory bank to update
+            fact_store: Duplicate index used when merging new facts
+            memory_filter: Local pre-filter deciding which turns are queued
+            queue_path: SQLite file holding pending turns
+            coalesce_seconds: How long to wait for more turns before extracting
+            max_batch: Most turns folded into one extraction prompt
+            retry_seconds: Delay before the first retry of a failed batch
+        """
+        self.complete_fn = complete_fn
+        self.bank = bank or get_memory_bank()
+        self.fact_store = fact_store or get_fact_store()
+        self.memory_filter = memory_filter or get_memory_filter()
+        self.queue_path = queue_path or config.MEMORY_QUEUE_FILE
+        self.coalesce_seconds = (
+            config.MEMORY_COALESCE_SECONDS if coalesce_seconds is None else coalesce_seconds
+        )
+        self.max_batch = max_batch or config.MEMORY_BATCH_SIZE
+        self.retry_seconds = config.MEMORY_RETRY_SECONDS if retry_seconds is None else retry_seconds
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._init_queue()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.queue_path, timeout=10)
+
+    def _init_queue(self):
+        with self._connect() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS memory_turns (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_input TEXT NOT NULL,
+                    ai_response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL DEFAULT 0
+                )"""
+            )
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(memory_turns)")]
+            if "next_attempt_at" not in columns:  # queue created before retry backoff
+                conn.execute(
+                    "ALTER TABLE memory_turns ADD COLUMN next_attempt_at REAL NOT NULL DEFAULT 0"
+                )
+
+    def enqueue(self, user_input: str, ai_response: str) -> Optional[int]:
+        """Queue a finished turn for extraction and return immediately"""
+        if not self.memory_filter.should_extract(user_input):
+            logger.debug("Memory filter skipped turn")
+            return None
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO memory_turns (user_input, ai_response, created_at) VALUES (?, ?, ?)",
+                (user_input, ai_response, time.time())
+            )
+            turn_id = cursor.lastrowid
+        self._wakeup.set()
+        return turn_id
+
+    def pending_count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM memory_turns").fetchone()[0]
+
+    def _next_due_in(self) -> Optional[float]:
+        """Seconds until the earliest queued turn is due, None if the queue is empty"""
+        with self._connect() as conn:
+            due = conn.execute("SELECT MIN(next_attempt_at) FROM memory_turns").fetchone()[0]
+        return None if due is None else max(due - time.time(), 0.0)
+
+    def start(self):
+        """Start the background thread (idempotent)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="maiko-memory", daemon=True)
+        self._thread.start()
+        # Pick up turns left over from a previous run
+        self._wakeup.set()
+
+    def stop(self, timeout: float = 5.0):
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            # Sleep until new turns arrive or a backed-off batch is due
+            try:
+                due_in = self._next_due_in()
+            except sqlite3.Error as e:
+                logger.error(f"Memory worker error: {e}")
+                due_in = self.retry_seconds
+            self._wakeup.wait(due_in)
+            self._wakeup.clear()
+            if self._stopping.wait(self.coalesce_seconds):
+                break
+            try:
+                while self.process_pending():
+                    pass
+            except Exception as e:
+                logger.error(f"Memory worker error: {e}")
+                self._stopping.wait(self.retry_seconds)
+
+    def process_pending(self) -> int:
+        """Process one batch of due turns; returns how many were handled"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, user_input, ai_response, attempts FROM memory_turns "
+                "WHERE next_attempt_at <= ? ORDER BY id LIMIT ?",
+                (time.time(), self.max_batch)
+            ).fetchall()
+        if not rows:
+            return 0
+
+        turns = [
+            {"id": r[0], "user_input": r[1], "ai_response": r[2], "attempts": r[3]}
+            for r in rows
+        ]
+        # Forget requests run on their own, in order; everything else coalesces
+        if is_forget_turn(turns[0]["user_input"], turns[0]["ai_response"]):
+            segment = turns[:1]
+            ok = self._apply_forget(segment[0])
+        else:
+            segment = []
+            for turn in turns:
+                if is_forget_turn(turn["user_input"], turn["ai_response"]):
+                    break
+                segment.append(turn)
+            ok = self._apply_extraction(segment)
+
+        self._finish(segment, ok)
+        return len(segment)
+
+    def _apply_forget(self, turn: Dict) -> bool:
+        snapshot = self.bank.load()
+        try:
+            keep = parse_fact_list(self.complete_fn(FORGET_PROMPT.format(
+                facts=json.dumps(snapshot), user_input=turn["user_input"]
+            )))
+        except Exception as e:
+            logger.warning(f"Forget extraction failed: {e}")
+            return False
+        if keep is None:
+            return True  # Unparseable reply: nothing to forget
+
+        removed = [fact for fact in snapshot if fact not in keep]
+        # Remove relative to the snapshot so concurrent additions survive
+        self.bank.update(lambda facts: [fact for fact in facts if fact not in removed])
+        logger.info(f"Forgot {len(removed)} memory facts")
+        return True
+
+    def _apply_extraction(self, turns: List[Dict]) -> bool:
+        transcript = "\n\n".join(
+            f"Turn {i + 1}:\nText: {t['user_input']}\nAI Response: {t['ai_response']}"
+            for i, t in enumerate(turns)
+        )
+        # Only facts related to these turns are worth showing the extractor
+        memory_index = get_memory_index()
+        self.bank.derive("memory_index", memory_index.sync)
+        known = memory_index.search(transcript)
+        try:
+            new_facts = parse_fact_list(self.complete_fn(EXTRACT_PROMPT.format(
+                facts=json.dumps(known), turns=transcript
+            ))) or []
+        except Exception as e:
+            logger.warning(f"Fact extraction failed: {e}")
+            return False
+
+        self.bank.update(lambda facts: self.fact_store.merge(facts, new_facts))
+        logger.info(f"Extracted {len(new_facts)} facts from {len(turns)} turns")
+        return True
+
+    def _finish(self, turns: List[Dict], ok: bool):
+        """Remove handled turns; failed ones back off, up to MAX_ATTEMPTS"""
+        ids = [t["id"] for t in turns]
+        placeholders = ",".join("?" * len(ids))
+        with self._connect() as conn:
+            if ok:
+                conn.execute(f"DELETE FROM memory_turns WHERE id IN ({placeholders})", ids)
+                return
+            # Right-hand sides see the old attempts: retry_seconds, then twice that...
+            conn.execute(
+                "UPDATE memory_turns SET attempts = attempts + 1, "
+                f"next_attempt_at = ? + ? * (1 << attempts) WHERE id IN ({placeholders})",
+                [time.time(), self.retry_seconds] + ids
+            )
+            dropped = conn.execute(
+                f"DELETE FROM memory_turns WHERE id IN ({placeholders}) AND attempts >= ?",
+                ids + [self.MAX_ATTEMPTS]
+            ).rowcount
+        if dropped:
+            logger.error(f"Dropped {dropped} memory turns after {self.MAX_ATTEMPTS} attempts")
+
+
+# Global memory worker instance
+_memory_worker = None
+
+def get_memory_worker(complete_fn: Callable[[str], str]) -> MemoryExtractionWorker:
+    """Get or create the background memory worker (started on first use)"""
+    global _memory_worker
+    if _memory_worker is None:
+        _memory_worker = MemoryExtractionWorker(complete_fn)
+        _memory_worker.start()
+    return _memory_worker
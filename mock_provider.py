@@ -0,0 +1,333 @@
+"""
+MAiKO Mock Provider
+Deterministic offline provider with simulated latency and record/replay
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+import time
+import logging
+
+from llm_provider import LLMProvider, Message, ModelConfig
+from rate_limiter import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+MOCK_MODES = ("canned", "scripted", "echo", "replay")
+
+
+@dataclass
+class LatencyModel:
+    """Simulated latency: time to first token plus per-chunk delay"""
+    distribution: str = "fixed"  # fixed, uniform, normal, lognormal
+    mean_ms: float = 0.0
+    stddev_ms: float = 0.0
+    min_ms: float = 0.0
+    max_ms: float = 60000.0
+    per_chunk_ms: float = 0.0
+
+    def sample(self, rng: random.Random) -> float:
+        """Draw a time-to-first-token in seconds"""
+        if self.distribution == "uniform":
+            value = rng.uniform(self.mean_ms - self.stddev_ms, self.mean_ms + self.stddev_ms)
+        elif self.distribution == "normal":
+            value = rng.gauss(self.mean_ms, self.stddev_ms)
+        elif self.distribution == "lognormal":
+            # Parameterised by the mean/stddev of the resulting distribution
+            mean = max(self.mean_ms, 1e-6)
+            variance = self.stddev_ms ** 2
+            sigma2 = math.log(1 + variance / (mean ** 2))
+            mu = math.log(mean) - sigma2 / 2
+            value = rng.lognormvariate(mu, sigma2 ** 0.5)
+        else:
+            value = self.mean_ms
+        return min(self.max_ms, max(self.min_ms, value)) / 1000.0
+
+    @classmethod
+    def from_env(cls) -> "LatencyModel":
+        """Create latency model from environment variables"""
+        return cls(
+            distribution=os.getenv("MOCK_LATENCY_DIST", "fixed"),
+            mean_ms=float(os.getenv("MOCK_LATENCY_MS", "0")),
+            stddev_ms=float(os.getenv("MOCK_LATENCY_STDDEV_MS", "0")),
+            per_chunk_ms=float(os.getenv("MOCK_CHUNK_MS", "0")),
+        )
+
+
+def request_key(model: str, messages: List[Message], params: Dict[str, Any] = None) -> str:
+    """Stable hash of a request, used to match recordings on replay"""
+    payload = {
+        "model": model,
+        "messages": [{"role": m.role, "content": m.content} for m in messages],
+        "params": {k: v for k, v in (params or {}).items()
+                   if k not in ("queued_at", "priority", "reserved")},
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def _to_jsonable(value: Any) -> Any:
+    """Convert SDK response objects (e.g. Claude content blocks) to JSON"""
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    if isinstance(value, dict):
+        return {k: _to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_jsonable(v) for v in value]
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+class Cassette:
+    """
+    JSONL file of recorded request/response pairs.
+
+    Identical requests recorded several times replay their responses in
+    order, repeating the last one once exhausted.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursor: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        self._entries.clear()
+        self._cursor.clear()
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries.setdefault(entry["key"], []).append(entry)
+
+    def record(self, entry: Dict[str, Any]):
+        with self._lock:
+            self._entries.setdefault(entry["key"], []).append(entry)
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def next(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                return None
+            index = self._cursor.get(key, 0)
+            self._cursor[key] = index + 1
+            return entries[min(index, len(entries) - 1)]
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._entries.values())
+
+
+class MockProvider(LLMProvider):
+    """
+    Offline provider for benchmarks and load tests.
+
+    Modes:
+        canned   - always return responses[0]
+        scripted - return responses in order, cycling
+        echo     - return the last user message
+        replay   - return responses recorded in a cassette
+    """
+
+    def __init__(
+        self,
+        api_key: str = None,
+        config: ModelConfig = None,
+        mode: str = None,
+        responses: List[str] = None,
+        latency: LatencyModel = None,
+        seed: int = None,
+        cassette: str = None,
+        replay_latency: bool = True
+    ):
+        super().__init__(config or ModelConfig(name="mock"))
+        self.mode = mode or os.getenv("MOCK_MODE", "echo")
+        if self.mode not in MOCK_MODES:
+            raise ValueError(f"Unknown mock mode: {self.mode}")
+        self.responses = responses or ["This is a mock response."]
+        self.latency = latency or LatencyModel.from_env()
+        self.replay_latency = replay_latency
+        self.cassette = None
+        cassette = cassette or os.getenv("MOCK_CASSETTE")
+        if self.mode == "replay":
+            if not cassette:
+                raise ValueError("Replay mode needs a cassette path")
+            self.cassette = Cassette(cassette)
+        self._rng = random.Random(int(os.getenv("MOCK_SEED", "0")) if seed is None else seed)
+        self._script_index = 0
+        self._lock = threading.Lock()
+
+    def create_completion(
+        self,
+        messages: List[Message],
+        tools: Optional[List[Dict[str, Any]]] = None,
+        **kwargs
+    ) -> str:
+        """Return a mock completion after the simulated latency"""
+        return "".join(self.stream_completion(messages, **kwargs))
+
+    def create_chat_completion(
+        self,
+        messages: List[Message],
+        **kwargs
+    ) -> Dict[str, Any]:
+        """Return a mock chat completion after the simulated latency"""
+        queued_at = self._pop_request_kwargs(kwargs)
+        with self._instrument(queued_at) as span:
+            text, delay, recorded = self._respond(messages, kwargs)
+            time.sleep(delay)
+            if recorded is not None:
+                response = recorded
+            else:
+                response = {
+                    "role": "assistant",
+                    "content": text,
+                    "usage": {
+                        "input_tokens": self._estimate_tokens(messages),
+                        "output_tokens": estimate_tokens(text)
+                    }
+                }
+            usage = response.get("usage", {})
+            span.set_usage(usage.get("input_tokens", 0), usage.get("output_tokens", 0))
+        return response
+
+    def stream_completion(
+        self,
+        messages: List[Message],
+        **kwargs
+    ) -> Iterator[str]:
+        """Stream a mock completion word by word with simulated delays"""
+        queued_at = self._pop_request_kwargs(kwargs)
+        with self._instrument(queued_at) as span:
+            text, delay, _ = self._respond(messages, kwargs)
+            time.sleep(delay)
+            chunks = [word + " " for word in text.split(" ")]
+            chunks[-1] = chunks[-1][:-1]
+            for i, chunk in enumerate(chunks):
+                if i and self.latency.per_chunk_ms:
+                    time.sleep(self.latency.per_chunk_ms / 1000.0)
+                span.mark_first_token()
+                yield chunk
+            span.set_usage(self._estimate_tokens(messages), estimate_tokens(text))
+
+    def validate_credentials(self) -> bool:
+        """Mock credentials are always valid"""
+        return True
+
+    def _pop_request_kwargs(self, kwargs: Dict[str, Any]) -> Optional[float]:
+        # The mock is never rate limited, so benchmarks measure the caller
+        kwargs.pop("priority", None)
+        kwargs.pop("reserved", None)
+        return kwargs.pop("queued_at", None)
+
+    def _respond(self, messages: List[Message], params: Dict[str, Any]):
+        """Pick the response text, first-token delay and any recorded payload"""
+        with self._lock:
+            delay = self.latency.sample(self._rng)
+
+            if self.mode == "replay":
+                key = request_key(self.name, messages, params)
+                entry = self.cassette.next(key)
+                if entry is None:
+                    raise KeyError(f"No recording for request {key[:12]} in {self.cassette.path}")
+                if self.replay_latency:
+                    delay = entry.get("latency", 0.0)
+                response = entry["response"]
+                if isinstance(response, dict):
+                    return _response_text(response), delay, response
+                return response, delay, None
+
+            if self.mode == "canned":
+                text = self.responses[0]
+            elif self.mode == "scripted":
+                text = self.responses[self._script_index % len(self.responses)]
+                self._script_index += 1
+            else:
+                user_messages = [m.content for m in messages if m.role == "user"]
+                text = str(user_messages[-1]) if user_messages else ""
+            return text, delay, None
+
+
+def _response_text(response: Dict[str, Any]) -> str:
+    content = response.get("content", "")
+    if isinstance(content, list):
+        return "".join(block.get("text", "") for block in content if isinstance(block, dict))
+    return content or ""
+
+
+class RecordingProvider(LLMProvider):
+    """Wraps a real provider and records its traffic to a cassette"""
+
+    def __init__(self, provider: LLMProvider, cassette: str):
+        super().__init__(provider.config)
+        self.provider = provider
+        self.cassette = Cassette(cassette)
+
+    def create_completion(
+        self,
+        messages: List[Message],
+        tools: Optional[List[Dict[str, Any]]] = None,
+        **kwargs
+    ) -> str:
+        """Forward to the wrapped provider and record the completion"""
+        key = request_key(self.name, messages, kwargs)
+        start = time.time()
+        text = self.provider.create_completion(messages, tools=tools, **kwargs)
+        self._record(key, "create_completion", messages, text, start)
+        return text
+
+    def create_chat_completion(
+        self,
+        messages: List[Message],
+        **kwargs
+    ) -> Dict[str, Any]:
+        """Forward to the wrapped provider and record the full response"""
+        key = request_key(self.name, messages, kwargs)
+        start = time.time()
+        response = self.provider.create_chat_completion(messages, **kwargs)
+        self._record(key, "create_chat_completion", messages, _to_jsonable(response), start)
+        return response
+
+    def stream_completion(
+        self,
+        messages: List[Message],
+        **kwargs
+    ) -> Iterator[str]:
+        """Forward the stream, recording the joined text once it completes"""
+        key = request_key(self.name, messages, kwargs)
+        start = time.time()
+        chunks = []
+        for chunk in self.provider.stream_completion(messages, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        self._record(key, "create_completion", messages, "".join(chunks), start)
+
+    def validate_credentials(self) -> bool:
+        return self.provider.validate_credentials()
+
+    def _record(self, key: str, method: str, messages: List[Message], response: Any, start: float):
+        self.cassette.record({
+            "key": key,
+            "provider": type(self.provider).__name__,
+            "model": self.name,
+            "method": method,
+            "messages": [{"role": m.role, "content": _to_jsonable(m.content)} for m in messages],
+            "response": response,
+            "latency": time.time() - start,
+            "recorded_at": time.time(),
+        })
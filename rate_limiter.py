@@ -0,0 +1,295 @@
+"""
+MAiKO Rate Limiter
+Client-side adaptive token buckets per provider and model
+"""
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Mapping, Optional, Tuple
+import asyncio
+import os
+import re
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Request priorities: background work yields to interactive chat turns
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BACKGROUND = "background"
+
+
+class RateLimitTimeout(Exception):
+    """Raised when rate-limit budget does not free up within the timeout"""
+    pass
+
+
+@dataclass
+class RateLimitConfig:
+    """Initial per-model budgets (adapted later from response headers)"""
+    requests_per_minute: int = 50
+    tokens_per_minute: int = 40000
+    # Fraction of each budget background calls may not dip into
+    background_reserve: float = 0.25
+    # Longest single sleep while waiting, so priorities are re-checked
+    max_sleep_seconds: float = 1.0
+
+    def to_dict(self):
+        """Convert config to dictionary"""
+        return {
+            "requests_per_minute": self.requests_per_minute,
+            "tokens_per_minute": self.tokens_per_minute,
+            "background_reserve": self.background_reserve,
+            "max_sleep_seconds": self.max_sleep_seconds,
+        }
+
+    @classmethod
+    def from_env(cls) -> "RateLimitConfig":
+        """Create config from environment variables"""
+        return cls(
+            requests_per_minute=int(os.getenv("LLM_REQUESTS_PER_MINUTE", "50")),
+            tokens_per_minute=int(os.getenv("LLM_TOKENS_PER_MINUTE", "40000")),
+            background_reserve=float(os.getenv("LLM_BACKGROUND_RESERVE", "0.25")),
+        )
+
+
+class TokenBucket:
+    """Continuously refilling token bucket"""
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def refill(self, now: float = None):
+        now = now or time.monotonic()
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_per_second)
+            self.updated_at = now
+
+    def wait_time(self, amount: float, reserve: float = 0.0) -> float:
+        """Seconds until amount can be taken while leaving reserve untouched"""
+        # A request larger than the whole bucket is allowed once it is full
+        needed = min(amount + reserve, self.capacity)
+        if self.tokens >= needed:
+            return 0.0
+        if self.refill_per_second <= 0:
+            return float("inf")
+        return (needed - self.tokens) / self.refill_per_second
+
+    def take(self, amount: float):
+        self.tokens -= amount
+
+    def adapt(self, limit: float = None, remaining: float = None):
+        """Adopt the limit/remaining values reported by the provider"""
+        if limit:
+            self.capacity = float(limit)
+            self.refill_per_second = float(limit) / 60.0
+        if remaining is not None:
+            self.tokens = min(self.capacity, float(remaining))
+        self.updated_at = time.monotonic()
+
+
+def _parse_reset(value: str) -> Optional[float]:
+    """Parse a reset header ("1s", "6m0s", "20ms" or RFC 3339) into seconds"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    if "T" in value:
+        try:
+            reset_at = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            return max(0.0, (reset_at - datetime.now(timezone.utc)).total_seconds())
+        except ValueError:
+            return None
+    units = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+    parts = re.findall(r"([\d.]+)(ms|h|m|s)", value)
+    if not parts:
+        return None
+    return sum(float(number) * units[unit] for number, unit in parts)
+
+
+def _header_number(headers: Mapping[str, str], *names: str) -> Optional[float]:
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            try:
+                return float(value)
+            except ValueError:
+                continue
+    return None
+
+
+class ModelRateLimiter:
+    """Request and token budgets for one provider model"""
+
+    def __init__(self, config: RateLimitConfig = None):
+        self.config = config or DEFAULT_RATE_LIMITS
+        self.requests = TokenBucket(
+            self.config.requests_per_minute, self.config.requests_per_minute / 60.0
+        )
+        self.tokens = TokenBucket(
+            self.config.tokens_per_minute, self.config.tokens_per_minute / 60.0
+        )
+        self.paused_until = 0.0
+        self.interactive_waiting = 0
+        self.throttled_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def _try_acquire(self, tokens: int, priority: str) -> float:
+        """Take budget if available; otherwise return seconds to wait"""
+        now = time.monotonic()
+        with self._lock:
+            if now < self.paused_until:
+                return self.paused_until - now
+
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            background = priority == PRIORITY_BACKGROUND
+            if background and self.interactive_waiting:
+                return self.config.max_sleep_seconds
+
+            reserve = self.config.background_reserve if background else 0.0
+            wait = max(
+                self.requests.wait_time(1, reserve * self.requests.capacity),
+                self.tokens.wait_time(tokens, reserve * self.tokens.capacity),
+            )
+            if wait <= 0:
+                self.requests.take(1)
+                self.tokens.take(tokens)
+            return wait
+
+    def acquire(self, tokens: int, priority: str = PRIORITY_INTERACTIVE,
+                timeout: float = None) -> float:
+        """Block until budget is available; returns the seconds waited"""
+        start = time.monotonic()
+        with self._waiting(priority):
+            while True:
+                wait = self._try_acquire(tokens, priority)
+                if wait <= 0:
+                    break
+                self._check_timeout(start, wait, timeout)
+                time.sleep(min(wait, self.config.max_sleep_seconds))
+        return self._finish(start)
+
+    async def acquire_async(self, tokens: int, priority: str = PRIORITY_INTERACTIVE,
+                            timeout: float = None) -> float:
+        """Like acquire, but waits with asyncio.sleep"""
+        start = time.monotonic()
+        with self._waiting(priority):
+            while True:
+                wait = self._try_acquire(tokens, priority)
+                if wait <= 0:
+                    break
+                self._check_timeout(start, wait, timeout)
+                await asyncio.sleep(min(wait, self.config.max_sleep_seconds))
+        return self._finish(start)
+
+    @contextmanager
+    def _waiting(self, priority: str):
+        """Count waiting interactive callers so background work yields to them"""
+        interactive = priority != PRIORITY_BACKGROUND
+        if interactive:
+            with self._lock:
+                self.interactive_waiting += 1
+        try:
+            yield
+        finally:
+            if interactive:
+                with self._lock:
+                    self.interactive_waiting -= 1
+
+    def _check_timeout(self, start: float, wait: float, timeout: Optional[float]):
+        if timeout is not None and time.monotonic() - start + wait > timeout:
+            raise RateLimitTimeout(f"Rate limit budget unavailable for {wait:.1f}s")
+
+    def _finish(self, start: float) -> float:
+        waited = time.monotonic() - start
+        if waited > 0.01:
+            with self._lock:
+                self.throttled_seconds += waited
+            logger.debug(f"Rate limiter delayed request by {waited:.2f}s")
+        return waited
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: int):
+        """Correct the token bucket once real usage is known"""
+        with self._lock:
+            self.tokens.take(actual_tokens - estimated_tokens)
+
+    def update_from_headers(self, headers: Mapping[str, str]):
+        """Adapt budgets from Anthropic or OpenAI-style rate-limit headers"""
+        if not headers:
+            return
+        headers = {k.lower(): v for k, v in dict(headers).items()}
+        with self._lock:
+            request_limit = _header_number(
+                headers, "anthropic-ratelimit-requests-limit", "x-ratelimit-limit-requests"
+            )
+            request_remaining = _header_number(
+                headers, "anthropic-ratelimit-requests-remaining", "x-ratelimit-remaining-requests"
+            )
+            if request_limit or request_remaining is not None:
+                self.requests.adapt(request_limit, request_remaining)
+
+            token_limit = _header_number(
+                headers, "anthropic-ratelimit-tokens-limit", "x-ratelimit-limit-tokens"
+            )
+            token_remaining = _header_number(
+                headers, "anthropic-ratelimit-tokens-remaining", "x-ratelimit-remaining-tokens"
+            )
+            if token_limit or token_remaining is not None:
+                self.tokens.adapt(token_limit, token_remaining)
+
+            retry_after = _parse_reset(headers.get("retry-after"))
+            if retry_after:
+                self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+            elif request_remaining == 0 or token_remaining == 0:
+                reset = _parse_reset(
+                    headers.get("anthropic-ratelimit-requests-reset")
+                    or headers.get("x-ratelimit-reset-requests")
+                    or headers.get("anthropic-ratelimit-tokens-reset")
+                    or headers.get("x-ratelimit-reset-tokens")
+                )
+                if reset:
+                    self.paused_until = max(self.paused_until, time.monotonic() + reset)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            self.requests.refill()
+            self.tokens.refill()
+            return {
+                "requests_available": round(self.requests.tokens, 2),
+                "requests_per_minute": self.requests.capacity,
+                "tokens_available": round(self.tokens.tokens, 2),
+                "tokens_per_minute": self.tokens.capacity,
+                "throttled_seconds": round(self.throttled_seconds, 3),
+            }
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token)"""
+    return max(1, len(text) // 4)
+
+
+# Global limiter registry
+_limiters: Dict[Tuple[str, str], ModelRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(provider: str, model: str) -> ModelRateLimiter:
+    """Get or create the limiter shared by all clients of a provider model"""
+    key = (provider, model)
+    with _limiters_lock:
+        if key not in _limiters:
+            _limiters[key] = ModelRateLimiter()
+        return _limiters[key]
+
+
+# Default rate limit configuration
+DEFAULT_RATE_LIMITS = RateLimitConfig.from_env()
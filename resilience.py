@@ -0,0 +1,418 @@
+"""
+MAiKO Provider Resilience
+Retries, hedged requests, circuit breaking and cross-provider failover
+"""
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import os
+import random
+import threading
+import time
+import logging
+
+from llm_provider import LLMProvider, Message
+
+logger = logging.getLogger(__name__)
+
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits, server errors
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+# SDK exception class names that signal a transient failure
+RETRYABLE_ERROR_NAMES = (
+    "Timeout", "Connection", "RateLimit", "InternalServer", "Overloaded",
+    "ServiceUnavailable",
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised when every provider's circuit breaker is open"""
+    pass
+
+
+@dataclass
+class ResilienceConfig:
+    """Retry, hedging and circuit breaker parameters"""
+    # Retries (full-jitter exponential backoff)
+    max_retries: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+
+    # Hedged requests
+    hedge_enabled: bool = False
+    hedge_percentile: float = 0.95
+    hedge_min_samples: int = 20
+    hedge_workers: int = 8
+
+    # Circuit breaker
+    breaker_failure_threshold: int = 5
+    breaker_reset_seconds: float = 30.0
+
+    def to_dict(self):
+        """Convert config to dictionary"""
+        return {
+            "max_retries": self.max_retries,
+            "base_delay": self.base_delay,
+            "max_delay": self.max_delay,
+            "hedge_enabled": self.hedge_enabled,
+            "hedge_percentile": self.hedge_percentile,
+            "hedge_min_samples": self.hedge_min_samples,
+            "hedge_workers": self.hedge_workers,
+            "breaker_failure_threshold": self.breaker_failure_threshold,
+            "breaker_reset_seconds": self.breaker_reset_seconds,
+        }
+
+    @classmethod
+    def from_env(cls) -> "ResilienceConfig":
+        """Create config from environment variables"""
+        return cls(
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", "3")),
+            base_delay=float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5")),
+            max_delay=float(os.getenv("LLM_RETRY_MAX_DELAY", "8.0")),
+            hedge_enabled=os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true",
+            hedge_percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95")),
+            hedge_min_samples=int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20")),
+            hedge_workers=int(os.getenv("LLM_HEDGE_WORKERS", "8")),
+            breaker_failure_threshold=int(os.getenv("LLM_BREAKER_THRESHOLD", "5")),
+            breaker_reset_seconds=float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30")),
+        )
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Check whether an error is transient and worth retrying"""
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    name = type(error).__name__
+    return any(marker in name for marker in RETRYABLE_ERROR_NAMES)
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Read a Retry-After hint from an error's HTTP response, if any"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, config: ResilienceConfig) -> float:
+    """Full-jitter exponential backoff for the given attempt number"""
+    return random.uniform(0, min(config.max_delay, config.base_delay * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """Per-provider circuit breaker (closed -> open -> half-open)"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """Check whether a call may go through right now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.time() - self.opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                # Let a single probe through to test recovery
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning("Circuit breaker opened")
+                self.state = self.OPEN
+                self.opened_at = time.time()
+                self._probe_in_flight = False
+
+    def to_dict(self):
+        return {"state": self.state, "failures": self.failures}
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies"""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def count(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, p: float) -> Optional[float]:
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(p * len(ordered)))
+        return ordered[index]
+
+
+def retry_call(
+    fn: Callable[[], Any],
+    config: ResilienceConfig = None,
+    breaker: CircuitBreaker = None,
+    label: str = "LLM call"
+) -> Any:
+    """Call fn, retrying transient errors with jittered exponential backoff"""
+    config = config or DEFAULT_RESILIENCE
+    for attempt in range(config.max_retries + 1):
+        try:
+            result = fn()
+            if breaker:
+                breaker.record_success()
+            return result
+        except Exception as e:
+            retryable = is_retryable(e)
+            if breaker:
+                # A non-transient error still proves the endpoint is answering
+                if retryable:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+            if not retryable or attempt >= config.max_retries:
+                raise
+            if breaker and not breaker.allow_request():
+                raise
+            delay = retry_after_seconds(e)
+            if delay is None:
+                delay = backoff_delay(attempt, config)
+            logger.warning(
+                f"{label} failed ({type(e).__name__}), "
+                f"retry {attempt + 1}/{config.max_retries} in {delay:.2f}s"
+            )
+            time.sleep(delay)
+
+
+class ResilientProvider(LLMProvider):
+    """
+    Wraps one or more providers with retries, hedging and failover.
+
+    Providers are tried in order; each has its own circuit breaker, so a
+    degraded primary is skipped until its breaker lets a probe through,
+    after which traffic fails back to it automatically. Breakers, latency
+    trackers and the hedge pool are process-wide, so a wrapper rebuilt on
+    every Streamlit rerun keeps its history and adds no threads.
+    """
+
+    def __init__(self, providers: List[LLMProvider], config: ResilienceConfig = None):
+        if not providers:
+            raise ValueError("ResilientProvider needs at least one provider")
+        super().__init__(providers[0].config)
+        self.providers = providers
+        self.resilience = config or DEFAULT_RESILIENCE
+        self.breakers: Dict[int, CircuitBreaker] = {
+            id(p): breaker_for(p, self.resilience) for p in providers
+        }
+        self.latencies: Dict[int, LatencyTracker] = {id(p): latency_tracker_for(p) for p in providers}
+        self._hedge_pool = get_hedge_pool(self.resilience)
+
+    def create_completion(
+        self,
+        messages: List[Message],
+        tools: Optional[List[Dict[str, Any]]] = None,
+        **kwargs
+    ) -> str:
+        """Create a completion with retries and failover"""
+        return self._call("create_completion", messages, tools=tools, **kwargs)
+
+    def create_chat_completion(
+        self,
+        messages: List[Message],
+        **kwargs
+    ) -> Dict[str, Any]:
+        """Create a full chat completion with retries and failover"""
+        return self._call("create_chat_completion", messages, **kwargs)
+
+    def validate_credentials(self) -> bool:
+        """Valid if any wrapped provider has working credentials"""
+        return any(p.validate_credentials() for p in self.providers)
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Breaker state and latency summary per wrapped provider"""
+        return [
+            {
+                "provider": type(p).__name__,
+                "model": p.name,
+                "breaker": self.breakers[id(p)].to_dict(),
+                "p95_latency": self.latencies[id(p)].percentile(0.95),
+            }
+            for p in self.providers
+        ]
+
+    def _call(self, method: str, *args, **kwargs):
+        last_error: Optional[Exception] = None
+        for provider in self.providers:
+            breaker = self.breakers[id(provider)]
+            if not breaker.allow_request():
+                logger.info(f"Skipping {provider.name}: circuit open")
+                continue
+            try:
+                return retry_call(
+                    lambda: self._attempt(provider, method, *args, **kwargs),
+                    self.resilience,
+                    breaker,
+                    label=provider.name
+                )
+            except Exception as e:
+                last_error = e
+                logger.error(f"{provider.name} failed, trying next provider: {e}")
+
+        if last_error is None:
+            raise CircuitOpenError("All providers are unavailable (circuits open)")
+        raise last_error
+
+    def _attempt(self, provider: LLMProvider, method: str, *args, **kwargs):
+        tracker = self.latencies[id(provider)]
+        fn = getattr(provider, method)
+
+        threshold = None
+        if self.resilience.hedge_enabled and tracker.count() >= self.resilience.hedge_min_samples:
+            threshold = tracker.percentile(self.resilience.hedge_percentile)
+
+        start = time.time()
+        if threshold is None:
+            result = fn(*args, **kwargs)
+            tracker.record(time.time() - start)
+            return result
+
+        # Hedge: fire a second identical request if the first is slower than pXX
+        futures = [self._hedge_pool.submit(fn, *args, **kwargs)]
+        done, _ = wait(futures, timeout=threshold)
+        if not done:
+            logger.info(f"Hedging {provider.name} request after {threshold:.2f}s")
+            futures.append(self._hedge_pool.submit(fn, *args, **kwargs))
+
+        first_error = None
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    tracker.record(time.time() - start)
+                    return future.result()
+                first_error = first_error or future.exception()
+        raise first_error
+
+
+def failover_order(primary: str) -> List[str]:
+    """Provider names to try for a primary, following LLM_FAILOVER_ORDER"""
+    order = [
+        name.strip().lower()
+        for name in os.getenv("LLM_FAILOVER_ORDER", "glm,claude").split(",")
+        if name.strip()
+    ]
+    return [primary] + [name for name in order if name != primary]
+
+
+def build_failover_provider(
+    providers: Dict[str, Optional[LLMProvider]],
+    primary: str,
+    include_primary: bool = True,
+    config: ResilienceConfig = None
+) -> Optional[ResilientProvider]:
+    """
+    Build a ResilientProvider that fails over between named providers.
+
+    e.g. primary="glm" gives GLM -> Claude and primary="claude" gives
+    Claude -> GLM; LLM_FAILOVER_ORDER="glm" disables failover to Claude.
+    Returns None when no configured provider is left in the chain.
+    """
+    names = failover_order(primary)
+    if not include_primary:
+        names = names[1:]
+    chain = [providers[name] for name in names if providers.get(name)]
+    return ResilientProvider(chain, config) if chain else None
+
+
+def _endpoint_key(provider: LLMProvider) -> Tuple[str, str]:
+    return (type(provider).__name__, provider.config.name)
+
+
+_breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def breaker_for(provider: LLMProvider, config: ResilienceConfig = None) -> CircuitBreaker:
+    """
+    Get the process-wide circuit breaker for a provider's endpoint.
+
+    Breakers are keyed by provider class and model name rather than by
+    instance, so providers rebuilt on every Streamlit rerun share one
+    breaker and the registry stays bounded.
+    """
+    config = config or DEFAULT_RESILIENCE
+    key = _endpoint_key(provider)
+    with _breakers_lock:
+        if key not in _breakers:
+            _breakers[key] = CircuitBreaker(
+                config.breaker_failure_threshold,
+                config.breaker_reset_seconds
+            )
+        return _breakers[key]
+
+
+_latency_trackers: Dict[Tuple[str, str], LatencyTracker] = {}
+
+def latency_tracker_for(provider: LLMProvider) -> LatencyTracker:
+    """Get the process-wide latency tracker for a provider's endpoint"""
+    key = _endpoint_key(provider)
+    with _breakers_lock:
+        if key not in _latency_trackers:
+            _latency_trackers[key] = LatencyTracker()
+        return _latency_trackers[key]
+
+
+_hedge_pool: Optional[ThreadPoolExecutor] = None
+
+def get_hedge_pool(config: ResilienceConfig = None) -> ThreadPoolExecutor:
+    """Get or create the thread pool shared by all hedged requests"""
+    global _hedge_pool
+    config = config or DEFAULT_RESILIENCE
+    with _breakers_lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(
+                max_workers=config.hedge_workers,
+                thread_name_prefix="maiko-hedge"
+            )
+        return _hedge_pool
+
+
+# Default resilience configuration
+DEFAULT_RESILIENCE = ResilienceConfig.from_env()
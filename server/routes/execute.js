@@ -1,5 +1,5 @@
 const express = require('express');
-const { exec } = require('child_process');
+const { exec, spawn } = require('child_process');
 const { promisify } = require('util');
 const { v4: uuidv4 } = require('uuid');
 const { validateExecutionRequest, sanitizeOutput } = require('../utils/validator');
@@ -7,13 +7,29 @@ const { validateExecutionRequest, sanitizeOutput } = require('../utils/validator
 const router = express.Router();
 const execAsync = promisify(exec);
 
-// In-memory execution cache (for development)
+// In-memory execution cache (for development), oldest entries evicted first
 const executionCache = new Map();
+const EXECUTION_CACHE_MAX_ITEMS = parseInt(process.env.EXECUTION_CACHE_MAX_ITEMS || '500', 10);
+
+// Execution limits (match SandboxConfig defaults); requests may only lower them
+const EXECUTION_TIMEOUT_MS = parseInt(process.env.TIMEOUT || '5000', 10);
+const MAX_OUTPUT_SIZE = parseInt(process.env.MAX_OUTPUT_SIZE || String(10 * 1024 * 1024), 10);
+
+// Batch execution limits
+const BATCH_MAX_ITEMS = parseInt(process.env.EXECUTION_BATCH_MAX_ITEMS || '20', 10);
+const BATCH_CONCURRENCY = parseInt(process.env.EXECUTION_BATCH_CONCURRENCY || '4', 10);
+
+/**
+ * A requested timeout in ms, clamped to the sandbox maximum
+ */
+function clampTimeout(requested) {
+  return Math.min(parseInt(requested, 10) || EXECUTION_TIMEOUT_MS, EXECUTION_TIMEOUT_MS);
+}
 
 /**
  * Execute code based on language
  */
-async function executeCode(code, language) {
+async function executeCode(code, language, timeoutMs = EXECUTION_TIMEOUT_MS) {
   let command;
 
   switch (language.toLowerCase()) {
@@ -33,24 +49,65 @@ async function executeCode(code, language) {
 
   try {
     const { stdout, stderr } = await execAsync(command, {
-      timeout: 5000, // 5 second timeout
+      timeout: timeoutMs,
       maxBuffer: 10 * 1024 * 1024 // 10MB max output
     });
 
     return {
       success: true,
       output: sanitizeOutput(stdout),
-      error: stderr ? sanitizeOutput(stderr) : null
+      error: stderr ? sanitizeOutput(stderr) : null,
+      exitCode: 0,
+      outputBytes: Buffer.byteLength(stdout) + Buffer.byteLength(stderr)
     };
   } catch (error) {
     return {
       success: false,
       output: null,
-      error: sanitizeOutput(error.message)
+      error: sanitizeOutput(error.message),
+      exitCode: typeof error.code === 'number' ? error.code : null,
+      outputBytes: Buffer.byteLength(error.stdout || '') + Buffer.byteLength(error.stderr || '')
     };
   }
 }
 
+/**
+ * Cache an execution result and return its id
+ */
+function cacheResult(result, code, language) {
+  const executionId = uuidv4();
+  executionCache.set(executionId, {
+    ...result,
+    language,
+    timestamp: new Date().toISOString(),
+    codeLength: code.length
+  });
+  // Maps iterate in insertion order, so the first key is the oldest
+  while (executionCache.size > EXECUTION_CACHE_MAX_ITEMS) {
+    executionCache.delete(executionCache.keys().next().value);
+  }
+  return executionId;
+}
+
+/**
+ * Map items through an async function with at most `limit` in flight,
+ * keeping results in input order
+ */
+async function mapWithConcurrency(items, limit, fn) {
+  const results = new Array(items.length);
+  let next = 0;
+
+  async function worker() {
+    while (next < items.length) {
+      const index = next++;
+      results[index] = await fn(items[index], index);
+    }
+  }
+
+  await Promise.all(Array.from({ length: Math.min(limit, items.length) }, worker));
+  return results;
+}
+
 /**
  * POST /api/execute/run
  * Execute code and return results
@@ -63,23 +120,20 @@ router.post('/run', async (req, res) => {
     validateExecutionRequest(code, language);
 
     // Execute code
-    const result = await executeCode(code, language);
-    const executionId = uuidv4();
-
-    // Cache result
-    executionCache.set(executionId, {
-      ...result,
-      language,
-      timestamp: new Date().toISOString(),
-      codeLength: code.length
-    });
+    const started = Date.now();
+    const result = await executeCode(code, language, clampTimeout(req.body.timeout));
+    const durationMs = Date.now() - started;
+    const executionId = cacheResult(result, code, language);
 
     res.status(200).json({
       success: result.success,
       executionId,
       output: result.output,
       error: result.error,
-      language
+      language,
+      exitCode: result.exitCode,
+      outputBytes: result.outputBytes,
+      durationMs
     });
   } catch (error) {
     res.status(400).json({
@@ -89,6 +143,173 @@ router.post('/run', async (req, res) => {
   }
 });
 
+/**
+ * POST /api/execute/run-batch
+ * Execute several snippets concurrently; results keep the request order
+ */
+router.post('/run-batch', async (req, res) => {
+  const { items, concurrency, timeout } = req.body;
+
+  if (!Array.isArray(items) || items.length === 0) {
+    return res.status(400).json({
+      success: false,
+      error: 'Items must be a non-empty array of { code, language }'
+    });
+  }
+  if (items.length > BATCH_MAX_ITEMS) {
+    return res.status(400).json({
+      success: false,
+      error: `Batch exceeds maximum of ${BATCH_MAX_ITEMS} items`
+    });
+  }
+
+  const limit = Math.max(1, Math.min(parseInt(concurrency, 10) || BATCH_CONCURRENCY, BATCH_CONCURRENCY));
+  const batchStart = Date.now();
+
+  const results = await mapWithConcurrency(items, limit, async (item, index) => {
+    const itemStart = Date.now();
+    const { code, language } = item || {};
+    try {
+      validateExecutionRequest(code, language);
+      // A per-item timeout wins over the batch-wide one
+      const result = await executeCode(code, language, clampTimeout(item.timeout || timeout));
+      return {
+        index,
+        success: result.success,
+        executionId: cacheResult(result, code, language),
+        output: result.output,
+        error: result.error,
+        language,
+        exitCode: result.exitCode,
+        outputBytes: result.outputBytes,
+        durationMs: Date.now() - itemStart
+      };
+    } catch (error) {
+      return {
+        index,
+        success: false,
+        output: null,
+        error: error.message,
+        language,
+        durationMs: Date.now() - itemStart
+      };
+    }
+  });
+
+  res.status(200).json({
+    success: results.every((result) => result.success),
+    results,
+    concurrency: limit,
+    totalMs: Date.now() - batchStart
+  });
+});
+
+/**
+ * Interpreter command for streaming execution (no shell involved)
+ */
+function streamCommand(code, language) {
+  switch (language.toLowerCase()) {
+    case 'python':
+      return ['python3', ['-u', '-c', code]];
+    case 'javascript':
+      return ['node', ['-e', code]];
+    default:
+      throw new Error(`Streaming is not supported for ${language}`);
+  }
+}
+
+/**
+ * POST /api/execute/stream
+ * Execute code and stream stdout/stderr as Server-Sent Events
+ */
+router.post('/stream', (req, res) => {
+  const { code, language } = req.body;
+  let command;
+  try {
+    validateExecutionRequest(code, language);
+    command = streamCommand(code, language);
+  } catch (error) {
+    return res.status(400).json({
+      success: false,
+      error: error.message
+    });
+  }
+
+  const timeoutMs = clampTimeout(req.body.timeout);
+  const maxOutput = Math.min(parseInt(req.body.maxOutputSize, 10) || MAX_OUTPUT_SIZE, MAX_OUTPUT_SIZE);
+  const started = Date.now();
+  let outputBytes = 0;
+  let truncated = false;
+  let timedOut = false;
+  const captured = { stdout: '', stderr: '' };
+
+  res.writeHead(200, {
+    'Content-Type': 'text/event-stream',
+    'Cache-Control': 'no-cache',
+    Connection: 'keep-alive'
+  });
+  const send = (event, data) => res.write(`event: ${event}\ndata: ${JSON.stringify(data)}\n\n`);
+
+  const child = spawn(command[0], command[1], { stdio: ['ignore', 'pipe', 'pipe'] });
+  const timer = setTimeout(() => {
+    timedOut = true;
+    child.kill('SIGKILL');
+  }, timeoutMs);
+
+  const forward = (stream) => (data) => {
+    if (truncated) return;
+    let chunk = data.toString();
+    if (outputBytes + data.length > maxOutput) {
+      chunk = data.subarray(0, maxOutput - outputBytes).toString();
+      truncated = true;
+      child.kill('SIGKILL');
+    }
+    outputBytes += Buffer.byteLength(chunk);
+    chunk = sanitizeOutput(chunk);
+    captured[stream] += chunk;
+    if (chunk) send(stream, { chunk });
+  };
+  child.stdout.on('data', forward('stdout'));
+  child.stderr.on('data', forward('stderr'));
+
+  // Stop the process if the client goes away
+  res.on('close', () => {
+    if (child.exitCode === null) child.kill('SIGKILL');
+  });
+
+  // A failed spawn emits 'error' and then 'close': only the first one ends the response
+  let finished = false;
+  const finish = (data) => {
+    if (finished) return;
+    finished = true;
+    clearTimeout(timer);
+    send('exit', data);
+    res.end();
+  };
+
+  child.on('error', (error) => {
+    finish({ success: false, error: sanitizeOutput(error.message), durationMs: Date.now() - started });
+  });
+
+  child.on('close', (exitCode) => {
+    if (finished) return;
+    const result = {
+      success: exitCode === 0 && !timedOut && !truncated,
+      output: captured.stdout,
+      error: captured.stderr || null
+    };
+    finish({
+      success: result.success,
+      exitCode,
+      timedOut,
+      truncated,
+      executionId: cacheResult(result, code, language),
+      outputBytes,
+      durationMs: Date.now() - started
+    });
+  });
+});
+
 /**
  * GET /api/execute/history/:executionId
  * Retrieve cached execution result
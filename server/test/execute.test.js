@@ -0,0 +1,115 @@
+const test = require('node:test');
+const assert = require('node:assert');
+const express = require('express');
+const executeRouter = require('../routes/execute');
+
+// Writes attempted after res.end(); each one is an ERR_STREAM_WRITE_AFTER_END
+const writesAfterEnd = [];
+
+function startServer() {
+  const app = express();
+  app.use(express.json());
+  app.use((req, res, next) => {
+    const write = res.write;
+    res.write = function (chunk, ...rest) {
+      if (res.writableEnded) writesAfterEnd.push(String(chunk));
+      return write.call(this, chunk, ...rest);
+    };
+    next();
+  });
+  app.use('/api/execute', executeRouter);
+  return new Promise((resolve) => {
+    const server = app.listen(0, () => resolve(server));
+  });
+}
+
+async function postStream(server, body) {
+  const response = await fetch(`http://127.0.0.1:${server.address().port}/api/execute/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(body)
+  });
+  const text = await response.text();
+  return text.trim().split('\n\n').filter(Boolean).map((block) => {
+    const [eventLine, dataLine] = block.split('\n');
+    return { event: eventLine.slice('event: '.length), data: JSON.parse(dataLine.slice('data: '.length)) };
+  });
+}
+
+test('/stream streams output and ends with one exit event', async (t) => {
+  const server = await startServer();
+  t.after(() => server.close());
+
+  const events = await postStream(server, { code: 'print("hello")', language: 'python' });
+
+  const exits = events.filter((e) => e.event === 'exit');
+  const stdout = events.filter((e) => e.event === 'stdout').map((e) => e.data.chunk).join('');
+  assert.strictEqual(stdout, 'hello\n');
+  assert.strictEqual(exits.length, 1);
+  assert.strictEqual(events[events.length - 1].event, 'exit');
+  assert.strictEqual(exits[0].data.success, true);
+  assert.strictEqual(exits[0].data.exitCode, 0);
+});
+
+test('/stream ends once when the interpreter cannot be spawned', async (t) => {
+  const server = await startServer();
+  const path = process.env.PATH;
+  writesAfterEnd.length = 0;
+  // spawn resolves the interpreter through PATH, so this makes it fail with ENOENT
+  process.env.PATH = '/nonexistent';
+  t.after(() => {
+    process.env.PATH = path;
+    server.close();
+  });
+
+  const events = await postStream(server, { code: 'print("hello")', language: 'python' });
+  // Let the 'close' that follows the spawn 'error' run
+  await new Promise((resolve) => setTimeout(resolve, 50));
+
+  assert.deepStrictEqual(events.map((e) => e.event), ['exit']);
+  assert.strictEqual(events[0].data.success, false);
+  assert.match(events[0].data.error, /ENOENT/);
+  assert.deepStrictEqual(writesAfterEnd, []);
+});
+
+async function postJson(server, path, body) {
+  const response = await fetch(`http://127.0.0.1:${server.address().port}/api/execute${path}`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(body)
+  });
+  return response.json();
+}
+
+test('/run honours a requested timeout below the maximum', async (t) => {
+  const server = await startServer();
+  t.after(() => server.close());
+
+  const started = Date.now();
+  const result = await postJson(server, '/run', {
+    code: 'import time\ntime.sleep(3)',
+    language: 'python',
+    timeout: 300
+  });
+
+  assert.strictEqual(result.success, false);
+  assert.ok(Date.now() - started < 2000);
+});
+
+test('/run-batch applies per-item and batch timeouts', async (t) => {
+  const server = await startServer();
+  t.after(() => server.close());
+
+  const started = Date.now();
+  const response = await postJson(server, '/run-batch', {
+    timeout: 300,
+    items: [
+      { code: 'import time\ntime.sleep(3)', language: 'python' },
+      { code: 'print(1)', language: 'python', timeout: 2000 }
+    ]
+  });
+
+  assert.strictEqual(response.results[0].success, false);
+  assert.strictEqual(response.results[1].success, true);
+  assert.ok(Date.now() - started < 2000);
+});
@@ -0,0 +1,330 @@
+"""
+MAiKO Telemetry
+Per-request LLM and code execution metrics with rolling histograms
+"""
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+import json
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Histogram bucket upper bounds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+THROUGHPUT_BUCKETS = (5, 10, 25, 50, 100, 200, 400)
+TOKEN_BUCKETS = (64, 256, 1024, 4096, 16384, 65536)
+MEMORY_BUCKETS = (16, 32, 64, 128, 256, 512, 1024)
+OUTPUT_BUCKETS = (1024, 10240, 102400, 1048576, 10485760)
+
+# metric name -> (buckets, help text)
+LLM_METRICS = {
+    "queue_time_seconds": (LATENCY_BUCKETS, "Time spent waiting before the request was sent"),
+    "ttft_seconds": (LATENCY_BUCKETS, "Time to first token"),
+    "latency_seconds": (LATENCY_BUCKETS, "Total request latency"),
+    "tokens_per_second": (THROUGHPUT_BUCKETS, "Output tokens per second of generation"),
+    "input_tokens": (TOKEN_BUCKETS, "Input tokens per request"),
+    "output_tokens": (TOKEN_BUCKETS, "Output tokens per request"),
+}
+
+# execution metric -> (buckets, help text, usage field, scale to metric units)
+EXECUTION_METRICS = {
+    "wall_seconds": (LATENCY_BUCKETS, "Wall-clock time per execution", "wall_ms", 0.001),
+    "cpu_user_seconds": (LATENCY_BUCKETS, "User CPU time per execution", "cpu_user_ms", 0.001),
+    "cpu_sys_seconds": (LATENCY_BUCKETS, "System CPU time per execution", "cpu_sys_ms", 0.001),
+    "peak_rss_mb": (MEMORY_BUCKETS, "Peak resident memory per execution", "peak_rss_mb", 1),
+    "output_bytes": (OUTPUT_BUCKETS, "Output bytes per execution", "output_bytes", 1),
+}
+
+
+class RollingHistogram:
+    """Histogram over the samples observed in a sliding time window"""
+
+    def __init__(self, buckets: Tuple[float, ...], window_seconds: float = 900,
+                 max_samples: int = 10000):
+        self.buckets = tuple(sorted(buckets))
+        self.window_seconds = window_seconds
+        self._samples = deque(maxlen=max_samples)  # (timestamp, value)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, timestamp: float = None):
+        with self._lock:
+            self._samples.append((timestamp or time.time(), value))
+
+    def _values(self):
+        cutoff = time.time() - self.window_seconds
+        with self._lock:
+            while self._samples and self._samples[0][0] < cutoff:
+                self._samples.popleft()
+            return [value for _, value in self._samples]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Count, sum, percentiles and cumulative bucket counts"""
+        values = self._values()
+        ordered = sorted(values)
+
+        def percentile(p):
+            if not ordered:
+                return None
+            return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+        return {
+            "count": len(ordered),
+            "sum": sum(ordered),
+            "min": ordered[0] if ordered else None,
+            "max": ordered[-1] if ordered else None,
+            "p50": percentile(0.50),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+            "buckets": {
+                str(bound): sum(1 for v in ordered if v <= bound)
+                for bound in self.buckets
+            },
+        }
+
+
+class RequestSpan:
+    """Timing and usage for a single in-flight LLM request"""
+
+    def __init__(self, queued_at: float = None):
+        self.start = time.time()
+        self.queue_time = max(0.0, self.start - queued_at) if queued_at else 0.0
+        self.first_token_at: Optional[float] = None
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def mark_first_token(self):
+        """Call when the first streamed token arrives"""
+        if self.first_token_at is None:
+            self.first_token_at = time.time()
+
+    def set_usage(self, input_tokens: int, output_tokens: int):
+        self.input_tokens = input_tokens or 0
+        self.output_tokens = output_tokens or 0
+
+
+class LLMTelemetry:
+    """Collects per-model request metrics"""
+
+    def __init__(self, window_seconds: float = 900):
+        self.window_seconds = window_seconds
+        self._histograms: Dict[Tuple[str, str], RollingHistogram] = {}
+        self._requests: Dict[str, int] = defaultdict(int)
+        self._errors: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def _histogram(self, model: str, metric: str) -> RollingHistogram:
+        key = (model, metric)
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = RollingHistogram(
+                    LLM_METRICS[metric][0], self.window_seconds
+                )
+            return self._histograms[key]
+
+    @contextmanager
+    def span(self, model: str, queued_at: float = None) -> Iterator[RequestSpan]:
+        """
+        Time a request. Non-streaming calls never mark a first token, so
+        their time to first token equals their total latency.
+        """
+        span = RequestSpan(queued_at)
+        try:
+            yield span
+        except Exception as e:
+            self.record_error(model, e, span)
+            raise
+        else:
+            self.record_success(model, span)
+
+    def record_success(self, model: str, span: RequestSpan):
+        end = time.time()
+        latency = end - span.start
+        ttft = (span.first_token_at or end) - span.start
+        generation_time = latency - ttft if latency - ttft > 0 else latency
+
+        with self._lock:
+            self._requests[model] += 1
+        self._histogram(model, "queue_time_seconds").observe(span.queue_time)
+        self._histogram(model, "ttft_seconds").observe(ttft)
+        self._histogram(model, "latency_seconds").observe(latency)
+        self._histogram(model, "input_tokens").observe(span.input_tokens)
+        self._histogram(model, "output_tokens").observe(span.output_tokens)
+        if span.output_tokens and generation_time > 0:
+            self._histogram(model, "tokens_per_second").observe(
+                span.output_tokens / generation_time
+            )
+
+    def record_error(self, model: str, error: Exception, span: RequestSpan = None):
+        with self._lock:
+            self._requests[model] += 1
+            self._errors[(model, type(error).__name__)] += 1
+        if span:
+            self._histogram(model, "queue_time_seconds").observe(span.queue_time)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """All metrics grouped by model"""
+        with self._lock:
+            histograms = dict(self._histograms)
+            requests = dict(self._requests)
+            errors = dict(self._errors)
+
+        models: Dict[str, Dict[str, Any]] = {}
+        for model, count in requests.items():
+            models[model] = {"requests": count, "errors": {}, "metrics": {}}
+        for (model, error_class), count in errors.items():
+            models[model]["errors"][error_class] = count
+        for (model, metric), histogram in histograms.items():
+            models.setdefault(model, {"requests": 0, "errors": {}, "metrics": {}})
+            models[model]["metrics"][metric] = histogram.snapshot()
+
+        return {
+            "window_seconds": self.window_seconds,
+            "timestamp": time.time(),
+            "models": models,
+        }
+
+    def to_json(self) -> str:
+        """Export metrics as JSON"""
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self, prefix: str = "maiko_llm") -> str:
+        """Export metrics in the Prometheus text exposition format"""
+        snapshot = self.snapshot()["models"]
+        lines = [
+            f"# HELP {prefix}_requests_total LLM requests since startup",
+            f"# TYPE {prefix}_requests_total counter",
+        ]
+        for model, data in snapshot.items():
+            lines.append(f'{prefix}_requests_total{{model="{model}"}} {data["requests"]}')
+
+        lines += [
+            f"# HELP {prefix}_errors_total LLM request errors by class since startup",
+            f"# TYPE {prefix}_errors_total counter",
+        ]
+        for model, data in snapshot.items():
+            for error_class, count in data["errors"].items():
+                lines.append(
+                    f'{prefix}_errors_total{{model="{model}",error="{error_class}"}} {count}'
+                )
+
+        for metric, (_, help_text) in LLM_METRICS.items():
+            name = f"{prefix}_{metric}"
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            for model, data in snapshot.items():
+                hist = data["metrics"].get(metric)
+                if not hist:
+                    continue
+                for bound, count in hist["buckets"].items():
+                    lines.append(f'{name}_bucket{{model="{model}",le="{bound}"}} {count}')
+                lines.append(f'{name}_bucket{{model="{model}",le="+Inf"}} {hist["count"]}')
+                lines.append(f'{name}_sum{{model="{model}"}} {hist["sum"]}')
+                lines.append(f'{name}_count{{model="{model}"}} {hist["count"]}')
+
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._requests.clear()
+            self._errors.clear()
+
+
+class ExecutionTelemetry:
+    """
+    Collects per-language resource usage of code executions.
+
+    Fed with the "usage" dict of execution results; fields a backend does
+    not report (the server has no CPU or memory figures) are skipped. The
+    policy's log_execution_time and log_memory_usage switch the time and
+    memory metrics off.
+    """
+
+    def __init__(self, window_seconds: float = 900, policy=None):
+        self.window_seconds = window_seconds
+        self.policy = policy
+        self._histograms: Dict[Tuple[str, str], RollingHistogram] = {}
+        self._exit_codes: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def _histogram(self, language: str, metric: str) -> RollingHistogram:
+        key = (language, metric)
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = RollingHistogram(
+                    EXECUTION_METRICS[metric][0], self.window_seconds
+                )
+            return self._histograms[key]
+
+    def _enabled(self, metric: str) -> bool:
+        if self.policy is None:
+            return True
+        if metric == "peak_rss_mb":
+            return self.policy.log_memory_usage
+        if metric != "output_bytes":
+            return self.policy.log_execution_time
+        return True
+
+    def record(self, language: str, usage: Optional[Dict[str, Any]]):
+        if not usage:
+            return
+        language = (language or "unknown").lower()
+        with self._lock:
+            self._exit_codes[(language, str(usage.get("exit_code")))] += 1
+        for metric, (_, _, field, scale) in EXECUTION_METRICS.items():
+            value = usage.get(field)
+            if value is not None and self._enabled(metric):
+                self._histogram(language, metric).observe(value * scale)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """All metrics grouped by language"""
+        with self._lock:
+            histograms = dict(self._histograms)
+            exit_codes = dict(self._exit_codes)
+
+        languages: Dict[str, Dict[str, Any]] = {}
+        for (language, exit_code), count in exit_codes.items():
+            entry = languages.setdefault(language, {"executions": 0, "exit_codes": {}, "metrics": {}})
+            entry["executions"] += count
+            entry["exit_codes"][exit_code] = count
+        for (language, metric), histogram in histograms.items():
+            languages[language]["metrics"][metric] = histogram.snapshot()
+
+        return {
+            "window_seconds": self.window_seconds,
+            "timestamp": time.time(),
+            "languages": languages,
+        }
+
+    def to_json(self) -> str:
+        """Export metrics as JSON"""
+        return json.dumps(self.snapshot(), indent=2)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._exit_codes.clear()
+
+
+# Global telemetry instances
+_telemetry = None
+_execution_telemetry = None
+
+def get_telemetry() -> LLMTelemetry:
+    """Get or create the LLM telemetry collector"""
+    global _telemetry
+    if _telemetry is None:
+        _telemetry = LLMTelemetry()
+    return _telemetry
+
+
+def get_execution_telemetry() -> ExecutionTelemetry:
+    """Get or create the code execution telemetry collector"""
+    global _execution_telemetry
+    if _execution_telemetry is None:
+        from execution_config import DEFAULT_POLICY
+        _execution_telemetry = ExecutionTelemetry(policy=DEFAULT_POLICY)
+    return _execution_telemetry
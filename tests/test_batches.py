@@ -0,0 +1,49 @@
+"""
+MAiKO Batch Tests
+"""
+from types import SimpleNamespace
+from batch_executor import BatchRequest
+from llm_provider import AnthropicProvider, Message, ModelConfig
+from mock_provider import MockProvider
+
+
+def summary_requests(*custom_ids):
+    return [
+        BatchRequest(custom_id=custom_id, messages=[Message(role="user", content=f"summarize {custom_id}")])
+        for custom_id in custom_ids
+    ]
+
+
+def test_local_batch_returns_text_content():
+    provider = MockProvider(mode="canned", responses=["- a\n- b\n- c"])
+    batch_id = provider.submit_batch(summary_requests("one.json", "two.json"))
+    job = provider.poll_batch(batch_id, wait=True, timeout=5)
+
+    assert job.succeeded == 2
+    assert job.results["one.json"]["response"]["content"] == "- a\n- b\n- c"
+
+
+def test_anthropic_batch_results_have_the_local_shape():
+    message = SimpleNamespace(
+        content=[SimpleNamespace(type="text", text="- a\n"), SimpleNamespace(type="text", text="- b")],
+        stop_reason="end_turn",
+        usage=SimpleNamespace(input_tokens=10, output_tokens=4),
+    )
+    entries = [
+        SimpleNamespace(custom_id="one.json", result=SimpleNamespace(type="succeeded", message=message)),
+        SimpleNamespace(custom_id="two.json", result=SimpleNamespace(type="expired")),
+    ]
+    batches = SimpleNamespace(
+        retrieve=lambda batch_id: SimpleNamespace(processing_status="ended"),
+        results=lambda batch_id: iter(entries),
+    )
+    # The SDK client is replaced, so no network or anthropic install is needed
+    provider = AnthropicProvider.__new__(AnthropicProvider)
+    provider.config = ModelConfig(name="claude-test")
+    provider.client = SimpleNamespace(messages=SimpleNamespace(batches=batches))
+
+    job = provider.poll_batch("batch_1")
+
+    assert job.results["one.json"]["response"]["content"] == "- a\n- b"
+    assert job.results["two.json"] == {"error": "expired"}
+    assert (job.succeeded, job.errored) == (1, 1)
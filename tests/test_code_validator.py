@@ -0,0 +1,70 @@
+"""
+MAiKO Code Validator Tests
+"""
+import pytest
+from code_validator import CodeValidator
+
+
+@pytest.fixture
+def validator():
+    return CodeValidator(cache_size=0)
+
+
+@pytest.mark.parametrize("code", [
+    "import math\nprint(math.sqrt(2))",
+    "from collections import Counter\nprint(Counter('abc'))",
+    "if __name__ == '__main__':\n    print('ok')",
+    "print('-' * 40, '____')",
+])
+def test_allows_plain_code(validator, code):
+    assert validator.validate(code, "python") is None
+
+
+@pytest.mark.parametrize("code, reason", [
+    ("import os", "Import of 'os'"),
+    ("from subprocess import run", "blocked pattern"),
+    ("print(().__class__)", "'__class__' is not allowed"),
+    ("getattr((), '__cl' + 'ass__')", "getattr"),
+    ("f = getattr\nf((), 'x')", "getattr"),
+    ("print(type(1).__dict__)", "__dict__"),
+    ("print('{0.__class__}'.format(1))", "looks like a dunder"),
+    ("name = '__glo' + 'bals__'", "looks like a dunder"),
+    ("setattr(object, 'x', 1)", "setattr"),
+    ("\uff45\uff56\uff41\uff4c('print(42)')", "'eval'"),
+    ("\uff47etattr((), 'x')", "getattr"),
+    ("f = vars ()", "vars"),
+    ("name = '\\x5f\\x5fglobals\\x5f\\x5f'", "looks like a dunder"),
+])
+def test_rejects_escapes(validator, code, reason):
+    verdict = validator.validate(code, "python")
+    assert verdict is not None and reason in verdict
+
+
+@pytest.mark.parametrize("code", [
+    "import re\npattern = re.compile('a+')",
+    "if __name__ == '__main__':\n    execute = 1",
+    "class Job:\n    def __init__(self):\n        self.env_vars = {}",
+])
+def test_common_idioms_skip_the_full_walk(validator, code):
+    assert not validator._needs_walk(code)
+    assert validator.validate(code, "python") is None
+
+
+def test_non_ascii_code_always_gets_the_full_walk(validator):
+    assert validator._needs_walk("print('caf\u00e9')")
+    assert validator.validate("print('caf\u00e9')", "python") is None
+
+
+def test_getattr_chain_to_import_is_rejected(validator):
+    code = (
+        "b = getattr(getattr((), '__cl' + 'ass__'), '__ba' + 'se__')\n"
+        "imp = [c for c in b.__subclasses__() if c.__name__ == 'BuiltinImporter'][0]\n"
+        "imp.load_module('o' + 's').system('id')\n"
+    )
+    assert validator.validate(code, "python") is not None
+
+
+def test_caches_verdicts():
+    validator = CodeValidator(cache_size=2)
+    assert validator.validate("import os", "python") == validator.validate("import os", "python")
+    assert validator.stats()["cached_verdicts"] == 1
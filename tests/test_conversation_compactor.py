@@ -0,0 +1,68 @@
+"""
+MAiKO Conversation Compactor Tests
+"""
+from conversation_compactor import CompactionState, ConversationCompactor
+
+
+def chat(count):
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"message {i}"}
+        for i in range(count)
+    ]
+
+
+def failing_summarizer(prompt):
+    raise ConnectionError("summarizer unavailable")
+
+
+def test_capped_window_starts_on_a_user_message():
+    # keep_recent=3, refresh_every=1: the cap keeps 5 messages, which would start on an assistant
+    compactor = ConversationCompactor(failing_summarizer, keep_recent=3, refresh_every=1)
+    recent, summary = compactor.window(chat(20), CompactionState())
+
+    assert recent[0]["role"] == "user"
+    assert recent[-1]["content"] == "message 19"
+    assert len(recent) == 4 and summary == ""
+
+
+def test_capped_window_does_not_split_a_tool_call_from_its_result():
+    messages = chat(16) + [
+        {"role": "assistant", "content": [{"type": "tool_use", "id": "t1", "name": "execute_code", "input": {}}]},
+        {"role": "user", "content": [{"type": "tool_result", "tool_use_id": "t1", "content": "42"}]},
+        {"role": "assistant", "content": "The answer is 42"},
+        {"role": "user", "content": "thanks"},
+    ]
+    compactor = ConversationCompactor(failing_summarizer, keep_recent=1, refresh_every=1)
+    recent, _ = compactor.window(messages, CompactionState())
+
+    assert recent == [{"role": "user", "content": "thanks"}]
+
+
+def test_window_uses_the_summary_for_covered_messages():
+    compactor = ConversationCompactor(lambda prompt: "earlier chat", keep_recent=4, refresh_every=2)
+    messages = chat(8)
+    state, changed = compactor.refresh(messages, CompactionState())
+    recent, summary = compactor.window(messages, state)
+
+    assert changed and summary == "earlier chat"
+    assert recent == messages[4:]
+
+
+def test_refresh_leaves_the_recent_window_on_a_user_turn():
+    # An odd keep_recent puts len - keep_recent on an assistant message
+    compactor = ConversationCompactor(lambda prompt: "earlier chat", keep_recent=3, refresh_every=2)
+    messages = chat(10)
+    state, changed = compactor.refresh(messages, CompactionState())
+    recent, _ = compactor.window(messages, state)
+
+    assert changed and state.covered == 6
+    assert recent[0]["role"] == "user" and len(recent) == 4
+
+
+def test_refresh_skips_past_a_failed_turn():
+    # A failed turn leaves two user messages in a row, shifting the parity
+    messages = chat(4) + [{"role": "user", "content": "retry"}] + chat(5)
+    compactor = ConversationCompactor(lambda prompt: "earlier chat", keep_recent=4, refresh_every=2)
+    state, _ = compactor.refresh(messages, CompactionState())
+
+    assert messages[state.covered]["role"] == "user"
@@ -0,0 +1,45 @@
+"""
+MAiKO Execution History Tests
+"""
+from execution_history import ExecutionHistory
+
+
+def make_history(tmp_path, **kwargs):
+    return ExecutionHistory(str(tmp_path / "history.db"), **kwargs)
+
+
+def test_read_lines_reaches_the_end_of_a_capped_output(tmp_path):
+    history = make_history(tmp_path, max_output=1000)
+    output = "\n".join(f"row {i}" for i in range(100000))
+    history.add({"executionId": "big", "success": True, "output": output}, "python")
+
+    record = history.get("big")
+    assert len(record["output"]) < 1100
+    assert record["output_chars"] == len(output)
+
+    # A fresh instance has nothing in memory, so this reads from disk
+    tail = make_history(tmp_path, max_output=1000).read_lines("big", start=99998, count=10)
+    assert tail["total_lines"] == 100000
+    assert tail["lines"] == "row 99998\nrow 99999"
+
+
+def test_trim_drops_old_records_and_their_outputs(tmp_path):
+    history = make_history(tmp_path, max_output=10, max_records=3)
+    for i in range(102):
+        history.add({"executionId": f"run-{i}", "success": True, "output": "x" * 50}, "python")
+
+    with history._connect() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM executions").fetchone()[0] <= 102 - 98
+        kept = conn.execute("SELECT COUNT(*) FROM execution_outputs").fetchone()[0]
+    assert kept <= 4
+    assert history.page(page_size=5)["records"][0]["execution_id"] == "run-101"
+
+
+def test_page_filters_by_language(tmp_path):
+    history = make_history(tmp_path)
+    for i, language in enumerate(["python", "javascript", "python"]):
+        history.add({"executionId": f"run-{i}", "success": True, "output": str(i)}, language)
+
+    page = history.page(page_size=1, language="python")
+    assert (page["total"], page["pages"]) == (2, 2)
+    assert page["records"][0]["execution_id"] == "run-2"
@@ -0,0 +1,68 @@
+"""
+MAiKO Execution Limits Tests
+"""
+import time
+from execution_config import ExecutionPolicy
+from execution_limits import MB, ExecutionLimiter
+
+
+def make_limiter(tmp_path, **policy):
+    defaults = dict(
+        max_executions_per_minute=0,
+        max_executions_per_hour=0,
+        daily_execution_quota_mb=0,
+        monthly_execution_quota_mb=0,
+    )
+    defaults.update(policy)
+    return ExecutionLimiter(ExecutionPolicy(**defaults), str(tmp_path / "limits.db"))
+
+
+def test_gcra_allows_a_full_burst_then_spaces_requests(tmp_path):
+    limiter = make_limiter(tmp_path, max_executions_per_minute=3)
+
+    assert all(limiter.acquire("alice").allowed for _ in range(3))
+    denied = limiter.acquire("alice")
+    assert not denied.allowed
+    # One slot frees every 60 / 3 seconds
+    assert 0 < denied.retry_after <= 20
+    assert denied.to_result()["rateLimited"] is True
+
+
+def test_rate_limits_are_per_user_unless_global(tmp_path):
+    limiter = make_limiter(tmp_path, max_executions_per_minute=1, global_executions_per_minute=2)
+
+    assert limiter.acquire("alice").allowed
+    assert not limiter.acquire("alice").allowed
+    assert limiter.acquire("bob").allowed
+    denied = limiter.acquire("carol")
+    assert not denied.allowed and "all users" in denied.reason
+
+
+def test_denied_requests_do_not_consume_budget(tmp_path):
+    limiter = make_limiter(tmp_path, max_executions_per_minute=60)
+    for _ in range(60):
+        limiter.acquire("alice")
+    for _ in range(5):
+        assert not limiter.acquire("alice").allowed
+
+    time.sleep(1.1)  # one interval later exactly one slot is free again
+    assert limiter.acquire("alice").allowed
+    assert not limiter.acquire("alice").allowed
+
+
+def test_limits_survive_a_restart(tmp_path):
+    make_limiter(tmp_path, max_executions_per_minute=1).acquire("alice")
+
+    assert not make_limiter(tmp_path, max_executions_per_minute=1).acquire("alice").allowed
+
+
+def test_daily_quota_blocks_until_the_period_ends(tmp_path):
+    limiter = make_limiter(tmp_path, daily_execution_quota_mb=1)
+
+    assert limiter.acquire("alice").allowed
+    limiter.record_usage("alice", 2 * MB)
+    denied = limiter.acquire("alice")
+
+    assert not denied.allowed and "Daily quota" in denied.reason
+    assert 0 < denied.retry_after <= 24 * 3600
+    assert limiter.status("alice")["quotas"]["alice:day"]["used_mb"] == 2.0
@@ -0,0 +1,100 @@
+"""
+MAiKO LLM Provider Tests
+"""
+from types import SimpleNamespace
+from llm_provider import (
+    IMAGE_TOKEN_ESTIMATE, AnthropicProvider, LLMProvider, Message, ModelConfig, ZhipuProvider,
+    estimate_content_tokens
+)
+from rate_limiter import estimate_tokens
+
+
+def chunk(content=None, usage=None):
+    choices = [SimpleNamespace(delta=SimpleNamespace(content=content))] if content else []
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+def zhipu_provider(chunks):
+    """A ZhipuProvider whose OpenAI client is replaced by canned stream chunks"""
+    provider = ZhipuProvider.__new__(ZhipuProvider)
+    LLMProvider.__init__(provider, ModelConfig(name="glm-test"))
+    requests = []
+
+    def create(**kwargs):
+        requests.append(kwargs)
+        return iter(chunks)
+
+    provider.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    recorded = []
+    provider._record_usage = lambda span, estimated, input_tokens, output_tokens: recorded.append(
+        (input_tokens, output_tokens)
+    )
+    return provider, requests, recorded
+
+
+def test_glm_stream_requests_and_records_usage():
+    usage = SimpleNamespace(prompt_tokens=12, completion_tokens=3)
+    provider, requests, recorded = zhipu_provider([chunk("Hel"), chunk("lo"), chunk(usage=usage)])
+
+    text = "".join(provider.stream_completion([Message(role="user", content="hi")]))
+
+    assert text == "Hello"
+    assert requests[0]["stream_options"] == {"include_usage": True}
+    assert recorded == [(12, 3)]
+
+
+def test_glm_stream_without_usage_falls_back_to_estimates():
+    provider, _, recorded = zhipu_provider([chunk("Hello there, "), chunk("general Kenobi")])
+
+    list(provider.stream_completion([Message(role="user", content="hello there")]))
+
+    assert len(recorded) == 1
+    input_tokens, output_tokens = recorded[0]
+    assert input_tokens > 0 and output_tokens > 0
+
+
+def anthropic_provider(response):
+    """An AnthropicProvider whose client returns one canned raw response"""
+    provider = AnthropicProvider.__new__(AnthropicProvider)
+    LLMProvider.__init__(provider, ModelConfig(name="claude-test"))
+    requests = []
+
+    def create(**kwargs):
+        requests.append(kwargs)
+        return SimpleNamespace(headers={}, parse=lambda: response)
+
+    provider.client = SimpleNamespace(messages=SimpleNamespace(
+        with_raw_response=SimpleNamespace(create=create)
+    ))
+    return provider, requests
+
+
+def test_claude_create_message_sends_system_and_tools():
+    response = SimpleNamespace(
+        content=[SimpleNamespace(type="text", text="done")],
+        stop_reason="end_turn",
+        usage=SimpleNamespace(input_tokens=10, output_tokens=2),
+    )
+    provider, requests = anthropic_provider(response)
+    tools = [{"name": "execute_code", "input_schema": {"type": "object"}}]
+
+    result = provider.create_message(
+        [Message(role="system", content="be brief"), Message(role="user", content="hi")], tools=tools
+    )
+
+    assert result is response
+    assert requests[0]["system"] == "be brief"
+    assert requests[0]["messages"] == [{"role": "user", "content": "hi"}]
+    assert requests[0]["tools"] == tools
+
+
+def test_estimate_ignores_image_data_and_block_reprs():
+    image = {"type": "image", "source": {"type": "base64", "data": "A" * 400000}}
+    content = [image, {"type": "text", "text": "x" * 400}]
+    tool_turn = [
+        SimpleNamespace(type="tool_use", input={"code": "print(1)"}),
+        {"type": "tool_result", "tool_use_id": "t1", "content": "y" * 40},
+    ]
+
+    assert estimate_content_tokens(content) == IMAGE_TOKEN_ESTIMATE + 100
+    assert estimate_content_tokens(tool_turn) == estimate_tokens('{"code": "print(1)"}') + 10
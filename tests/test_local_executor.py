@@ -0,0 +1,102 @@
+"""
+MAiKO Local Executor Session Tests
+"""
+import sys
+import pytest
+import local_executor
+from execution_config import ExecutionPolicy, SandboxConfig
+from execution_history import ExecutionHistory
+from execution_limits import ExecutionLimiter
+from local_executor import LocalExecutor
+
+pytestmark = pytest.mark.skipif(sys.platform != "linux", reason="sessions need fork and rlimits")
+
+
+def make_limiter(tmp_path, **policy):
+    return ExecutionLimiter(ExecutionPolicy(**policy), str(tmp_path / "limits.db"))
+
+
+@pytest.fixture
+def executor(tmp_path):
+    executor = LocalExecutor(
+        SandboxConfig(allowed_imports=[]), pool_size=1, max_sessions=2,
+        limiter=make_limiter(tmp_path, max_executions_per_minute=0, max_executions_per_hour=0)
+    )
+    yield executor
+    executor.shutdown()
+
+
+def run(executor, session_id, code, timeout_ms=2000):
+    # Straight to the kernel, so nothing is written to the shared history
+    return executor._run_in_session(session_id, {
+        "code": code,
+        "timeout_ms": timeout_ms,
+        "max_memory_mb": 512,
+        "max_output_size": 1024 * 1024,
+    })
+
+
+def test_session_keeps_state_between_runs(executor):
+    assert run(executor, "chat:a", "x = 41")["success"]
+    result = run(executor, "chat:a", "print(x + 1)")
+    assert result["success"] and result["output"].strip() == "42"
+    assert not run(executor, "chat:b", "print(x)")["success"]
+
+
+def test_timeout_resets_the_session(executor):
+    run(executor, "chat:a", "x = 1")
+    result = run(executor, "chat:a", "while True: pass", timeout_ms=300)
+    assert result["timed_out"] and "reset" in result["error"]
+    assert not run(executor, "chat:a", "print(x)")["success"]
+
+
+def test_sessions_are_closed_by_prefix_and_lru(executor):
+    run(executor, "chat:a", "x = 1")
+    run(executor, "chat:b", "x = 1")
+    run(executor, "other", "x = 1")  # over max_sessions: chat:a goes
+    assert executor.sessions() == ["chat:b", "other"]
+    assert executor.close_sessions("chat:") == 1
+    assert executor.sessions() == ["other"]
+
+
+def test_idle_sessions_are_reaped(executor):
+    run(executor, "chat:a", "x = 1")
+    executor.session_idle_seconds = 0
+    assert executor.sessions() == []
+
+
+def test_snippets_do_not_run_in_the_app_directory(executor, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / ".env").write_text("ANTHROPIC_API_KEY=secret")
+    request = {"code": "print(open('.env').read())", "timeout_ms": 2000,
+               "max_memory_mb": 512, "max_output_size": 1024 * 1024}
+    assert not executor._run_fresh(request)["success"]
+    assert not run(executor, "chat:a", "print(open('.env').read())")["success"]
+
+    assert run(executor, "chat:a", "open('note.txt', 'w').write('x')")["success"]
+    assert not (tmp_path / "note.txt").exists()
+
+
+def test_eviction_skips_a_kernel_that_is_running(executor):
+    run(executor, "chat:a", "x = 1")
+    run(executor, "chat:b", "x = 1")
+    busy = executor._sessions["chat:a"]
+    with busy.lock:  # as if a snippet were running in chat:a
+        run(executor, "chat:c", "x = 1")
+        assert executor.sessions() == ["chat:a", "chat:c"]
+        assert busy.alive()
+        with executor._sessions["chat:c"].lock:
+            executor._session("chat:d")  # everything busy: over the cap, nothing killed
+            assert executor.sessions() == ["chat:a", "chat:c", "chat:d"]
+    assert run(executor, "chat:a", "print(x)")["output"].strip() == "1"
+
+
+def test_local_runs_are_rate_limited(executor, tmp_path, monkeypatch):
+    history = ExecutionHistory(str(tmp_path / "history.db"))
+    monkeypatch.setattr(local_executor, "get_execution_history", lambda: history)
+    executor.limiter = make_limiter(tmp_path, max_executions_per_minute=1, max_executions_per_hour=0)
+
+    assert executor.execute("print(1)")["success"]
+    denied = executor.execute("print(2)")
+    assert denied["rateLimited"] and denied["output"] is None
+    assert executor.execute("print(3)", user_id="someone-else")["success"]
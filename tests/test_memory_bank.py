@@ -0,0 +1,38 @@
+"""
+MAiKO Memory Bank Tests
+"""
+import json
+from memory_bank import MemoryBank
+
+
+def test_ops_persist_across_instances(tmp_path):
+    path = str(tmp_path / "memory.json")
+    MemoryBank(path).apply([{"op": "add", "fact": "likes tea"}])
+    MemoryBank(path).apply([{"op": "replace", "old": "likes tea", "new": "likes coffee"}])
+
+    assert MemoryBank(path).load() == ["likes coffee"]
+
+
+def test_append_after_torn_record_is_kept(tmp_path):
+    path = str(tmp_path / "memory.json")
+    MemoryBank(path).apply([{"op": "add", "fact": "likes tea"}])
+    # A writer that crashed mid-record leaves a line without its newline
+    with open(path + ".log", "a") as f:
+        f.write(json.dumps({"op": "add", "fact": "half written"})[:15])
+
+    MemoryBank(path).apply([{"op": "add", "fact": "has a cat"}])
+
+    assert MemoryBank(path).load() == ["likes tea", "has a cat"]
+    with open(path + ".log") as f:
+        assert all(json.loads(line) for line in f)
+
+
+def test_compaction_folds_log_into_snapshot(tmp_path):
+    path = str(tmp_path / "memory.json")
+    bank = MemoryBank(path, compact_after=3)
+    for i in range(4):
+        bank.apply([{"op": "add", "fact": f"fact {i}"}])
+
+    with open(path) as f:
+        assert json.load(f)[:3] == ["fact 0", "fact 1", "fact 2"]
+    assert MemoryBank(path).load() == [f"fact {i}" for i in range(4)]
@@ -0,0 +1,39 @@
+"""
+MAiKO Memory Filter Tests
+"""
+import pytest
+from memory_filter import HELDOUT_SAMPLES, SEED_SAMPLES, MemoryFilter, rule_score
+
+
+@pytest.mark.parametrize("text", [
+    "my code is broken",
+    "can you fix my function",
+    "why does my loop not terminate",
+    "what does my error message mean",
+])
+def test_coding_questions_mentioning_my_are_skipped(text):
+    assert rule_score(text) == 0.0
+
+
+@pytest.mark.parametrize("text", [
+    "my name is Sam",
+    "my little sister lives in Oslo",
+    "our team uses Postgres",
+    "I work as a nurse",
+])
+def test_personal_statements_pass(text):
+    assert rule_score(text) == 1.0
+
+
+def test_held_out_samples_do_not_overlap_training():
+    assert not {text for text, _ in SEED_SAMPLES} & {text for text, _ in HELDOUT_SAMPLES}
+
+
+def test_model_trained_on_seeds_generalizes_to_held_out():
+    memory_filter = MemoryFilter(model_path="", threshold=0.5)
+    memory_filter.train(SEED_SAMPLES, save=False)
+    metrics = memory_filter.evaluate(HELDOUT_SAMPLES)
+
+    assert metrics["precision"] >= 0.9
+    assert metrics["recall"] >= 0.9
+    assert metrics["skip_rate"] >= 0.5
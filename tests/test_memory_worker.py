@@ -0,0 +1,97 @@
+"""
+MAiKO Memory Worker Tests
+"""
+import sqlite3
+import time
+from fact_store import FactStore
+from memory_bank import MemoryBank
+from memory_filter import MemoryFilter
+from memory_worker import MemoryExtractionWorker
+
+
+class FlakyProvider:
+    """complete_fn that fails a set number of times before answering"""
+
+    def __init__(self, failures: int, reply: str = '["Lives in Leeds"]'):
+        self.failures = failures
+        self.reply = reply
+        self.calls = 0
+
+    def __call__(self, prompt: str) -> str:
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ConnectionError("provider unavailable")
+        return self.reply
+
+
+def make_worker(tmp_path, complete_fn, retry_seconds=0.2):
+    return MemoryExtractionWorker(
+        complete_fn,
+        bank=MemoryBank(str(tmp_path / "memory.json")),
+        fact_store=FactStore(),
+        memory_filter=MemoryFilter(model_path="", threshold=0.0),
+        queue_path=str(tmp_path / "queue.db"),
+        coalesce_seconds=0,
+        retry_seconds=retry_seconds
+    )
+
+
+def test_failed_batch_backs_off_before_retrying(tmp_path):
+    provider = FlakyProvider(failures=1)
+    worker = make_worker(tmp_path, provider)
+    worker.enqueue("I live in Leeds", "Noted!")
+
+    assert worker.process_pending() == 1
+    # Not due yet: an immediate drain loop must not burn the remaining attempts
+    assert worker.process_pending() == 0
+    assert provider.calls == 1 and worker.pending_count() == 1
+
+    time.sleep(0.25)
+    assert worker.process_pending() == 1
+    assert worker.pending_count() == 0
+    assert worker.bank.load() == ["Lives in Leeds"]
+
+
+def test_backoff_doubles_per_attempt(tmp_path):
+    worker = make_worker(tmp_path, FlakyProvider(failures=5), retry_seconds=10)
+    worker.enqueue("I live in Leeds", "Noted!")
+
+    delays = []
+    for _ in range(2):
+        with worker._connect() as conn:
+            conn.execute("UPDATE memory_turns SET next_attempt_at = 0")
+        started = time.time()
+        worker.process_pending()
+        with worker._connect() as conn:
+            delays.append(conn.execute("SELECT next_attempt_at FROM memory_turns").fetchone()[0] - started)
+
+    assert 9 < delays[0] < 11 and 19 < delays[1] < 21
+
+
+def test_turn_is_dropped_after_max_attempts(tmp_path):
+    provider = FlakyProvider(failures=10)
+    worker = make_worker(tmp_path, provider, retry_seconds=0.01)
+    worker.enqueue("I live in Leeds", "Noted!")
+
+    for _ in range(MemoryExtractionWorker.MAX_ATTEMPTS):
+        time.sleep(0.05)
+        worker.process_pending()
+
+    assert provider.calls == MemoryExtractionWorker.MAX_ATTEMPTS
+    assert worker.pending_count() == 0
+
+
+def test_queue_from_before_backoff_is_migrated(tmp_path):
+    with sqlite3.connect(str(tmp_path / "queue.db")) as conn:
+        conn.execute(
+            "CREATE TABLE memory_turns (id INTEGER PRIMARY KEY AUTOINCREMENT, user_input TEXT NOT NULL, "
+            "ai_response TEXT NOT NULL, created_at REAL NOT NULL, attempts INTEGER NOT NULL DEFAULT 0)"
+        )
+        conn.execute(
+            "INSERT INTO memory_turns (user_input, ai_response, created_at) VALUES ('I live in Leeds', 'ok', 0)"
+        )
+
+    worker = make_worker(tmp_path, FlakyProvider(failures=0))
+
+    assert worker.process_pending() == 1
+    assert worker.bank.load() == ["Lives in Leeds"]
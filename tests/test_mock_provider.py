@@ -0,0 +1,39 @@
+"""
+MAiKO Mock Provider Tests
+"""
+import pytest
+from llm_provider import Message, ModelConfig
+from mock_provider import LatencyModel, MockProvider, RecordingProvider
+
+
+def ask(text):
+    return [Message(role="user", content=text)]
+
+
+def test_modes():
+    assert MockProvider(mode="echo").create_completion(ask("ping")) == "ping"
+    scripted = MockProvider(mode="scripted", responses=["one", "two"])
+    assert [scripted.create_completion(ask("x")) for _ in range(3)] == ["one", "two", "one"]
+    assert "".join(MockProvider(mode="canned", responses=["a b c"]).stream_completion(ask("x"))) == "a b c"
+
+
+def test_latency_is_seeded():
+    latency = LatencyModel(distribution="lognormal", mean_ms=100, stddev_ms=50)
+    first = MockProvider(mode="echo", latency=latency, seed=7)._respond(ask("x"), {})[1]
+    second = MockProvider(mode="echo", latency=latency, seed=7)._respond(ask("x"), {})[1]
+    assert first == second > 0
+
+
+def test_recorded_traffic_replays_offline(tmp_path):
+    cassette = str(tmp_path / "cassette.jsonl")
+    config = ModelConfig(name="recorded-model")
+    recorder = RecordingProvider(MockProvider(config=config, mode="scripted", responses=["first", "second"]), cassette)
+    recorded = [recorder.create_completion(ask("same question")) for _ in range(2)]
+    recorded.append("".join(recorder.stream_completion(ask("other question"))))
+
+    replay = MockProvider(config=config, mode="replay", cassette=cassette, replay_latency=False)
+
+    assert [replay.create_completion(ask("same question")) for _ in range(2)] == recorded[:2]
+    assert replay.create_completion(ask("other question")) == recorded[2]
+    with pytest.raises(KeyError):
+        replay.create_completion(ask("never recorded"))
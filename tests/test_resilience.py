@@ -0,0 +1,42 @@
+"""
+MAiKO Resilience Tests
+"""
+from llm_provider import Message, ModelConfig
+from mock_provider import MockProvider
+from resilience import ResilienceConfig, ResilientProvider, breaker_for
+
+
+def test_rebuilt_providers_share_a_breaker():
+    first = MockProvider(config=ModelConfig(name="breaker-shared"), mode="canned")
+    rebuilt = MockProvider(config=ModelConfig(name="breaker-shared"), mode="canned")
+    other = MockProvider(config=ModelConfig(name="breaker-other"), mode="canned")
+
+    assert breaker_for(first) is breaker_for(rebuilt)
+    assert breaker_for(first) is not breaker_for(other)
+
+
+def test_failover_skips_an_open_breaker():
+    primary = MockProvider(config=ModelConfig(name="failover-primary"), mode="canned", responses=["primary"])
+    backup = MockProvider(config=ModelConfig(name="failover-backup"), mode="canned", responses=["backup"])
+    breaker = breaker_for(primary)
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+    provider = ResilientProvider([primary, backup], ResilienceConfig(max_retries=0))
+    try:
+        assert provider.create_completion([Message(role="user", content="hi")]) == "backup"
+    finally:
+        breaker.record_success()
+
+
+def test_rebuilt_wrappers_share_latency_history_and_hedge_pool():
+    make = lambda: ResilientProvider(
+        [MockProvider(config=ModelConfig(name="latency-shared"), mode="canned")],
+        ResilienceConfig(max_retries=0)
+    )
+    first = make()
+    first.create_completion([Message(role="user", content="hi")])
+    rebuilt = make()
+
+    assert rebuilt.latencies[id(rebuilt.providers[0])].count() == 1
+    assert rebuilt._hedge_pool is first._hedge_pool
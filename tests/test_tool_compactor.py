@@ -0,0 +1,76 @@
+"""
+MAiKO Tool Result Compactor Tests
+"""
+from tool_compactor import ToolResultCompactor, head_tail, serialized_size, summarize_table
+
+
+def test_head_tail_keeps_both_ends_within_the_limit():
+    text = "\n".join(f"line {i}" for i in range(1000))
+    compacted = head_tail(text, 500, "; more in execution e1")
+
+    assert compacted.startswith("line 0\n")
+    assert compacted.endswith("line 999")
+    assert "more in execution e1" in compacted
+    assert len(compacted) < 600
+
+
+def test_table_summary_reports_shape():
+    text = "a,b,c\n" + "\n".join(f"{i},{i * 2},{i * 3}" for i in range(200))
+    summary = summarize_table(text, 3)
+
+    assert summary.startswith("[table: 200 rows x 3 columns]")
+    assert "a,b,c" in summary and "199,398,597" in summary
+
+
+def test_compact_drops_code_and_references_execution():
+    compactor = ToolResultCompactor(max_chars=1000)
+    result = {"executionId": "e1", "success": True, "code": "print('x')", "output": "word " * 2000}
+    compacted = compactor.compact("t1", result)
+
+    assert "code" not in compacted
+    assert len(compacted["output"]) < 1200
+    assert "more in execution e1" in compacted["output"]
+
+
+def test_repeated_output_becomes_a_reference():
+    compactor = ToolResultCompactor(max_chars=8000)
+    output = "same output\n" * 50
+    first, second = compactor.compact_turn([
+        ("t1", {"executionId": "e1", "output": output}),
+        ("t2", {"executionId": "e2", "output": output}),
+    ])
+
+    assert first["output"] == output
+    assert second["output"] == "[identical to the output of tool call t1]"
+
+
+def test_turn_budget_is_shared_between_results():
+    compactor = ToolResultCompactor(max_chars=4000)
+    results = compactor.compact_turn([
+        (f"t{i}", {"executionId": f"e{i}", "output": f"{i} " * 5000}) for i in range(4)
+    ])
+
+    assert sum(len(r["output"]) for r in results) < 4000 + 4 * 200
+
+
+def test_small_results_are_unchanged():
+    compactor = ToolResultCompactor(max_chars=1000)
+    result = {"executionId": "e1", "success": True, "output": "42\n"}
+
+    assert compactor.compact("t1", result) == result
+
+
+def test_turn_with_many_calls_stays_within_the_budget():
+    compactor = ToolResultCompactor(max_chars=4000)
+    calls = [
+        (f"t{i}", {
+            "executionId": f"e{i}", "success": False, "output": f"{i}\n" * 3000,
+            "error": "Traceback\n" * 300, "usage": {"wall_ms": 1.5, "exit_code": 1},
+        })
+        for i in range(20)  # more than max_chars // 500, the old per-result floor
+    ]
+    results = compactor.compact_turn(calls)
+
+    assert sum(serialized_size(r) for r in results) <= 4000
+    assert "e0" in results[0]["output"]
+    assert results[-1] == "[output omitted: this turn's result budget is used up; read it from execution e19]"
@@ -0,0 +1,101 @@
+"""
+MAiKO Tool Runner Tests
+"""
+import json
+import threading
+import time
+from types import SimpleNamespace
+from tool_runner import ToolRunner
+
+
+def tool_use(block_id, name="echo", **tool_input):
+    return SimpleNamespace(id=block_id, name=name, input=tool_input)
+
+
+def test_results_keep_block_order_and_report_errors():
+    def fail(tool_input):
+        raise ValueError("boom")
+
+    handlers = {"echo": lambda tool_input: {"value": tool_input["value"]}, "fail": fail}
+    results = ToolRunner(max_workers=2).run(
+        [tool_use("a", value=1), tool_use("b", name="missing"), tool_use("c", name="fail"), tool_use("d", value=2)],
+        handlers
+    )
+
+    assert [r["tool_use_id"] for r in results] == ["a", "b", "c", "d"]
+    assert json.loads(results[0]["content"]) == {"value": 1}
+    assert results[1]["is_error"] and "Unknown tool" in results[1]["content"]
+    assert results[2]["is_error"] and "boom" in results[2]["content"]
+    assert json.loads(results[3]["content"]) == {"value": 2}
+
+
+def test_overrunning_call_does_not_block_later_runs():
+    release = threading.Event()
+    handlers = {
+        "hang": lambda tool_input: release.wait(5),
+        "echo": lambda tool_input: "done",
+    }
+    runner = ToolRunner(max_workers=1)
+    try:
+        first = runner.run([tool_use("a", name="hang")], handlers, timeout=0.1)
+        started = time.monotonic()
+        second = runner.run([tool_use("b")], handlers, timeout=1)
+    finally:
+        release.set()
+
+    assert first[0]["is_error"] and "time budget" in first[0]["content"]
+    assert second[0]["content"] == "done"
+    assert time.monotonic() - started < 0.5
+
+
+def test_calls_sharing_a_serial_key_run_in_block_order():
+    sessions = {}
+
+    def execute(tool_input):
+        if "set" in tool_input:
+            time.sleep(0.01)  # the slower first call must still finish first
+            sessions[tool_input["session_id"]] = tool_input["set"]
+            return "ok"
+        return sessions[tool_input["session_id"]]
+
+    runner = ToolRunner(max_workers=4)
+    for trial in range(20):
+        sessions.clear()
+        results = runner.run(
+            [
+                tool_use("a", name="execute", session_id="s1", set=trial),
+                tool_use("b", name="execute", session_id="s1"),
+                tool_use("c", name="execute", session_id="s2", set=-trial),
+                tool_use("d", name="execute", session_id="s2"),
+            ],
+            {"execute": execute},
+            serial_key=lambda block: block.input["session_id"]
+        )
+        assert [r.get("is_error") for r in results] == [None] * 4
+        assert json.loads(results[1]["content"]) == trial
+        assert json.loads(results[3]["content"]) == -trial
+
+
+def test_serial_calls_after_a_timed_out_one_are_skipped():
+    release = threading.Event()
+    calls = []
+
+    def execute(tool_input):
+        calls.append(tool_input["step"])
+        if tool_input["step"] == 1:
+            release.wait(5)
+        return "ok"
+
+    try:
+        results = ToolRunner().run(
+            [tool_use("a", name="execute", step=1), tool_use("b", name="execute", step=2)],
+            {"execute": execute},
+            timeout=0.1,
+            serial_key=lambda block: "session"
+        )
+    finally:
+        release.set()
+    time.sleep(0.05)
+
+    assert all(r["is_error"] for r in results)
+    assert calls == [1]
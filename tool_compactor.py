@@ -0,0 +1,167 @@
+"""
+MAiKO Tool Result Compactor
+Shrinks code execution results before they are sent back to the model
+"""
+import hashlib
+import json
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+from config import config
+
+
+TABLE_DELIMITERS = (",", "\t", "|")
+MIN_TABLE_ROWS = 6
+MIN_REPEAT_CHARS = 200
+MIN_OUTPUT_CHARS = 100
+MIN_RESULT_SHARE = 1000  # smallest share worth giving a result, while the budget lasts
+OMITTED_CHARS = 100  # kept back for the note of each result after the current one
+
+
+def serialized_size(value: Any) -> int:
+    """Characters a result takes in its tool_result block"""
+    return len(value) if isinstance(value, str) else len(json.dumps(value))
+
+
+def head_tail(text: str, limit: int, reference: str = "") -> str:
+    """Keep the start and end of text within about limit characters"""
+    if len(text) <= limit:
+        return text
+    head_len = int(limit * 0.6)
+    tail_len = limit - head_len
+    head = text[:head_len]
+    cut = head.rfind("\n")
+    if cut > head_len // 2:
+        head = head[:cut + 1]
+    tail = text[-tail_len:]
+    cut = tail.find("\n")
+    if 0 <= cut < tail_len // 2:
+        tail = tail[cut + 1:]
+    omitted = len(text) - len(head) - len(tail)
+    lines = text.count("\n", len(head), len(text) - len(tail))
+    return f"{head}... [{lines} lines, {omitted} characters omitted{reference}] ...\n{tail}"
+
+
+def table_shape(lines: List[str]) -> Optional[Tuple[Optional[str], int]]:
+    """(delimiter, columns) when most lines share one column count, else None"""
+    rows = [line for line in lines if line.strip()]
+    if len(rows) < MIN_TABLE_ROWS:
+        return None
+    sample = rows[:200]
+    for delimiter in TABLE_DELIMITERS + (None,):
+        counts = Counter(
+            len(row.split(delimiter)) if delimiter else len(row.split()) for row in sample
+        )
+        columns, frequency = counts.most_common(1)[0]
+        if columns >= 2 and frequency >= 0.8 * len(sample):
+            return delimiter, columns
+    return None
+
+
+def summarize_table(text: str, rows: int, reference: str = "") -> Optional[str]:
+    """Header, first and last rows and the table's shape, if text is a table"""
+    lines = text.splitlines()
+    shape = table_shape(lines)
+    if shape is None or len(lines) <= 2 * rows + 1:
+        return None
+    _, columns = shape
+    kept = lines[:rows + 1] + [f"... [{len(lines) - 2 * rows - 1} more rows] ..."] + lines[-rows:]
+    return f"[table: {len(lines) - 1} rows x {columns} columns{reference}]\n" + "\n".join(kept)
+
+
+class ToolResultCompactor:
+    """
+    Compacts execution results for one agent conversation.
+
+    All results of a turn share max_chars, measured as serialized, so
+    every field counts: large outputs become a table summary or their head
+    and tail, and an output identical to one already sent is replaced by a
+    reference to that tool call. A result that cannot fit its share with at
+    least MIN_OUTPUT_CHARS of output is replaced by a one-line note, so a
+    turn stays within max_chars unless it has more calls than notes fit in.
+    Shortened and omitted outputs name their executionId; the execution
+    history keeps the stored output, which the model can page through with
+    read_execution_output.
+    """
+
+    def __init__(self, max_chars: int = None, table_rows: int = None):
+        self.max_chars = max_chars or config.TOOL_RESULT_MAX_CHARS
+        self.table_rows = table_rows or config.TOOL_RESULT_TABLE_ROWS
+        self._seen: Dict[str, str] = {}  # output digest -> tool_use_id
+
+    def _compact_text(self, text: str, limit: int, reference: str) -> str:
+        if len(text) <= limit:
+            return text
+        table = summarize_table(text, self.table_rows, reference)
+        if table is not None:
+            text = table
+        return head_tail(text, limit, reference)
+
+    def compact(self, tool_use_id: str, result: Any, limit: int = None) -> Any:
+        """One result, sized to limit characters of output"""
+        if not isinstance(result, dict):
+            return result
+        limit = limit or self.max_chars
+        compacted = {key: value for key, value in result.items() if key != "code"}
+        execution_id = result.get("executionId")
+        reference = f"; more in execution {execution_id}" if execution_id else ""
+
+        output = result.get("output")
+        if isinstance(output, str) and len(output) >= MIN_REPEAT_CHARS:
+            digest = hashlib.sha1(output.encode("utf-8", "replace")).hexdigest()
+            # Compacting the same call again (at a smaller limit) is not a repeat
+            if self._seen.get(digest, tool_use_id) != tool_use_id:
+                compacted["output"] = f"[identical to the output of tool call {self._seen[digest]}]"
+                output = None
+            else:
+                self._seen[digest] = tool_use_id
+        if isinstance(output, str):
+            compacted["output"] = self._compact_text(output, limit, reference)
+        if isinstance(result.get("error"), str):
+            compacted["error"] = self._compact_text(result["error"], limit // 2, reference)
+        return compacted
+
+    def _fit(self, tool_use_id: str, result: Any, share: int) -> Any:
+        """result compacted to at most share serialized characters, or None"""
+        if isinstance(result, str):
+            if len(result) <= share:
+                return result
+            # Sent as is; leave room for head_tail's marker
+            limit = share - MIN_OUTPUT_CHARS
+            return head_tail(result, limit) if limit >= MIN_OUTPUT_CHARS else None
+        if not isinstance(result, dict):
+            return result if serialized_size(result) <= share else None
+        limit = share
+        # Markers, JSON escaping and the other fields make the size hard to
+        # predict; shrink the output limit by the measured overshoot instead
+        for _ in range(4):
+            if limit < MIN_OUTPUT_CHARS:
+                break
+            compacted = self.compact(tool_use_id, result, limit)
+            size = serialized_size(compacted)
+            if size <= share:
+                return compacted
+            limit = limit * share // size - MIN_OUTPUT_CHARS // 2
+        return None
+
+    def _omitted(self, tool_use_id: str, result: Any) -> str:
+        # Later repeats must not point at an output the model never saw
+        self._seen = {digest: seen for digest, seen in self._seen.items() if seen != tool_use_id}
+        execution_id = result.get("executionId") if isinstance(result, dict) else None
+        where = f"; read it from execution {execution_id}" if execution_id else ""
+        return f"[output omitted: this turn's result budget is used up{where}]"
+
+    def compact_turn(self, results: List[Tuple[str, Any]]) -> List[Any]:
+        """All results of one turn, splitting max_chars between them"""
+        budget = self.max_chars
+        compacted = []
+        for i, (tool_use_id, result) in enumerate(results):
+            later = len(results) - i - 1
+            # Earlier calls get at least MIN_RESULT_SHARE until the budget runs
+            # out; space a small result leaves unused goes to the ones after it
+            share = min(budget - later * OMITTED_CHARS, max(budget // (later + 1), MIN_RESULT_SHARE))
+            value = self._fit(tool_use_id, result, share) if share > 0 else None
+            if value is None:
+                value = self._omitted(tool_use_id, result)
+            budget = max(budget - serialized_size(value), 0)
+            compacted.append(value)
+        return compacted
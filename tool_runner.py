@@ -0,0 +1,125 @@
+"""
+MAiKO Tool Runner
+Runs every tool call of an assistant turn concurrently
+"""
+import json
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Hashable, List, Optional
+from logger import get_logger
+from tool_compactor import ToolResultCompactor
+
+logger = get_logger(__name__)
+
+
+def tool_result(tool_use_id: str, content: Any, is_error: bool = False) -> Dict[str, Any]:
+    """A tool_result content block answering one tool_use block"""
+    block = {
+        "type": "tool_result",
+        "tool_use_id": tool_use_id,
+        "content": content if isinstance(content, str) else json.dumps(content),
+    }
+    if is_error:
+        block["is_error"] = True
+    return block
+
+
+class ToolRunner:
+    """
+    Answers all tool_use blocks of a response through a bounded pool.
+
+    Results come back in the order of the tool_use blocks. Unknown tools,
+    handler exceptions and calls still running at the deadline are answered
+    with is_error results, so the conversation always gets one tool_result
+    per tool_use. Calls that share a serial_key (e.g. the same execution
+    session) run one after another in block order; the rest run in
+    parallel.
+
+    Every run gets its own pool: a call that overruns the deadline cannot
+    be interrupted, and must not hold a worker that later turns (or other
+    chats) queue behind. Handlers should bound their own work, e.g. by
+    passing the remaining budget on as an execution timeout.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max_workers
+
+    def run(
+        self,
+        tool_uses: List[Any],
+        handlers: Dict[str, Callable[[Dict[str, Any]], Any]],
+        timeout: float = None,
+        compactor: Optional[ToolResultCompactor] = None,
+        serial_key: Callable[[Any], Optional[Hashable]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Run tool_use blocks (objects with id, name and input)
+
+        Args:
+            tool_uses: The tool_use blocks of one assistant response
+            handlers: Tool name -> function of the tool input
+            timeout: Seconds to wait for all calls before giving up on the rest
+            compactor: Shrinks the turn's successful results to a shared budget
+            serial_key: Block -> key; blocks with the same non-None key run in order
+        """
+        futures: Dict[str, Future] = {}
+        results: Dict[str, Dict[str, Any]] = {}
+        groups: Dict[Hashable, List[Any]] = {}
+        for block in tool_uses:
+            if block.name not in handlers:
+                results[block.id] = tool_result(block.id, f"Unknown tool: {block.name}", is_error=True)
+                continue
+            futures[block.id] = Future()
+            key = serial_key(block) if serial_key else None
+            group = ("serial", key) if key is not None else ("block", block.id)
+            groups.setdefault(group, []).append(block)
+
+        pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="tool")
+        for blocks in groups.values():
+            pool.submit(self._run_group, blocks, handlers, futures)
+        _, pending = wait(futures.values(), timeout=timeout)
+        # Overrunning calls finish on their own threads; nothing waits for them
+        pool.shutdown(wait=False, cancel_futures=True)
+        completed = []
+        for block_id, future in futures.items():
+            if future in pending:
+                future.cancel()  # later calls of its group are skipped
+                results[block_id] = tool_result(block_id, "Tool call exceeded the time budget", is_error=True)
+                continue
+            try:
+                completed.append((block_id, future.result()))
+            except Exception as e:
+                logger.error(f"Tool call failed: {e}")
+                results[block_id] = tool_result(block_id, f"Tool call failed: {e}", is_error=True)
+
+        values = [value for _, value in completed]
+        if compactor is not None:
+            values = compactor.compact_turn(completed)
+        for (block_id, _), value in zip(completed, values):
+            results[block_id] = tool_result(block_id, value)
+        return [results[block.id] for block in tool_uses]
+
+    @staticmethod
+    def _run_group(blocks: List[Any], handlers: Dict[str, Callable], futures: Dict[str, Future]):
+        """Run blocks one after another, stopping at one given up on"""
+        for block in blocks:
+            future = futures[block.id]
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(handlers[block.name](block.input))
+            except Exception as e:
+                future.set_exception(e)
+
+
+# Global tool runner instance
+_tool_runner = None
+_tool_runner_lock = threading.Lock()
+
+def get_tool_runner(max_workers: int = 4) -> ToolRunner:
+    """Get or create the shared tool runner"""
+    global _tool_runner
+    with _tool_runner_lock:
+        if _tool_runner is None:
+            _tool_runner = ToolRunner(max_workers)
+        return _tool_runner